@@ -1,32 +1,31 @@
+import time
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, Any
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
-from pathlib import Path
-import httpx
-
-# Explicitly load .env file from the backend directory
-env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path, override=True)
+from openai.types.chat import ChatCompletion
+from llm import get_llm_backend, get_completion_cache, make_cache_key
+from llm.instrumentation import instrumented, record_call
+from llm.router import ADVICE, get_model_router
+from llm.singleflight import get_singleflight
+from llm.hedging import get_hedger, with_retries
+from llm.resilience import (
+    CircuitOpenError, DeadlineExceeded, current_deadline, get_circuit_breaker, llm_unavailable, template_fallbacks
+)
 
 class BaseAgent(ABC):
     """Base class for all AI agents in the Wellchemy platform."""
     
     def __init__(self):
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        # Use a custom httpx client without 'proxies'
-        httpx_client = httpx.Client()
-        self.client = OpenAI(
-            api_key=api_key,
-            http_client=httpx_client
-        )
-        self.model = "gpt-3.5-turbo"
+        # Every agent shares one backend: pooled OpenAI client or the offline fake (see llm/backends.py)
+        self.llm = get_llm_backend()
+        # Models are picked per task class by the router (see data/model_routing.json)
+        self.router = get_model_router()
+        self.flights = get_singleflight()
+        self.breaker = get_circuit_breaker()
+        self.hedger = get_hedger()
     
     @abstractmethod
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process the input data and return a response.
         
@@ -62,14 +61,99 @@ class BaseAgent(ABC):
         response["data"] = data
         return response
 
-    def get_completion(self, messages):
-        """Get a completion from OpenAI."""
+    async def create_completion(self, messages, task: str = ADVICE, model: str = None, cache: bool = False,
+                                coalesce: bool = True, **kwargs) -> ChatCompletion:
+        """
+        Await a chat completion from OpenAI and return the raw response.
+
+        The model is chosen by the router for the task class (rephrase, normalize,
+        routing, advice) unless one is passed explicitly. Every upstream call is
+        instrumented (latency, tokens, cost, outcome) under this agent's name. With
+        cache=True, identical prompts (same model, messages and kwargs) are served
+        from the shared completion cache instead; without it, identical prompts that
+        are in flight at the same time still share a single upstream call, unless
+        coalesce=False (callers sampling several answers to one prompt).
+
+        Calls are bounded by the current request deadline and refused while the
+        circuit breaker is open; both raise LLMUnavailable so callers can fall back
+        to static text.
+        """
+        budget = self.router.budget(task)
+        if model:
+            call = self._complete(model, messages, cache, coalesce, budget, **kwargs)
+        else:
+            call = self.router.complete(task, lambda routed: self._complete(routed, messages, cache, coalesce, budget, **kwargs))
+
+        deadline = current_deadline()
+        if deadline is None:
+            return await call
+        try:
+            return await asyncio.wait_for(call, timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            llm_unavailable.inc(agent=type(self).__name__, reason="deadline")
+            raise DeadlineExceeded(f"LLM call exceeded the request deadline ({task})")
+
+    async def _complete(self, model: str, messages, cache: bool, coalesce: bool = True, budget: float = None,
+                        **kwargs) -> ChatCompletion:
+        agent = type(self).__name__
+        key = make_cache_key(model, messages, **kwargs)
+        completion_cache = get_completion_cache() if cache else None
+        if completion_cache is not None:
+            cached = await completion_cache.aget(key)
+            if cached is not None:
+                record_call(agent, model, "cache_hit")
+                return ChatCompletion.model_validate(cached)
+
+        if not self.breaker.allow():
+            llm_unavailable.inc(agent=agent, reason="circuit_open")
+            raise CircuitOpenError("LLM circuit is open")
+
+        upstream = lambda: self._upstream(agent, model, messages, budget, **kwargs)
+        if kwargs.get("stream"):
+            return await upstream()
+        if not coalesce:
+            response = await upstream()
+        else:
+            # Concurrent identical prompts (e.g. a cohort on the same question) share one upstream call
+            response = await self.flights.do(key, upstream)
+        if completion_cache is not None:
+            await completion_cache.aset(key, response.model_dump(mode="json"))
+        return response
+
+    async def _upstream(self, agent: str, model: str, messages, budget: float = None, **kwargs) -> ChatCompletion:
+        """
+        Make the provider call and report how it went to the circuit breaker
+        (a call over the task's latency budget counts as slow).
+
+        429/5xx responses are retried with jittered backoff, and non-streaming
+        calls that run past the model's tail latency are hedged with a backup.
+        """
+        call = lambda: instrumented(agent, model, lambda: self.llm.create(model=model, messages=messages, **kwargs))
+
+        async def timed_call():
+            attempt_started = time.perf_counter()
+            response = await call()
+            self.hedger.observe(model, time.perf_counter() - attempt_started)
+            return response
+
+        started = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error getting completion: {str(e)}")
-            raise 
\ No newline at end of file
+            if kwargs.get("stream"):
+                response = await with_retries(model, call)
+            else:
+                response = await with_retries(model, lambda: self.hedger.run(model, timed_call))
+        except (Exception, asyncio.CancelledError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success(time.perf_counter() - started, budget)
+        return response
+
+    def _template_fallback(self, reason: Exception) -> None:
+        """Note that a static template is being served because the LLM was unavailable."""
+        print(f"⚠️ {type(self).__name__} serving template reply: {reason}")
+        template_fallbacks.inc(agent=type(self).__name__)
+
+    async def get_completion(self, messages):
+        """Get a completion from OpenAI."""
+        response = await self.create_completion(messages)
+        return response.choices[0].message.content
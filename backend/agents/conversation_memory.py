@@ -0,0 +1,122 @@
+"""
+Bounded per-user conversation memory for the free-form chat fallback.
+
+Keeps the most recent turns verbatim and folds older ones into a rolling
+summary, so follow-up questions keep their context while the history sent
+with each call never exceeds a fixed token budget.
+"""
+
+import os
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, Hashable, List
+from llm.tokens import count_tokens, truncate_tokens, MESSAGE_OVERHEAD_TOKENS
+from llm.resilience import deadline_scope
+from metrics import counter
+
+# Tokens of history (summary + recent turns) sent with each call
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1000"))
+# Share of the budget reserved for the rolling summary
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "250"))
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and Wellchemy's wellness assistant. "
+    "Merge the new turns into the summary. Keep facts the assistant will need later (health conditions, "
+    "goals, preferences, questions still open) and drop pleasantries. Reply with the updated summary only, "
+    "in under 150 words."
+)
+
+SUMMARY_HEADER = "Summary of the conversation so far:\n"
+
+memory_compactions = counter("conversation_memory_compactions_total", "Turns folded into rolling summaries, by method (llm, extractive)", ("method",))
+
+Summarizer = Callable[[str, List[Dict[str, str]]], Awaitable[str]]
+
+
+class _Conversation:
+    def __init__(self):
+        self.summary = ""
+        self.turns = deque()   # (message, tokens), oldest first
+        self.turn_tokens = 0
+        self.pending: List[Dict[str, str]] = []  # evicted turns waiting to be summarized
+        self.compacting = None
+
+
+class ConversationMemory:
+    """Recent turns plus a rolling summary per user, capped at `budget_tokens`."""
+
+    def __init__(self, summarize: Summarizer, budget_tokens: int = MEMORY_TOKEN_BUDGET,
+                 summary_tokens: int = MEMORY_SUMMARY_TOKENS, model: str = "gpt-4"):
+        self.summarize = summarize
+        self.model = model
+        # The summary's share includes its header and message framing
+        self.summary_tokens = summary_tokens - count_tokens(SUMMARY_HEADER, model) - MESSAGE_OVERHEAD_TOKENS
+        self.turn_budget = budget_tokens - summary_tokens
+        self._conversations: Dict[str, _Conversation] = {}  # keyed by str(user_id), like the session store
+
+    def context(self, user_id: Hashable) -> List[Dict[str, str]]:
+        """Messages to send ahead of the new user message: the summary, then recent turns."""
+        conversation = self._conversations.get(str(user_id))
+        if conversation is None:
+            return []
+        messages = []
+        if conversation.summary:
+            messages.append({"role": "system", "content": SUMMARY_HEADER + conversation.summary})
+        return messages + [message for message, _ in conversation.turns]
+
+    def add(self, user_id: Hashable, role: str, content: str) -> None:
+        """Record a turn, evicting the oldest turns into the summary once over budget."""
+        conversation = self._conversations.setdefault(str(user_id), _Conversation())
+        content = truncate_tokens(content, self.turn_budget // 2, self.model, keep="start")
+        tokens = count_tokens(content, self.model) + MESSAGE_OVERHEAD_TOKENS
+        conversation.turns.append(({"role": role, "content": content}, tokens))
+        conversation.turn_tokens += tokens
+
+        while conversation.turn_tokens > self.turn_budget and len(conversation.turns) > 1:
+            message, tokens = conversation.turns.popleft()
+            conversation.turn_tokens -= tokens
+            conversation.pending.append(message)
+
+        if conversation.pending and conversation.compacting is None:
+            conversation.compacting = asyncio.ensure_future(self._compact(conversation))
+
+    def forget(self, user_id: Hashable) -> None:
+        conversation = self._conversations.pop(str(user_id), None)
+        if conversation is not None and conversation.compacting is not None:
+            conversation.compacting.cancel()
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    async def flush(self, user_id: Hashable) -> None:
+        """Wait for any in-flight summarization for the user (used by tests and shutdown)."""
+        conversation = self._conversations.get(str(user_id))
+        if conversation is not None and conversation.compacting is not None:
+            await conversation.compacting
+
+    async def _compact(self, conversation: _Conversation) -> None:
+        # Runs after the reply is sent, so it is not bound by that request's deadline
+        with deadline_scope(None):
+            try:
+                while conversation.pending:
+                    batch, conversation.pending = conversation.pending, []
+                    try:
+                        summary = await self.summarize(conversation.summary, batch)
+                        memory_compactions.inc(len(batch), method="llm")
+                    except Exception as e:
+                        print(f"⚠️ Summarizing conversation failed, keeping an extract instead: {e}")
+                        lines = [f"{m['role']}: {m['content']}" for m in batch]
+                        summary = "\n".join(filter(None, [conversation.summary] + lines))
+                        memory_compactions.inc(len(batch), method="extractive")
+                    conversation.summary = truncate_tokens(summary.strip(), self.summary_tokens, self.model)
+            finally:
+                conversation.compacting = None
+
+
+def summary_messages(summary: str, turns: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Prompt asking the LLM to fold `turns` into `summary`."""
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+    ]
@@ -1,18 +1,32 @@
 import os
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_agent import BaseAgent
-from db_connection import SessionLocal
-from models import DietAssessment, User
+from llm import Prefetcher
+from llm.router import NORMALIZE, REPHRASE
+from llm.resilience import LLMUnavailable
+from sessions import BinaryCodec, DietSession, SessionMap
+from sessions.guests import ensure_user, get_guest_ids
+from sessions.progress import DIET, clear_progress, get_progress_writer
+from .question_bank import QuestionBank
+from .frequency_parser import parse_frequency, normalizer_messages, parse_outcomes
+from write_behind import get_write_behind
+from models import DietAssessment
 from datetime import datetime
 import traceback
-import uuid
 
 class ConversationalDietaryAssessmentAgent(BaseAgent):
     def __init__(self):
         super().__init__()
 
-        self.state = {}  # user_id -> session state
+        self.state = SessionMap("diet", codec=BinaryCodec(DietSession))  # user_id -> DietSession, shared by all workers
+
+        # Questions are served from the pre-rendered bank unless live generation is opted into
+        self.question_bank = QuestionBank.load()
+        self.live_questions = os.getenv("DIET_LIVE_QUESTIONS", "false").lower() == "true"
+        self.prefetcher = Prefetcher()
+        self.progress = get_progress_writer()  # per-answer checkpoints for resuming
+        self.guests = get_guest_ids()  # anonymous users get a users row once they have answers to save
 
         self.categories = [
             "Fruits",
@@ -72,17 +86,6 @@ class ConversationalDietaryAssessmentAgent(BaseAgent):
             "Fried Foods": "e.g., fried chicken, tempura, onion rings"
         }
 
-        self.response_map = {
-            "every day": 7,
-            "daily": 7,
-            "most days": 5,
-            "often": 5,
-            "sometimes": 3,
-            "occasionally": 2,
-            "rarely": 1,
-            "never": 0
-        }
-
         self.whole_plant_foods = {
             "Fruits", "Vegetables", "Whole Grains", "Legumes", "Nuts", "Plant-based Dairy Alternatives", "Fermented Foods"
         }
@@ -95,78 +98,134 @@ class ConversationalDietaryAssessmentAgent(BaseAgent):
             "Water", "Herbal Beverages", "Green Tea", "Coffee", "Alcohol", "Artificial Sweeteners", "Sugar-sweetened Beverages"
         }
 
-    def _create_guest_user(self) -> int:
-        db = SessionLocal()
-        try:
-            guest_user = User(
-                email=f"guest_{uuid.uuid4()}@wellchemy.ai",
-                password_hash="auto-created",
-                first_login=datetime.utcnow(),
-                last_login=datetime.utcnow()
-            )
-            db.add(guest_user)
-            db.commit()
-            db.refresh(guest_user)
-            return guest_user.user_id
-        except Exception as e:
-            db.rollback()
-            raise
-        finally:
-            db.close()
-
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         user_id = input_data.get("user_id")
         message = input_data.get("message", "").strip().lower()
 
         if user_id is None or user_id == "default":
-            user_id = self._create_guest_user()
+            user_id = await self.guests.new()
         else:
             user_id = int(user_id)
 
-        if user_id not in self.state:
-            self.state[user_id] = {
-                "collecting": True,
-                "current_category_index": 0,
-                "answers": {}
-            }
+        session = await self.state.get(user_id)
+        resumed = False
+        if session is None:
+            session = await self._resume(user_id)
+            resumed = session is not None
+            session = session or DietSession(len(self.categories))
+            await self.state.put(user_id, session)
+            if not resumed:
+                # Nothing to resume, so any message can't be an answer yet: ask the first question
+                return await self._ask_next_category(user_id, session)
 
-        session = self.state[user_id]
+        if session.collecting:
+            # A new or resumed assessment starts by (re-)asking the current question
+            if message == "" and (session.index == 0 or resumed):
+                return await self._ask_next_category(user_id, session)
 
-        if session["collecting"]:
-            if session["current_category_index"] == 0 and message == "":
-                return self._ask_next_category(user_id)
+            session.record(await self._estimate_frequency(message))
 
-            current_category = self.categories[session["current_category_index"]]
-            estimated_frequency = self._estimate_frequency(message)
-            session["answers"][current_category] = estimated_frequency
+            if not session.collecting:
+                return await self._save_and_finish(user_id, session.as_dict(self.categories))
 
-            session["current_category_index"] += 1
+            await self._save_progress(user_id, session)
+            return await self._ask_next_category(user_id, session)
 
-            if session["current_category_index"] >= len(self.categories):
-                session["collecting"] = False
-                return self._save_and_finish(user_id, session["answers"])
+        return self._format_response(False, "No active session.")
 
-            return self._ask_next_category(user_id)
+    async def _resume(self, user_id: int) -> Optional[DietSession]:
+        """The user's unfinished assessment from the database, if any."""
+        try:
+            raw = await self.progress.load(user_id, DIET)
+        except Exception as e:
+            print(f"⚠️ Could not load diet progress for user {user_id}: {e}")
+            return None
+        if raw is None:
+            return None
+        session = DietSession.from_bytes(raw)
+        print(f"♻️ Resuming diet assessment for user {user_id} at question {session.index + 1}")
+        return session
+
+    async def _save_progress(self, user_id: int, session: DietSession) -> None:
+        """Keep the session in the shared store and queue its database checkpoint."""
+        await self.state.put(user_id, session)
+        self.progress.save(user_id, DIET, session.to_bytes())
+
+    async def _estimate_frequency(self, user_response: str) -> int:
+        if not user_response:
+            return 3
 
-        return self._format_response(False, "No active session.")
+        per_week = parse_frequency(user_response)
+        if per_week is not None:
+            parse_outcomes.inc(outcome="parsed")
+        else:
+            # Only ambiguous answers pay for a (memoized) LLM round trip
+            parse_outcomes.inc(outcome="llm_fallback")
+            try:
+                response = await self.create_completion(normalizer_messages(user_response), task=NORMALIZE, cache=True)
+                per_week = parse_frequency(response.choices[0].message.content)
+            except Exception as e:
+                print(f"Error normalizing frequency: {e}")
+
+        if per_week is None:
+            return 3
+        return max(0, min(7, int(per_week + 0.5)))
 
-    def _estimate_frequency(self, user_response: str) -> int:
-        for key_phrase, frequency in self.response_map.items():
-            if key_phrase in user_response:
-                return frequency
+    async def _ask_next_category(self, user_id: str, session: DietSession) -> Dict[str, Any]:
+        index = session.index
 
         try:
-            number = int(user_response)
-            return max(0, min(7, number))
-        except:
-            return 3
+            if self.live_questions:
+                ai_message = await self.prefetcher.take(user_id, index) or await self._live_question(index)
+                # Start on the next question while the user is typing their answer
+                next_index = index + 1
+                if next_index < len(self.categories):
+                    self.prefetcher.schedule(user_id, next_index, lambda: self._generate_question(next_index))
+            else:
+                ai_message = self.question_bank.get(self.categories[index]) or self._static_question(index)
+
+            return self._format_response(True, "Next question", {
+                "response": ai_message
+            }, user_id)
+
+        except Exception as e:
+            return self._format_response(False, "Error", {"error": str(e)}, user_id)
 
-    def _ask_next_category(self, user_id: str) -> Dict[str, Any]:
-        session = self.state[user_id]
-        current_category = self.categories[session["current_category_index"]]
+    async def _live_question(self, index: int) -> str:
+        """LLM-phrased question, or the static text while the LLM is unavailable."""
+        try:
+            return await self._generate_question(index)
+        except LLMUnavailable as e:
+            self._template_fallback(e)
+            return self._static_question(index)
+
+    def _static_question(self, index: int) -> str:
+        """Plain question text used when the bank has no variant for a category."""
+        current_category = self.categories[index]
+        example_text = self.food_examples.get(current_category, "")
+        question = f"How often per week do you consume **{current_category}** ({example_text})?"
+        if index == 0:
+            return (
+                "👋 Welcome to the Wellchemy diet assessment! It only takes 3-5 minutes. "
+                "Answer with terms like \"daily\", \"occasionally\", \"never\", or a number 0-7 — "
+                "there are no right or wrong answers.\n\n" + question
+            )
+        return question
+
+    async def build_question_bank(self, variants: int = 3, path: str = None) -> QuestionBank:
+        """Regenerate the question bank with the LLM, persist it and start serving it."""
+        bank = QuestionBank(path=path)
+        await bank.build(self.categories, self._generate_question, variants)
+        bank.save(model="/".join(self.router.tiers(REPHRASE)))
+        self.question_bank = bank
+        return bank
+
+    async def _generate_question(self, index: int) -> str:
+        """Ask the LLM to phrase the question for the category at `index`."""
+        current_category = self.categories[index]
         example_text = self.food_examples.get(current_category, "")
 
-        if session["current_category_index"] == 0:
+        if index == 0:
             system_prompt = """
 You are a friendly and professional diet assessment assistant for Wellchemy.
 
@@ -203,48 +262,41 @@ Examples:
 How often per week do you consume **{current_category}** {example_text}?
 """.strip()
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-
-            ai_message = response.choices[0].message.content
-
-            return self._format_response(True, "Next question", {
-                "response": ai_message
-            }, user_id)
-
-        except Exception as e:
-            return self._format_response(False, "Error", {"error": str(e)}, user_id)
-
-    def _save_and_finish(self, user_id: int, answers: Dict[str, int]) -> Dict[str, Any]:
-        db = SessionLocal()
-        try:
-            results = self._calculate_scores(answers)
-            record = DietAssessment(
-                user_id=user_id,
-                results=json.dumps(results),
-                date_taken=datetime.utcnow()
-            )
-            db.add(record)
-            db.commit()
-        except Exception as e:
-            db.rollback()
-            raise
-        finally:
-            db.close()
-
-        del self.state[user_id]
+        response = await self.create_completion(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            task=REPHRASE,
+            coalesce=False  # build() asks for several variants of the same prompt at once
+        )
+        return response.choices[0].message.content
+
+    async def _save_and_finish(self, user_id: int, answers: Dict[str, int]) -> Dict[str, Any]:
+        results = self._calculate_scores(answers)
+        # A queued checkpoint must not land after the row is cleared with the results
+        await self.progress.discard(user_id, DIET)
+        await self._store_results(user_id, results)
+
+        await self.state.pop(user_id)
+        self.prefetcher.cancel(user_id)
 
         summary = self._build_summary(results)
 
         return self._format_response(True, "Assessment complete", {
             "response": summary
-        })
+        }, user_id)
+
+    async def _store_results(self, user_id: int, results: Dict[str, Any]) -> None:
+        record = DietAssessment(
+            user_id=user_id,
+            results=json.dumps(results),
+            date_taken=datetime.utcnow()
+        )
+        # Committed (with the progress row's delete) before the summary is shown
+        await get_write_behind().write(
+            lambda db: ensure_user(db, user_id), record, lambda db: clear_progress(db, user_id, DIET)
+        )
 
     def _calculate_scores(self, answers: Dict[str, int]) -> Dict[str, Any]:
         plant_food_total = sum(answers.get(k, 0) for k in self.whole_plant_foods)
@@ -1,12 +1,18 @@
 import os
 import random
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
 from .base_agent import BaseAgent
-from db_connection import SessionLocal
-from models import EligibilityAssessment, User
+from llm import Prefetcher
+from llm.router import REPHRASE
+from llm.resilience import LLMUnavailable
+from sessions import BinaryCodec, EligibilitySession, SessionMap, Stage
+from sessions.guests import ensure_user, get_guest_ids
+from sessions.progress import ELIGIBILITY, clear_progress, get_progress_writer
+from write_behind import get_write_behind
+from models import EligibilityAssessment
 from datetime import datetime
 import traceback
-import uuid
 import json
 
 class ConversationalEligibilityAgent(BaseAgent):
@@ -35,7 +41,10 @@ class ConversationalEligibilityAgent(BaseAgent):
             {"key": "delivery_address", "question": "What is your delivery address so we can be ready to send your food as soon as you are approved?"}
         ]
 
-        self.state = {}  # user_id -> {stage, index, answers, branch}
+        self.state = SessionMap("eligibility", codec=BinaryCodec(EligibilitySession))  # user_id -> EligibilitySession, shared by all workers
+        self.prefetcher = Prefetcher()  # speculative next-question generation per user
+        self.progress = get_progress_writer()  # per-answer checkpoints for resuming
+        self.guests = get_guest_ids()  # anonymous users get a users row once they have answers to save
         self.chronic_conditions_url = "https://www.cdc.gov/chronicdisease/resources/publications/factsheets.htm"
         self.dietary_restrictions_url = "https://www.foodallergy.org/living-food-allergies/food-allergy-essentials/common-allergens"
 
@@ -52,124 +61,168 @@ class ConversationalEligibilityAgent(BaseAgent):
             "Pose the question in a naturally flowing way, like a conversation."
         ]
 
-    def _create_guest_user(self) -> int:
-        """Create a guest user and return their ID."""
-        db = SessionLocal()
-        try:
-            print("Creating guest user...")
-            guest_user = User(
-                email=f"guest_{uuid.uuid4()}@wellchemy.ai",
-                password_hash="auto-created",
-                first_login=datetime.utcnow(),
-                last_login=datetime.utcnow()
-            )
-            db.add(guest_user)
-            db.commit()
-            db.refresh(guest_user)
-            print(f"Guest user created with ID: {guest_user.user_id}")
-            return guest_user.user_id
-        except Exception as e:
-            print(f"Error creating guest user: {str(e)}\n{traceback.format_exc()}")
-            db.rollback()
-            raise
-        finally:
-            db.close()
-
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         user_id = input_data.get("user_id", "default")
         message = input_data.get("message", "").strip()
 
         if user_id == "default" or user_id is None:
-            user_id = self._create_guest_user()
-
-        if user_id not in self.state:
-            self.state[user_id] = {
-                "stage": "initial",
-                "index": 0,
-                "answers": {},
-                "branch": None
-            }
-
-        user_state = self.state[user_id]
-        stage = user_state["stage"]
-        index = user_state["index"]
+            user_id = await self.guests.new()
+
+        user_state = await self.state.get(user_id)
+        if user_state is None:
+            resumed = await self._resume(user_id)
+            if resumed is None or not message:
+                # Opening the check, or text arriving with nothing to resume (e.g. after the session was evicted):
+                # ask the first question rather than take the message as its answer. Picking up after a restart
+                # or on another device: ask where they left off. Nothing is saved until an answer is recorded.
+                user_state = resumed or EligibilitySession()
+                await self.state.put(user_id, user_state)
+                return await self._next_question(user_id, user_state)
+            user_state = resumed
+        stage = user_state.stage
+        index = user_state.index
 
         # Clarification detection
         if any(kw in message.lower() for kw in ["example", "like what", "what is", "explain", "what's that", "huh", "help"]):
-            if stage == "unbranch" and index == 0:  # chronic conditions
+            if stage == Stage.UNBRANCH and index == 0:  # chronic conditions
                 return self._format_response(True, "Clarification", {
                     "response": f"Sure! Here's a helpful resource on chronic conditions: {self.chronic_conditions_url}"
-                })
-            if stage == "unbranch" and index == 1:  # dietary restrictions
+                }, user_id)
+            if stage == Stage.UNBRANCH and index == 1:  # dietary restrictions
                 return self._format_response(True, "Clarification", {
                     "response": f"Sure! Here's a helpful resource on common dietary restrictions: {self.dietary_restrictions_url}"
-                })
+                }, user_id)
 
         # Save previous answer
-        if stage == "initial":
+        if stage == Stage.INITIAL:
             if index < len(self.questions):
-                user_state["answers"][self.questions[index]["key"]] = message
+                user_state.answers[self.questions[index]["key"]] = message
                 index += 1
-                user_state["index"] = index
+                user_state.index = index
 
                 if index == len(self.questions):
                     # Branch detection after insurance provider
-                    provider = user_state["answers"]["insurance_provider"].strip().lower()
+                    provider = user_state.answers["insurance_provider"].strip().lower()
                     if provider in self.branch_questions:
-                        user_state["stage"] = "branch"
-                        user_state["index"] = 0
-                        user_state["branch"] = provider
+                        user_state.advance(Stage.BRANCH, provider)
                     else:
-                        user_state["stage"] = "unbranch"
-                        user_state["index"] = 0
-            return self._next_question(user_id)
+                        user_state.advance(Stage.UNBRANCH)
+            await self._save_progress(user_id, user_state)
+            return await self._next_question(user_id, user_state)
 
-        if stage == "branch":
-            branch = user_state["branch"]
+        if stage == Stage.BRANCH:
+            branch = user_state.branch
             branch_qs = self.branch_questions[branch]
 
             if index < len(branch_qs):
-                user_state["answers"][branch_qs[index]["key"]] = message
+                user_state.answers[branch_qs[index]["key"]] = message
                 index += 1
-                user_state["index"] = index
+                user_state.index = index
 
                 if index == len(branch_qs):
-                    user_state["stage"] = "unbranch"
-                    user_state["index"] = 0
-            return self._next_question(user_id)
+                    user_state.advance(Stage.UNBRANCH)
+            await self._save_progress(user_id, user_state)
+            return await self._next_question(user_id, user_state)
 
-        if stage == "unbranch":
+        if stage == Stage.UNBRANCH:
             if index < len(self.unbranch_questions):
-                user_state["answers"][self.unbranch_questions[index]["key"]] = message
+                user_state.answers[self.unbranch_questions[index]["key"]] = message
                 index += 1
-                user_state["index"] = index
+                user_state.index = index
 
                 if index == len(self.unbranch_questions):
-                    return self._save_and_finish(user_id, user_state["answers"])
-            return self._next_question(user_id)
+                    return await self._save_and_finish(user_id, user_state.answers)
+            await self._save_progress(user_id, user_state)
+            return await self._next_question(user_id, user_state)
 
-        return self._format_response(False, "No active session.")
+        return self._format_response(False, "No active session.", user_id=user_id)
 
-    def _next_question(self, user_id: str) -> Dict[str, Any]:
+    async def _resume(self, user_id) -> Optional[EligibilitySession]:
+        """The user's unfinished eligibility check from the database, if any."""
+        try:
+            raw = await self.progress.load(user_id, ELIGIBILITY)
+        except Exception as e:
+            print(f"⚠️ Could not load eligibility progress for user {user_id}: {e}")
+            return None
+        if raw is None:
+            return None
+        print(f"♻️ Resuming eligibility check for user {user_id}")
+        return EligibilitySession.from_bytes(raw)
+
+    async def _save_progress(self, user_id, user_state: EligibilitySession) -> None:
+        """Keep the session in the shared store and queue its database checkpoint."""
+        await self.state.put(user_id, user_state)
+        self.progress.save(user_id, ELIGIBILITY, user_state.to_bytes())
+
+    async def _next_question(self, user_id: str, user_state: EligibilitySession) -> Dict[str, Any]:
         """Ask the next question based on the current stage and index."""
-        user_state = self.state[user_id]
-        stage = user_state["stage"]
-        index = user_state["index"]
-
-        if stage == "initial" and index < len(self.questions):
-            question = self.questions[index]["question"]
-        elif stage == "branch":
-            branch = user_state["branch"]
-            branch_qs = self.branch_questions[branch]
-            question = branch_qs[index]["question"]
-        elif stage == "unbranch":
-            question = self.unbranch_questions[index]["question"]
-        else:
-            return self._format_response(False, "No questions left.")
+        stage = user_state.stage
+        index = user_state.index
+
+        question = self._question_at(stage, index, user_state.branch)
+        if question is None:
+            return self._format_response(False, "No questions left.", user_id=user_id)
 
         # 🎲 Randomly pick a style
         style_instruction = random.choice(self.instruction_styles)
 
+        # Call OpenAI to rephrase the next question (repeat prompts are served from cache)
+        try:
+            position = (stage, index, user_state.branch if stage == Stage.BRANCH else None)
+            ai_message = await self.prefetcher.take(user_id, position)
+            if ai_message is None:
+                try:
+                    ai_message = await self._rephrase(question, style_instruction)
+                except LLMUnavailable as e:
+                    # Ask the question as written rather than keep the user waiting
+                    self._template_fallback(e)
+                    ai_message = question
+            self._prefetch_next(user_id, position)
+
+            return self._format_response(True, "Next question", {
+                "response": ai_message
+            }, user_id)
+
+        except Exception as e:
+            print(f"Error generating next question: {e}")
+            return self._format_response(False, "Error", {"error": str(e)}, user_id)
+
+    def _question_at(self, stage: Stage, index: int, branch: Optional[str]) -> Optional[str]:
+        if stage == Stage.INITIAL and index < len(self.questions):
+            return self.questions[index]["question"]
+        if stage == Stage.BRANCH and index < len(self.branch_questions[branch]):
+            return self.branch_questions[branch][index]["question"]
+        if stage == Stage.UNBRANCH and index < len(self.unbranch_questions):
+            return self.unbranch_questions[index]["question"]
+        return None
+
+    def _next_positions(self, stage: Stage, index: int, branch: Optional[str]) -> List[Tuple[Stage, int, Optional[str]]]:
+        """Every position the flow can move to after answering (stage, index, branch)."""
+        if stage == Stage.INITIAL:
+            if index + 1 < len(self.questions):
+                return [(Stage.INITIAL, index + 1, None)]
+            # The insurance answer is unknown until it arrives, so every branch is a candidate
+            return [(Stage.BRANCH, 0, provider) for provider in self.branch_questions] + [(Stage.UNBRANCH, 0, None)]
+        if stage == Stage.BRANCH:
+            if index + 1 < len(self.branch_questions[branch]):
+                return [(Stage.BRANCH, index + 1, branch)]
+            return [(Stage.UNBRANCH, 0, None)]
+        if stage == Stage.UNBRANCH and index + 1 < len(self.unbranch_questions):
+            return [(Stage.UNBRANCH, index + 1, None)]
+        return []
+
+    def _prefetch_next(self, user_id, position: Tuple[Stage, int, Optional[str]]) -> None:
+        """Rephrase the upcoming question(s) in the background while the user answers."""
+        for candidate in self._next_positions(*position):
+            question = self._question_at(*candidate)
+            style_instruction = random.choice(self.instruction_styles)
+            self.prefetcher.schedule(
+                user_id, candidate,
+                lambda question=question, style=style_instruction: self._rephrase(question, style)
+            )
+
+    async def _rephrase(self, question: str, style_instruction: str) -> str:
+        """Rephrase a fixed question in the given style, via the shared completion cache."""
         system_prompt = f"""
 You are a professional but friendly Eligibility Assessment Assistant for Wellchemy.
 
@@ -182,25 +235,39 @@ Here is the next question you must ask:
 "{question}"
 """.strip()
 
-        # Call OpenAI to rephrase the next question
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": "Ask the next question, please."}
-                ]
-            )
-
-            ai_message = response.choices[0].message.content
-
-            return self._format_response(True, "Next question", {
-                "response": ai_message
-            })
-
-        except Exception as e:
-            print(f"Error generating next question: {e}")
-            return self._format_response(False, "Error", {"error": str(e)})
+        response = await self.create_completion(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": "Ask the next question, please."}
+            ],
+            task=REPHRASE,
+            cache=True
+        )
+        return response.choices[0].message.content
+
+    def _all_questions(self) -> List[str]:
+        branch_qs = [q for qs in self.branch_questions.values() for q in qs]
+        return [q["question"] for q in self.questions + branch_qs + self.unbranch_questions]
+
+    async def warm_cache(self, concurrency: int = 5) -> int:
+        """Pre-generate every (question, style) rephrasing so first askers hit the cache."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _warm(question: str, style: str) -> bool:
+            async with semaphore:
+                try:
+                    await self._rephrase(question, style)
+                    return True
+                except Exception as e:
+                    print(f"Error warming question cache: {e}")
+                    return False
+
+        results = await asyncio.gather(*(
+            _warm(question, style)
+            for question in self._all_questions()
+            for style in self.instruction_styles
+        ))
+        return sum(results)
 
     def _format_answers(self, answers: Dict[str, Any]) -> str:
         """Nicely format the answers for display."""
@@ -223,28 +290,16 @@ Here is the next question you must ask:
 
         return "\n\n".join(lines)
 
-    def _save_and_finish(self, user_id: str, answers: Dict[str, Any]) -> Dict[str, Any]:
+    async def _save_and_finish(self, user_id: str, answers: Dict[str, Any]) -> Dict[str, Any]:
         """Save collected eligibility data and finish session."""
-        db = SessionLocal()
         try:
-            print(f"Saving eligibility assessment for user {user_id}")
-            # Convert answers to JSON string if it's not already
-            if isinstance(answers, dict):
-                answers_json = json.dumps(answers)
-            else:
-                answers_json = answers
-
-            record = EligibilityAssessment(
-                user_id=user_id,
-                answers=answers_json,
-                date_taken=datetime.utcnow()
-            )
-            db.add(record)
-            db.commit()
-            print("Eligibility assessment saved successfully")
-            
+            # A queued checkpoint must not land after the row is cleared with the results
+            await self.progress.discard(user_id, ELIGIBILITY)
+            await self._store_answers(user_id, answers)
+
             # Clean up the session
-            del self.state[user_id]
+            await self.state.pop(user_id)
+            self.prefetcher.cancel(user_id)
             formatted_answers = self._format_answers(answers)
             
             return self._format_response(True, "Eligibility assessment complete", {
@@ -254,10 +309,9 @@ Here is the next question you must ask:
                     f"{formatted_answers}\n\n"
                     f"✅ We'll let you know as soon as you're approved. In the meantime, feel free to ask me anything about your diet, wellness, or health — I'm here to help!"
                 )
-            })
+            }, user_id)
         except Exception as e:
             print(f"Error saving eligibility assessment: {str(e)}\n{traceback.format_exc()}")
-            db.rollback()
             # Even if saving fails, we should still return a response to the user
             formatted_answers = self._format_answers(answers)
             return self._format_response(True, "Eligibility assessment complete", {
@@ -267,6 +321,24 @@ Here is the next question you must ask:
                     f"{formatted_answers}\n\n"
                     f"✅ We'll let you know as soon as you're approved. In the meantime, feel free to ask me anything about your diet, wellness, or health — I'm here to help!"
                 )
-            })
-        finally:
-            db.close()
+            }, user_id)
+
+    async def _store_answers(self, user_id: str, answers: Dict[str, Any]) -> None:
+        """Write the eligibility answers to the database."""
+        print(f"Saving eligibility assessment for user {user_id}")
+        # Convert answers to JSON string if it's not already
+        if isinstance(answers, dict):
+            answers_json = json.dumps(answers)
+        else:
+            answers_json = answers
+
+        record = EligibilityAssessment(
+            user_id=user_id,
+            answers=answers_json,
+            date_taken=datetime.utcnow()
+        )
+        # Committed (with the progress row's delete) in a shared batch before we confirm to the user
+        await get_write_behind().write(
+            lambda db: ensure_user(db, user_id), record, lambda db: clear_progress(db, user_id, ELIGIBILITY)
+        )
+        print("Eligibility assessment saved successfully")
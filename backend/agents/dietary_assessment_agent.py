@@ -1,5 +1,8 @@
 from typing import Dict, Any
 from .base_agent import BaseAgent
+from .frequency_parser import parse_frequency, to_bucket, normalizer_messages, parse_outcomes
+from llm.router import NORMALIZE
+from llm.resilience import LLMUnavailable
 import json
 
 class ConversationalDietaryAssessmentAgent(BaseAgent):
@@ -37,16 +40,19 @@ class ConversationalDietaryAssessmentAgent(BaseAgent):
 
         self.state = {}  # user_id -> {answers: {}, collecting: True/False, current_category: int, welcomed: bool}
 
-    def _normalize_frequency(self, freeform_answer: str) -> str:
-        """Use OpenAI to normalize freeform answer to one of 6 categories."""
-        messages = [
-            {"role": "system", "content": "You are a frequency normalizer. Given a user's freeform description of how often they consume a food, convert it into one of: Never, Less than 1x/week, 1-3x/week, 4-6x/week, 1-2x/day, More than 3x/day. Only return the normalized option exactly."},
-            {"role": "user", "content": freeform_answer}
-        ]
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=messages
-        )
+    async def _normalize_frequency(self, freeform_answer: str) -> str:
+        """Normalize a freeform answer to one of 6 categories, using OpenAI only when the local parser is unsure."""
+        per_week = parse_frequency(freeform_answer)
+        if per_week is not None:
+            parse_outcomes.inc(outcome="parsed")
+            return to_bucket(per_week)
+
+        parse_outcomes.inc(outcome="llm_fallback")
+        try:
+            response = await self.create_completion(normalizer_messages(freeform_answer), task=NORMALIZE, cache=True)
+        except LLMUnavailable as e:
+            self._template_fallback(e)
+            return to_bucket(3)
         normalized = response.choices[0].message.content.strip()
         return normalized
 
@@ -111,7 +117,7 @@ class ConversationalDietaryAssessmentAgent(BaseAgent):
 
         return final_message
 
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         user_id = input_data.get("user_id", "default")
         message = input_data.get("message", "").strip()
 
@@ -140,7 +146,7 @@ class ConversationalDietaryAssessmentAgent(BaseAgent):
 
         # Record the user's answer to the current question
         if message and user_state["current_category"] < len(self.categories):
-            normalized_answer = self._normalize_frequency(message)
+            normalized_answer = await self._normalize_frequency(message)
             score = self._convert_to_score(normalized_answer)
 
             if score == -1:
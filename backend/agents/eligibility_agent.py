@@ -1,10 +1,11 @@
 from typing import Dict, Any
+import asyncio
 from .base_agent import BaseAgent
 from db_connection import SessionLocal
-from models import EligibilityAssessment, User
+from models import EligibilityAssessment
+from sessions.guests import ensure_user, get_guest_ids
 from datetime import datetime
 import traceback
-import uuid
 
 class EligibilityAgent(BaseAgent):
     def __init__(self):
@@ -37,30 +38,9 @@ You ask a series of questions to determine if a user qualifies for a program. Th
             {"key": "delivery_address", "question": "Great! Now, what is your delivery address so we can be ready to send your food as soon as you are approved?"},
         ]
         self.state = {}  # user_id -> {index, answers, branch, stage}
+        self.guests = get_guest_ids()
 
-    def _create_guest_user(self) -> int:
-        db = SessionLocal()
-        try:
-            print("Creating guest user...")
-            guest_user = User(
-                email=f"guest_{uuid.uuid4()}@wellchemy.ai",
-                password_hash="auto-created",
-                first_login=datetime.utcnow(),
-                last_login=datetime.utcnow()
-            )
-            db.add(guest_user)
-            db.commit()
-            db.refresh(guest_user)
-            print(f"Guest user created with ID: {guest_user.user_id}")
-            return guest_user.user_id
-        except Exception as e:
-            print(f"Error creating guest user: {str(e)}\n{traceback.format_exc()}")
-            db.rollback()
-            raise
-        finally:
-            db.close()
-
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             user_id = input_data.get("user_id", "default")
             message = input_data.get("message", "").strip()
@@ -68,10 +48,8 @@ You ask a series of questions to determine if a user qualifies for a program. Th
             print(f"Processing eligibility request - User ID: {user_id}, Message: {message}")
 
             if user_id == "default" or user_id is None:
-                if not self.state:
-                    user_id = self._create_guest_user()
-                else:
-                    user_id = next(iter(self.state.keys()))
+                # Every anonymous visitor gets their own id (never another user's session)
+                user_id = await self.guests.new()
 
             if user_id not in self.state:
                 self.state[user_id] = {
@@ -82,7 +60,7 @@ You ask a series of questions to determine if a user qualifies for a program. Th
                 }
                 return self._format_response(True, "Starting eligibility assessment", {
                     "response": f"{self.initial_prompt}\n\n{self.questions[0]['question']}"
-                })
+                }, user_id=user_id)
 
             user_state = self.state[user_id]
             index = user_state["index"]
@@ -129,23 +107,7 @@ You ask a series of questions to determine if a user qualifies for a program. Th
                 user_state["index"] = index
                 if index >= len(self.unbranch_questions):
                     answers = user_state["answers"]
-                    db = SessionLocal()
-                    try:
-                        print(f"Saving eligibility assessment for user {user_id}")
-                        record = EligibilityAssessment(
-                            user_id=user_id,
-                            answers=answers,
-                            date_taken=datetime.utcnow()
-                        )
-                        db.add(record)
-                        db.commit()
-                        print("Eligibility assessment saved successfully")
-                    except Exception as e:
-                        print(f"Error saving eligibility assessment: {str(e)}\n{traceback.format_exc()}")
-                        db.rollback()
-                        raise
-                    finally:
-                        db.close()
+                    await asyncio.to_thread(self._save_assessment, user_id, answers)
 
                     del self.state[user_id]
 
@@ -160,6 +122,26 @@ You ask a series of questions to determine if a user qualifies for a program. Th
             print(error_msg)
             return self._format_response(False, "Error", {"error": str(e)})
 
+    def _save_assessment(self, user_id, answers):
+        db = SessionLocal()
+        try:
+            print(f"Saving eligibility assessment for user {user_id}")
+            record = EligibilityAssessment(
+                user_id=user_id,
+                answers=answers,
+                date_taken=datetime.utcnow()
+            )
+            ensure_user(db, user_id)  # a guest's users row is written with their first saved data
+            db.add(record)
+            db.commit()
+            print("Eligibility assessment saved successfully")
+        except Exception as e:
+            print(f"Error saving eligibility assessment: {str(e)}\n{traceback.format_exc()}")
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
     def _get_last_question(self, user_state):
         stage = user_state["stage"]
         index = user_state["index"]
@@ -0,0 +1,154 @@
+"""
+Deterministic parser for free-form food frequency answers.
+
+Turns answers like "daily", "2-3 times a week", "twice a day" or "once a month"
+into a times-per-week number without an LLM round trip. When an answer is
+ambiguous the parser returns None so the caller can fall back to the LLM.
+"""
+
+import re
+from typing import Optional
+from metrics import counter
+
+WEEKS_PER_MONTH = 4.345
+
+# Normalized buckets used by the ACLM screener, lowest to highest
+BUCKETS = ["Never", "Less than 1x/week", "1-3x/week", "4-6x/week", "1-2x/day", "More than 3x/day"]
+
+NORMALIZER_PROMPT = (
+    "You are a frequency normalizer. Given a user's freeform description of how often they consume a food, "
+    "convert it into one of: Never, Less than 1x/week, 1-3x/week, 4-6x/week, 1-2x/day, More than 3x/day. "
+    "Only return the normalized option exactly."
+)
+
+NUMBER_WORDS = {
+    "zero": 0, "none": 0, "one": 1, "once": 1, "a": 1, "an": 1, "two": 2, "twice": 2, "couple": 2,
+    "three": 3, "thrice": 3, "few": 3, "four": 4, "several": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fourteen": 14, "twenty": 20
+}
+
+UNIT_PER_WEEK = {
+    "day": 7, "daily": 7, "night": 7, "nightly": 7, "meal": 21,
+    "week": 1, "weekly": 1, "wk": 1,
+    "month": 1 / WEEKS_PER_MONTH, "monthly": 1 / WEEKS_PER_MONTH, "mo": 1 / WEEKS_PER_MONTH,
+    "year": 1 / 52, "yearly": 1 / 52, "yr": 1 / 52
+}
+
+# Longest phrases first so "every other day" wins over "every day"
+PHRASES = {
+    "not at all": 0, "never": 0, "none": 0, "zero": 0,
+    "don't eat": 0, "dont eat": 0, "do not eat": 0, "don't drink": 0, "dont drink": 0, "do not drink": 0,
+    "every other day": 3.5, "every day": 7, "everyday": 7, "every night": 7, "daily": 7,
+    "all the time": 7, "constantly": 7, "most days": 5, "frequently": 5, "often": 5,
+    "regularly": 5, "every week": 1, "weekly": 1, "sometimes": 3, "occasionally": 2,
+    "now and then": 2, "once in a while": 1,
+    "hardly ever": 1, "rarely": 1, "seldom": 1, "monthly": 1 / WEEKS_PER_MONTH
+}
+
+# Whole answers that mean zero but are too short to treat as phrases ("no idea" is not zero)
+ZERO_ANSWERS = {"no", "nope", "nah", "n/a", "0x"}
+
+NEGATIONS = re.compile(r"\b(?:not|don'?t|do not|doesn'?t|no longer|isn'?t)\b")
+
+_number = r"\d+(?:\.\d+)?|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+_unit = "|".join(sorted(UNIT_PER_WEEK, key=len, reverse=True))
+
+QUANTITY = re.compile(
+    rf"(?P<cmp>less than|fewer than|under|more than|over|at least)?\s*"
+    rf"\b(?P<lo>{_number})(?=x|\b)"
+    rf"(?:\s*(?:-|to|or)\s*(?P<hi>{_number})(?=x|\b))?"
+    rf"(?:\s*(?:x|times?|days?|nights?|servings?|cups?|glasses?|meals?|portions?|pieces?))?"
+    rf"\s*(?:a|an|per|each|every|/|in a|in the)?\s*"
+    rf"\b(?P<unit>{_unit})s?\b"
+)
+PHRASE = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in sorted(PHRASES, key=len, reverse=True)) + r")\b")
+BARE_NUMBER = re.compile(
+    rf"^\s*(?:about|around|maybe|roughly|like)?\s*(?P<lo>{_number})"
+    rf"(?:\s*(?:-|to|or)\s*(?P<hi>{_number}))?\s*(?:x|times?|days?)?\s*\.?\s*$"
+)
+
+parse_outcomes = counter(
+    "frequency_parse_total",
+    "Frequency answers by how they were resolved (parsed locally or via LLM fallback)",
+    labels=("outcome",)
+)
+
+
+def _to_number(token: str) -> float:
+    token = token.strip()
+    if token in NUMBER_WORDS:
+        return float(NUMBER_WORDS[token])
+    return float(token)
+
+
+def _amount(match) -> float:
+    lo = _to_number(match.group("lo"))
+    hi = match.group("hi")
+    return (lo + _to_number(hi)) / 2 if hi else lo
+
+
+def parse_frequency(answer: str) -> Optional[float]:
+    """
+    Parse a free-form answer into times per week.
+
+    Returns None when the answer is empty, unrecognized or ambiguous (for example
+    two different frequencies, or a negated frequency like "not every day").
+    """
+    text = answer.strip().lower().replace("–", "-").replace("—", "-")
+    if not text:
+        return None
+    if text.rstrip(".!") in ZERO_ANSWERS:
+        return 0.0
+
+    bare = BARE_NUMBER.match(text)
+    if bare:
+        return _amount(bare)
+
+    values = set()
+    for match in QUANTITY.finditer(text):
+        value = _amount(match) * UNIT_PER_WEEK[match.group("unit")]
+        comparator = match.group("cmp")
+        if comparator in ("less than", "fewer than", "under"):
+            value /= 2
+        values.add(round(value, 3))
+
+    # Phrases only count where no explicit quantity already covered the answer
+    remainder = QUANTITY.sub(" ", text)
+    for match in PHRASE.finditer(remainder):
+        values.add(round(PHRASES[match.group(0)], 3))
+
+    if len(values) != 1:
+        return None
+    value = values.pop()
+    if value > 0 and NEGATIONS.search(text):
+        return None
+    return value
+
+
+def to_bucket(per_week: float) -> str:
+    """Map a times-per-week number onto the screener's six buckets."""
+    if per_week <= 0:
+        return BUCKETS[0]
+    if per_week < 1:
+        return BUCKETS[1]
+    if per_week < 3.5:
+        return BUCKETS[2]
+    if per_week < 7:
+        return BUCKETS[3]
+    if per_week <= 14:
+        return BUCKETS[4]
+    return BUCKETS[5]
+
+
+def normalizer_messages(answer: str):
+    """Messages for the LLM fallback; the reply is one of BUCKETS."""
+    return [
+        {"role": "system", "content": NORMALIZER_PROMPT},
+        {"role": "user", "content": answer}
+    ]
+
+
+def fallback_rate() -> float:
+    """Share of answers that needed the LLM fallback."""
+    total = parse_outcomes.total()
+    return parse_outcomes.value(outcome="llm_fallback") / total if total else 0.0
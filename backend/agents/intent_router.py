@@ -0,0 +1,153 @@
+"""
+Local intent classifier for chat messages.
+
+Resolves the common intents (yes/no to a suggested next step, asking for the
+diet assessment, an eligibility check or a prescription) with one compiled,
+word-boundary-aware pattern instead of a GPT-4 function-calling round trip.
+Each result carries a confidence; callers escalate to the LLM below
+CONFIDENCE_THRESHOLD.
+"""
+
+import os
+import re
+from typing import NamedTuple
+from metrics import counter, gauge
+
+AFFIRM = "affirm"
+DECLINE = "decline"
+UNSURE = "unsure"
+DIET = "diet"
+ELIGIBILITY = "eligibility"
+PRESCRIPTION = "prescription"
+UNKNOWN = "unknown"
+
+# A reply's polarity and what it is about are scored separately: "yes, start the diet assessment" is both
+POLARITY = (AFFIRM, DECLINE, UNSURE)
+TOPICS = (DIET, ELIGIBILITY, PRESCRIPTION)
+
+CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+# Replies longer than this are rarely a bare yes/no ("yes, but what about carbs?")
+SHORT_REPLY_WORDS = 6
+
+# intent -> [(regex fragment, confidence)]
+PATTERNS = {
+    AFFIRM: [
+        (r"yes|yeah|yep|yup|ya|sure|ok|okay|k|alright|all right|definitely|absolutely|of course|certainly", 0.9),
+        (r"let'?s go|let'?s do it|sounds good|sounds great|i'?m ready|i'?m in|go ahead|why not", 0.9)
+    ],
+    DECLINE: [
+        (r"no|nope|nah|not now|not today|no thanks|no thank you|skip|later|maybe later|not interested", 0.9)
+    ],
+    UNSURE: [
+        (r"not sure|unsure|i don'?t know|i do not know|dunno|maybe|no idea", 0.9)
+    ],
+    DIET: [
+        (r"diet (?:assessment|screener|quiz|check)|assess(?:ment of)? my diet|(?:take|start|do|begin) (?:the |a |my )?diet", 0.95),
+        (r"(?:food|eating|nutrition) (?:assessment|screener|quiz)|what i eat|my eating habits", 0.9),
+        (r"diet|nutrition", 0.6)
+    ],
+    ELIGIBILITY: [
+        (r"eligib\w*|do i qualify|am i qualified|(?:check|see) if i qualify|am i covered|check (?:my )?coverage", 0.95),
+        (r"qualify|insurance|coverage|covered", 0.6)
+    ],
+    PRESCRIPTION: [
+        (r"prescriptions?", 0.95)
+    ]
+}
+
+# Questions asking *about* something ("what is the diet assessment?") shouldn't start it
+INFO_QUESTION = re.compile(r"^(?:what|how|why|who|when|where|tell me|explain|can you explain)\b")
+
+
+def _split_alternatives(fragment: str):
+    """Split a fragment on top-level '|' only, leaving groups intact."""
+    parts, depth, current = [], 0, ""
+    for char in fragment:
+        depth += char == "("
+        depth -= char == ")"
+        if char == "|" and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    return parts + [current]
+
+
+def _compile():
+    alternatives = [
+        (phrase, intent, confidence)
+        for intent, fragments in PATTERNS.items()
+        for fragment, confidence in fragments
+        for phrase in _split_alternatives(fragment)
+    ]
+    # Longest first, so "not sure" wins over "sure" and "no thanks" over "no"
+    alternatives.sort(key=lambda alt: len(alt[0]), reverse=True)
+    groups = "|".join(f"(?P<p{i}>{phrase})" for i, (phrase, _, _) in enumerate(alternatives))
+    lookup = {f"p{i}": (intent, confidence) for i, (_, intent, confidence) in enumerate(alternatives)}
+    return re.compile(rf"\b(?:{groups})\b"), lookup
+
+
+INTENT_PATTERN, _GROUP_INTENTS = _compile()
+
+intent_outcomes = counter(
+    "intent_routing_total",
+    "Chat messages by detected intent and how they were routed (local, or escalated to the LLM)",
+    labels=("intent", "outcome")
+)
+escalation_ratio = gauge("intent_escalation_ratio", "Share of routed chat messages that needed the LLM")
+
+
+class Intent(NamedTuple):
+    name: str
+    confidence: float
+
+    @property
+    def confident(self) -> bool:
+        return self.name != UNKNOWN and self.confidence >= CONFIDENCE_THRESHOLD
+
+
+def _best(scores):
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    name, confidence = ranked[0]
+    # Competing signals are only as certain as the margin between them
+    return name, confidence - (ranked[1][1] if len(ranked) > 1 else 0.0)
+
+
+def classify(message: str) -> Intent:
+    """Return the most likely intent for a chat message and how sure we are."""
+    text = " ".join(message.strip().lower().replace("’", "'").split())
+    scores = {}
+    for match in INTENT_PATTERN.finditer(text):
+        intent, confidence = _GROUP_INTENTS[match.lastgroup]
+        scores[intent] = max(scores.get(intent, 0.0), confidence)
+    if not scores:
+        return Intent(UNKNOWN, 0.0)
+
+    polarity = {k: v for k, v in scores.items() if k in POLARITY}
+    topics = {k: v for k, v in scores.items() if k in TOPICS}
+
+    if topics:
+        name, confidence = _best(topics)
+        if DECLINE in polarity or UNSURE in polarity:
+            confidence = 0.0
+        if INFO_QUESTION.match(text):
+            confidence *= 0.5
+    else:
+        name, confidence = _best(polarity)
+        if len(polarity) > 1:
+            confidence = 0.0
+        words = len(text.split())
+        if words > SHORT_REPLY_WORDS:
+            confidence *= SHORT_REPLY_WORDS / words
+        if text.endswith("?"):
+            confidence *= 0.5
+    return Intent(name, round(max(confidence, 0.0), 3))
+
+
+def record_routing(intent: Intent, escalated: bool) -> None:
+    """Count how a message was routed and refresh the escalation ratio."""
+    intent_outcomes.inc(intent=intent.name, outcome="escalated" if escalated else "local")
+    total = intent_outcomes.total()
+    escalated_total = sum(intent_outcomes.value(intent=name, outcome="escalated") for name in POLARITY + TOPICS + (UNKNOWN,))
+    escalation_ratio.set(round(escalated_total / total, 4) if total else 0.0)
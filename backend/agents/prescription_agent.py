@@ -16,7 +16,7 @@ class PrescriptionAgent(BaseAgent):
         with open(os.path.join(data_dir, "inventory.json")) as f:
             self.inventory = json.load(f)
 
-    def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process prescription-related requests."""
         try:
             user_id = input_data.get("user_id")
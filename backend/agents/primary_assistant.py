@@ -1,16 +1,28 @@
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Awaitable, Optional, Tuple
+from types import SimpleNamespace
 from .base_agent import BaseAgent
 from .conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
 from .user_agent import UserAgent
 from .conversational_eligibility_agent import ConversationalEligibilityAgent
 from .prescription_agent import PrescriptionAgent
+from .conversation_memory import ConversationMemory, summary_messages
+from .intent_router import AFFIRM, DECLINE, DIET, ELIGIBILITY, PRESCRIPTION, classify, record_routing
+from llm.router import ADVICE, SUMMARIZE
+from llm.resilience import CHAT_DEADLINE_SECONDS, Deadline, DeadlineExceeded, LLMUnavailable, deadline_scope, llm_unavailable
+from sessions import SessionManager, SessionMap, open_checkpoint_store
+from sessions.progress import active_flow
+from transcript import CHAT_TRANSCRIPTS, get_transcript_logger
 import os
 import json
 import re
+import asyncio
+import contextvars
 
 EMAIL_REGEX = r"[^@]+@[^@]+\.[^@]+"
-NO_KEYWORDS = ["no", "not now", "skip", "later", "not interested"]
-YES_KEYWORDS = ["yes", "ok", "sure", "yeah", "yep", "let's go", "sounds good", "definitely", "absolutely", "of course"]
+DEFAULT_REPLY = "I'm here to assist with diet assessments, eligibility checks, or wellness guidance. How can I help you today?"
+
+# Which agent answered the current message (ChatMessage.agent_type in the transcript)
+_handled_by: contextvars.ContextVar[str] = contextvars.ContextVar("handled_by", default="primary")
 
 class PrimaryAssistant(BaseAgent):
     """Primary AI assistant that routes requests to specialized agents as needed, with flow suggestions embedded in AI responses."""
@@ -35,8 +47,22 @@ class PrimaryAssistant(BaseAgent):
         self.prescription_agent = PrescriptionAgent(self.programs, self.chronic_condition_diet_mapping)
         self.user_agent = UserAgent()
 
-        self.user_sessions = {}    # user_id -> 'diet', 'eligibility'
-        self.user_progress = {}    # user_id -> { "onboarded": False, "skipped_onboarding": False, "diet_done": False, "eligibility_done": False }
+        # Kept in the shared session store so any worker can pick up the next message
+        self.user_sessions = SessionMap("flow")        # user_id -> 'diet', 'eligibility'
+        self.user_progress = SessionMap("progress")    # user_id -> { "onboarded": False, "skipped_onboarding": False, "diet_done": False, "eligibility_done": False }
+        self.memory = ConversationMemory(self._summarize)  # free-form chat history, token-bounded
+
+        # Abandoned sessions are evicted after an idle TTL (optionally checkpointed for resumption)
+        self.sessions = SessionManager(
+            [self.user_sessions, self.user_progress, self.dietary_assessment_agent.state, self.eligibility_agent.state],
+            checkpoint=open_checkpoint_store()
+        )
+        self.sessions.on_evict(self.memory.forget)
+        self.sessions.on_evict(self.dietary_assessment_agent.prefetcher.cancel)
+        self.sessions.on_evict(self.eligibility_agent.prefetcher.cancel)
+
+        # Every exchange is logged to chat_messages in the background (see transcript.py)
+        self.transcripts = get_transcript_logger() if CHAT_TRANSCRIPTS else None
 
         self.functions = [
             {
@@ -63,12 +89,53 @@ class PrimaryAssistant(BaseAgent):
             }
         ]
 
-    def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, data: Dict[str, Any], on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """
+        Route a chat message and return the response envelope.
+
+        If on_token is given, free-form GPT replies are streamed through it token by
+        token as they arrive; the full envelope is still returned at the end.
+
+        data["deadline"] (a Deadline) bounds every LLM call made for this message,
+        defaulting to CHAT_DEADLINE_SECONDS (or the router's request budget) from
+        now. Sub-agents run inside the same deadline scope and fall back to static
+        text rather than overrun it.
+        """
+        deadline = data.get("deadline") or Deadline.after(CHAT_DEADLINE_SECONDS or self.router.request_budget())
+        _handled_by.set("primary")
+        with deadline_scope(deadline):
+            response = await self._route(data, deadline, on_token)
+
+        # A sub-agent may have created a guest user; its session needs tracking too
+        resolved = response.get("data", {}).get("user_id")
+        if resolved is not None and str(resolved) != str(data.get("user_id")):
+            await self.sessions.touch(resolved)
+        await self._record_transcript(data, response)
+        return response
+
+    async def _delegate(self, agent_type: str, agent: BaseAgent, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Hand the message to a sub-agent, noting it as the one that answered."""
+        _handled_by.set(agent_type)
+        return await agent.process(input_data)
+
+    async def _record_transcript(self, data: Dict[str, Any], response: Dict[str, Any]) -> None:
+        """Buffer the exchange for the chat_messages transcript (never blocks on the database)."""
+        payload = response.get("data", {})
+        user_id = payload.get("user_id", data.get("user_id"))
+        if self.transcripts is None or not str(user_id).isdigit():
+            return  # no user to attach it to (e.g. the "default" welcome)
+        reply = payload.get("response") or payload.get("error") or response.get("message", "")
+        await self.transcripts.record(int(user_id), data.get("message", ""), reply, _handled_by.get())
+
+    async def _route(self, data: Dict[str, Any], deadline: Deadline,
+                     on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         user_message = data.get("message", "")
         user_id = data.get("user_id", "default")
+        intent = classify(user_message)
 
-        if "prescription" in user_message.lower():
-            print("💊 Prescription keyword detected — generating prescription...")
+        if intent.name == PRESCRIPTION and intent.confident:
+            print("💊 Prescription intent detected — generating prescription...")
+            record_routing(intent, escalated=False)
             # For now, hardcode a sample diet and eligibility assessment
             diet_assessment = {
                 "vegetarian": True
@@ -77,6 +144,7 @@ class PrimaryAssistant(BaseAgent):
                 "chronic_conditions": ["Hypertension"],
                 "dietary_restrictions": ["shellfish"]
             }
+            _handled_by.set("prescription")
             try:
                 orders = self.prescription_agent.generate_prescription(user_id, diet_assessment, eligibility_assessment)
                 # Format the orders nicely
@@ -110,78 +178,93 @@ class PrimaryAssistant(BaseAgent):
         if not user_id:
             return self._format_response(False, "Missing user ID", {"error": "User ID is required."}, user_id=user_id)
 
-        if user_id not in self.user_progress:
-            self.user_progress[user_id] = {
+        await self.sessions.touch(user_id)
+        progress = await self.user_progress.get(user_id)
+        if progress is None:
+            progress = {
                 "onboarded": False,
                 "skipped_onboarding": False,
                 "diet_done": False,
                 "eligibility_done": False
             }
-
-        progress = self.user_progress[user_id]
+            await self.user_progress.put(user_id, progress)
+            # First message since a restart or eviction: pick up an unfinished assessment
+            try:
+                flow = await asyncio.to_thread(active_flow, user_id)
+            except Exception as e:
+                print(f"⚠️ Could not look up assessment progress for user {user_id}: {e}")
+                flow = None
+            if flow is not None:
+                await self.user_sessions.put(user_id, flow)
 
         # Check if user is mid-session
-        current = self.user_sessions.get(user_id)
+        current = await self.user_sessions.get(user_id)
         if current == "diet":
             print("🔄 Routing to conversational diet agent")
-            response = self.dietary_assessment_agent.process({"message": user_message, "user_id": user_id})
+            response = await self._delegate("dietary", self.dietary_assessment_agent, {"message": user_message, "user_id": user_id})
             if response.get("success") and response.get("message") == "Assessment complete":
-                self.user_sessions.pop(user_id, None)
-                self.user_progress[user_id]["diet_done"] = True
+                await self.user_sessions.pop(user_id)
+                progress["diet_done"] = True
+                await self.user_progress.put(user_id, progress)
             return response
 
         if current == "eligibility":
             print("🔄 Routing to eligibility agent")
-            response = self.eligibility_agent.process({"message": user_message, "user_id": user_id})
+            response = await self._delegate("eligibility", self.eligibility_agent, {"message": user_message, "user_id": user_id})
             if response.get("message") == "Eligibility assessment complete":
-                self.user_sessions.pop(user_id, None)
-                self.user_progress[user_id]["eligibility_done"] = True
+                await self.user_sessions.pop(user_id)
+                progress["eligibility_done"] = True
+                await self.user_progress.put(user_id, progress)
             return response
 
-        # --- Detect positive response to flow suggestion ---
-        if self._is_positive_response(user_message):
-            if not progress["diet_done"]:
-                print("✅ Positive response detected — Starting Diet Assessment")
-                self.user_sessions[user_id] = "diet"
-                return self.dietary_assessment_agent.process({"message": "", "user_id": user_id})
-            if not progress["eligibility_done"]:
-                print("✅ Positive response detected — Starting Eligibility Check")
-                self.user_sessions[user_id] = "eligibility"
-                return self.eligibility_agent.process({"message": "", "user_id": user_id})
+        # --- Detect a yes to the flow suggestion, or a direct request for a flow ---
+        if intent.confident:
+            start_diet = (intent.name == AFFIRM or intent.name == DIET) and not progress["diet_done"]
+            start_eligibility = (
+                (intent.name == AFFIRM and progress["diet_done"]) or intent.name == ELIGIBILITY
+            ) and not progress["eligibility_done"]
+            if start_diet:
+                print(f"✅ {intent.name} intent detected — Starting Diet Assessment")
+                record_routing(intent, escalated=False)
+                await self.user_sessions.put(user_id, "diet")
+                return await self._delegate("dietary", self.dietary_assessment_agent, {"message": "", "user_id": user_id})
+            if start_eligibility:
+                print(f"✅ {intent.name} intent detected — Starting Eligibility Check")
+                record_routing(intent, escalated=False)
+                await self.user_sessions.put(user_id, "eligibility")
+                return await self._delegate("eligibility", self.eligibility_agent, {"message": "", "user_id": user_id})
 
         # --- Handle email onboarding logic ---
         if not progress["onboarded"] and not progress["skipped_onboarding"]:
-            message_lower = user_message.strip().lower()
-
             if re.match(EMAIL_REGEX, user_message.strip()):
                 print(f"📧 Detected email {user_message.strip()}, onboarding user...")
-                response = self.user_agent.process({"email": user_message.strip()})
+                response = await self._delegate("user", self.user_agent, {"email": user_message.strip()})
                 if response.get("success"):
-                    self.user_progress[user_id]["onboarded"] = True
+                    progress["onboarded"] = True
+                    await self.user_progress.put(user_id, progress)
                     return self._format_response(True, "Onboarding", {
                         "response": response.get("data", {}).get("response", "Welcome!")
                     }, user_id=user_id)
                 return response
 
-            elif any(kw in message_lower for kw in NO_KEYWORDS):
+            elif intent.name == DECLINE and intent.confident:
                 print(f"🙅 User declined onboarding.")
-                self.user_progress[user_id]["skipped_onboarding"] = True
+                progress["skipped_onboarding"] = True
+                await self.user_progress.put(user_id, progress)
 
         # --- Proceed to OpenAI with progress-aware nudging inside system prompt ---
         use_openai = os.getenv("USE_OPENAI", "true").lower() == "true"
+        record_routing(intent, escalated=use_openai)
         if use_openai:
-            return self._handle_openai_fallback(user_message, user_id, progress)
+            return await self._handle_openai_fallback(user_message, user_id, progress, deadline, on_token)
 
         print("⚠️ Skipping OpenAI (USE_OPENAI is false)")
         return self._format_response(True, "Default reply", {
-            "response": "I'm here to assist with diet assessments, eligibility checks, or wellness guidance. How can I help you today?"
+            "response": DEFAULT_REPLY
         }, user_id=user_id)
 
-    def _is_positive_response(self, message: str) -> bool:
-        message_lower = message.strip().lower()
-        return any(kw in message_lower for kw in YES_KEYWORDS)
-
-    def _handle_openai_fallback(self, user_message: str, user_id: str, progress: Dict[str, bool]) -> Dict[str, Any]:
+    async def _handle_openai_fallback(self, user_message: str, user_id: str, progress: Dict[str, bool], deadline: Deadline,
+                                      on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         """Let OpenAI decide what to do with user's message, with progress-aware nudging."""
         try:
             system_prompt = f"""
@@ -201,42 +284,108 @@ Remember:
 - Be helpful, professional, and conversational.
             """
 
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User ID: {user_id}\nMessage: {user_message}"}
-                ],
-                functions=self.functions,
-                function_call="auto"
-            )
-            choice = response.choices[0]
-            if choice.finish_reason == "function_call":
-                func_call = choice.message.function_call
+            messages = [
+                {"role": "system", "content": system_prompt},
+                *self.memory.context(user_id),
+                {"role": "user", "content": f"User ID: {user_id}\nMessage: {user_message}"}
+            ]
+            if on_token is None:
+                response = await self.create_completion(
+                    messages,
+                    task=ADVICE,
+                    functions=self.functions,
+                    function_call="auto"
+                )
+                choice = response.choices[0]
+                finish_reason, content, func_call = choice.finish_reason, choice.message.content, choice.message.function_call
+            else:
+                finish_reason, content, func_call = await self._stream_completion(messages, on_token, deadline)
+
+            if finish_reason == "function_call":
                 function_name = func_call.name
                 arguments = json.loads(func_call.arguments)
                 called_user_id = arguments["user_id"]
 
                 if function_name == "start_diet_assessment":
                     print("✅ Starting diet assessment via function call")
-                    self.user_sessions[called_user_id] = "diet"
-                    return self.dietary_assessment_agent.process({"message": "", "user_id": called_user_id})
+                    await self.user_sessions.put(called_user_id, "diet")
+                    return await self._delegate("dietary", self.dietary_assessment_agent, {"message": "", "user_id": called_user_id})
 
                 elif function_name == "check_eligibility":
                     print("✅ Starting eligibility check via function call")
-                    self.user_sessions[called_user_id] = "eligibility"
-                    return self.eligibility_agent.process({"message": "", "user_id": called_user_id})
+                    await self.user_sessions.put(called_user_id, "eligibility")
+                    return await self._delegate("eligibility", self.eligibility_agent, {"message": "", "user_id": called_user_id})
 
             else:
-                content = getattr(choice.message, 'content', None)
                 if not content:
-                    content = "I'm here to assist with diet assessments, eligibility checks, or wellness guidance. How can I help you today?"
+                    content = DEFAULT_REPLY
+                self.memory.add(user_id, "user", user_message)
+                self.memory.add(user_id, "assistant", content)
                 return self._format_response(True, "Response generated by GPT", {
                     "response": content
                 }, user_id=user_id)
 
+        except LLMUnavailable as e:
+            self._template_fallback(e)
+            return self._format_response(True, "Default reply", {
+                "response": DEFAULT_REPLY
+            }, user_id=user_id)
+
         except Exception as e:
             print(f"❌ Error using OpenAI function calling: {e}")
             return self._format_response(False, "OpenAI call failed", {
                 "error": str(e)
             }, user_id=user_id)
+
+    async def _summarize(self, summary: str, turns) -> str:
+        """Fold older chat turns into the user's rolling summary with a cheap model."""
+        response = await self.create_completion(summary_messages(summary, turns), task=SUMMARIZE)
+        return response.choices[0].message.content or summary
+
+    async def _stream_completion(self, messages, on_token: Callable[[str], Awaitable[None]],
+                                 deadline: Deadline) -> Tuple[str, Optional[str], Any]:
+        """
+        Stream a function-calling completion, forwarding content tokens as they arrive.
+
+        The whole stream, not just its first chunk, must finish by the deadline. If it
+        runs out mid-reply the tokens already sent are kept as the answer.
+        """
+        stream = await self.create_completion(
+            messages,
+            task=ADVICE,
+            functions=self.functions,
+            function_call="auto",
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        finish_reason = None
+        content_parts = []
+        func_call = SimpleNamespace(name="", arguments="")
+
+        async def consume():
+            nonlocal finish_reason
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    await on_token(delta.content)
+                if delta.function_call:
+                    func_call.name += delta.function_call.name or ""
+                    func_call.arguments += delta.function_call.arguments or ""
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+
+        try:
+            await asyncio.wait_for(consume(), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            llm_unavailable.inc(agent=type(self).__name__, reason="deadline")
+            close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+            if close is not None:
+                await close()  # hand the connection back to the pool
+            if not content_parts:
+                raise DeadlineExceeded("LLM stream exceeded the request deadline")
+            finish_reason = "length"
+        return finish_reason, "".join(content_parts), func_call
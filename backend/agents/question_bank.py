@@ -0,0 +1,73 @@
+import os
+import json
+import random
+import asyncio
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Callable, Awaitable
+
+DEFAULT_BANK_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'diet_question_bank.json')
+
+
+class QuestionBank:
+    """Pre-rendered question variants per diet category, served from memory."""
+
+    def __init__(self, questions: Dict[str, List[str]] = None, path: str = None):
+        self.questions = questions or {}
+        self.path = path or os.getenv("DIET_QUESTION_BANK_PATH", DEFAULT_BANK_PATH)
+
+    @classmethod
+    def load(cls, path: str = None) -> "QuestionBank":
+        """Load the bank from disk, returning an empty bank if the file does not exist."""
+        bank = cls(path=path)
+        if os.path.exists(bank.path):
+            with open(bank.path) as f:
+                bank.questions = json.load(f).get("questions", {})
+        return bank
+
+    def save(self, model: str = None) -> None:
+        with open(self.path, "w") as f:
+            json.dump({
+                "version": 1,
+                "source": "generated",
+                "model": model,
+                "generated_at": datetime.utcnow().isoformat(),
+                "questions": self.questions
+            }, f, indent=2, ensure_ascii=False)
+
+    def get(self, category: str) -> Optional[str]:
+        """Return a random variant for the category, or None if the bank has none."""
+        variants = self.questions.get(category)
+        if not variants:
+            return None
+        return random.choice(variants)
+
+    def __contains__(self, category: str) -> bool:
+        return bool(self.questions.get(category))
+
+    async def build(self, categories: List[str], generate: Callable[[int], Awaitable[str]], variants: int = 3) -> None:
+        """Generate `variants` phrasings for every category concurrently."""
+        async def _variants_for(index: int) -> List[str]:
+            results = await asyncio.gather(*(generate(index) for _ in range(variants)))
+            # Drop empty and duplicate phrasings while keeping order
+            return list(dict.fromkeys(r.strip() for r in results if r and r.strip()))
+
+        generated = await asyncio.gather(*(_variants_for(i) for i in range(len(categories))))
+        self.questions = {category: qs for category, qs in zip(categories, generated) if qs}
+
+
+async def _build_cli(variants: int, output: str = None) -> None:
+    from .conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
+
+    agent = ConversationalDietaryAssessmentAgent()
+    print(f"🏗️ Generating {variants} variants for {len(agent.categories)} categories...")
+    bank = await agent.build_question_bank(variants, output)
+    print(f"✅ Question bank written to {bank.path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the diet screener question bank.")
+    parser.add_argument("--variants", type=int, default=3, help="Phrasings to generate per category")
+    parser.add_argument("--output", help="Where to write the bank (defaults to data/diet_question_bank.json)")
+    args = parser.parse_args()
+    asyncio.run(_build_cli(args.variants, args.output))
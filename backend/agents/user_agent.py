@@ -1,4 +1,5 @@
 from typing import Dict, Any
+import asyncio
 from .base_agent import BaseAgent
 from sqlalchemy.orm import Session
 from db_connection import SessionLocal
@@ -12,7 +13,10 @@ class UserAgent(BaseAgent):
         super().__init__()
         self.system_message = """You are the user management assistant for Wellchemy."""
 
-    def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._onboard, data)
+
+    def _onboard(self, data: Dict[str, Any]) -> Dict[str, Any]:
         db: Session = SessionLocal()
         try:
             email = data.get("email", "guest@wellchemy.ai")
@@ -1,38 +1,127 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import os
+import json
+import asyncio
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
 from dotenv import load_dotenv
 from agents import PrimaryAssistant
+from llm import close_llm_backend, get_completion_cache
+from llm.instrumentation import track_request_usage
+from metrics import render_prometheus
+from sessions import close_session_store
+from sessions.progress import get_progress_writer
+from transcript import get_transcript_logger
+from write_behind import get_write_behind
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app, resources={
-    r"/*": {
-        "origins": ["http://localhost:3000"],
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
-    }
-})
+app = Quart(__name__)
+app = cors(
+    app,
+    allow_origin=["http://localhost:3000"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type"]
+)
 
 primary_assistant = PrimaryAssistant()
 
+@app.before_serving
+async def startup():
+    primary_assistant.sessions.start()
+
+    diet_agent = primary_assistant.dietary_assessment_agent
+    autobuild = os.getenv("DIET_QUESTION_BANK_AUTOBUILD", "false").lower() == "true"
+    if autobuild and not diet_agent.question_bank.questions:
+        print("🏗️ Question bank missing — building it in the background")
+        app.add_background_task(diet_agent.build_question_bank)
+
+    if os.getenv("LLM_CACHE_WARM", "false").lower() == "true":
+        print("🔥 Warming eligibility question cache in the background")
+        app.add_background_task(primary_assistant.eligibility_agent.warm_cache)
+
+@app.after_serving
+async def shutdown():
+    get_completion_cache().save()
+    await close_llm_backend()
+    await primary_assistant.sessions.stop()
+    await get_progress_writer().flush()
+    await get_transcript_logger().close()
+    await get_write_behind().close()
+    await close_session_store()
+
 @app.route('/chat', methods=['POST'])
-def chat():
+async def chat():
     """Unified chat entry point for all agents via PrimaryAssistant."""
     try:
-        data = request.get_json()
+        data = await request.get_json()
         if not data or 'message' not in data:
             return jsonify({'error': 'No message provided'}), 400
 
-        response = primary_assistant.process(data)
+        with track_request_usage() as usage:
+            response = await primary_assistant.process(data)
+        if app.debug:
+            response.setdefault("data", {})["llm_usage"] = usage
         return jsonify(response)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _sse(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Streaming variant of /chat using Server-Sent Events.
+
+    Emits `token` events as GPT generates free-form replies, a `usage` event
+    with the request's LLM token counts, then a single `done` event carrying the
+    same envelope /chat would have returned (or an `error` event instead).
+    """
+    data = await request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({'error': 'No message provided'}), 400
+
+    tokens: asyncio.Queue = asyncio.Queue()
+    with track_request_usage() as usage:
+        # The task copies the current context, so its LLM calls land in `usage`
+        task = asyncio.ensure_future(primary_assistant.process(data, on_token=tokens.put))
+
+    async def events():
+        try:
+            while True:
+                getter = asyncio.ensure_future(tokens.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield _sse('token', {'content': getter.result()})
+                    continue
+                getter.cancel()
+                # Drain anything queued between the last token and completion
+                while not tokens.empty():
+                    yield _sse('token', {'content': tokens.get_nowait()})
+                break
+            response = task.result()
+            yield _sse('usage', {key: usage[key] for key in ('calls', 'prompt_tokens', 'completion_tokens')})
+            if app.debug:
+                response.setdefault("data", {})["llm_usage"] = usage
+            yield _sse('done', response)
+        except Exception as e:
+            yield _sse('error', {'error': str(e)})
+        finally:
+            task.cancel()
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus scrape endpoint (LLM latency/tokens/cost, parser and cache counters)."""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
-def health_check():
+async def health_check():
     return jsonify({'status': 'healthy'})
 
 if __name__ == '__main__':
@@ -0,0 +1,78 @@
+"""
+Offline load benchmark for the /chat stack.
+
+Drives concurrent simulated users through the diet screener and eligibility
+flow using the fake LLM backend and a throwaway database, then reports
+throughput and latency percentiles. Runs are reproducible for a given seed.
+
+    python bench_chat.py --users 200 --latency lognormal:800,0.5 --seed 42
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _simulate_user(client, user_number: int, rng: random.Random, latencies: list) -> None:
+    answers = ["daily", "never", "2-3 times a week", "occasionally", "most days", "3", "once a month"]
+    script = (
+        ["yes"]                                                   # start diet assessment
+        + [rng.choice(answers) for _ in range(26)]                # 26 diet categories
+        + ["yes", "32801", "florida blue", "FB123", "4", "diabetes", "none", "1 Main St"]
+    )
+    # Numeric ids so the diet agent can persist results against them
+    user_id = str(100000 + user_number)
+    for message in script:
+        started = time.perf_counter()
+        response = await client.post('/chat', json={"message": message, "user_id": user_id})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, await response.get_data()
+
+
+async def run(users: int, seed: int) -> None:
+    from app import app
+
+    rng = random.Random(seed)
+    latencies = []
+    started = time.perf_counter()
+    async with app.test_client() as client:
+        await asyncio.gather(*(_simulate_user(client, n, random.Random(rng.random()), latencies) for n in range(users)))
+    elapsed = time.perf_counter() - started
+
+    print(f"users={users} requests={len(latencies)} elapsed={elapsed:.2f}s throughput={len(latencies) / elapsed:.1f} req/s")
+    print(
+        f"latency p50={_percentile(latencies, 50) * 1000:.1f}ms "
+        f"p95={_percentile(latencies, 95) * 1000:.1f}ms "
+        f"p99={_percentile(latencies, 99) * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency", default="lognormal:800,0.5", help="Fake LLM latency spec (see llm/backends.py)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = args.latency
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from db_connection import engine
+    from models import Base
+    Base.metadata.create_all(engine)
+
+    asyncio.run(run(args.users, args.seed))
@@ -0,0 +1,89 @@
+"""
+SQLite throughput for concurrent assessment saves.
+
+Runs the conversational agents' _save_and_finish concurrently (diet results and
+eligibility answers) against a fresh database per SQLite profile, and reports
+durable saves per second: "legacy" is the library default (rollback journal,
+fsync per commit), "production" the tuned profile in db_connection.py.
+
+--mode direct commits every save in its own transaction from a worker thread,
+which is what the pragmas and pool are for; --mode write-behind commits them in
+shared batches through write_behind.py, as the app does. The default runs both.
+
+    python bench_db.py --saves 2000 --concurrency 32 --mode both
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+
+class _DirectWrites:
+    """Stands in for the write-behind queue: one transaction per write, committed in a worker thread."""
+
+    async def write(self, *operations) -> None:
+        from write_behind import _Write, _commit
+        await asyncio.to_thread(_commit, [_Write(list(operations), None)])
+
+
+async def _bench(profile: str, mode: str, saves: int, concurrency: int, directory: str) -> float:
+    import write_behind
+    from db_connection import SessionLocal, create_db_engine
+    from models import Base, reserve_user_ids
+    from agents.conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
+    from agents.conversational_eligibility_agent import ConversationalEligibilityAgent
+
+    engine = create_db_engine(f"sqlite:///{os.path.join(directory, f'{profile}-{mode}.db')}", profile)
+    Base.metadata.create_all(engine)
+    SessionLocal.configure(bind=engine)
+    with engine.begin() as connection:
+        first_id = reserve_user_ids(connection, saves)  # issued guest ids, as the agents would have handed out
+    write_behind._queue = _DirectWrites() if mode == "direct" else write_behind.WriteBehindQueue()
+
+    diet, eligibility = ConversationalDietaryAssessmentAgent(), ConversationalEligibilityAgent()
+    diet_answers = {category: 3 for category in diet.categories}
+    eligibility_answers = {"zip": "32801", "insurance_provider": "florida blue", "chronic_conditions": "diabetes"}
+    slots = asyncio.Semaphore(concurrency)
+
+    async def save(n: int) -> None:
+        async with slots:
+            if n % 2:
+                await diet._save_and_finish(n, diet_answers)
+            else:
+                await eligibility._save_and_finish(n, eligibility_answers)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(save(n) for n in range(first_id, first_id + saves)))
+    elapsed = time.perf_counter() - started
+    if mode != "direct":
+        await write_behind._queue.close()
+    engine.dispose()
+    return saves / elapsed
+
+
+async def run(saves: int, concurrency: int, modes) -> None:
+    directory = tempfile.mkdtemp()
+    for mode in modes:
+        results = {}
+        for profile in ("legacy", "production"):
+            results[profile] = await _bench(profile, mode, saves, concurrency, directory)
+            print(f"mode={mode:<12} profile={profile:<10} saves={saves} concurrency={concurrency} "
+                  f"saves/s={results[profile]:.0f}")
+        print(f"mode={mode:<12} speedup={results['production'] / results['legacy']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--saves", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mode", choices=("direct", "write-behind", "both"), default="both")
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    asyncio.run(run(args.saves, args.concurrency, ("direct", "write-behind") if args.mode == "both" else (args.mode,)))
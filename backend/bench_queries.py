@@ -0,0 +1,92 @@
+"""
+Per-user lookup latency with and without the assessment/transcript indexes.
+
+Fills a fresh SQLite database (production profile) with --rows diet
+assessments and --rows chat messages spread over --rows/20 users, then times
+the repositories.py queries for random users before and after creating the
+indexes declared in models.py.
+
+    python bench_queries.py --rows 1000000 --queries 200
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+
+def _fill(engine, table, rows: int, make_row) -> None:
+    from sqlalchemy import insert
+    chunk = 50_000
+    with engine.begin() as connection:
+        for start in range(0, rows, chunk):
+            connection.execute(insert(table), [make_row(n) for n in range(start, min(start + chunk, rows))])
+
+
+def _time(engine, stmts) -> float:
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        for stmt in stmts:
+            connection.execute(stmt).all()
+        return (time.perf_counter() - started) / len(stmts) * 1000
+
+
+def run(rows: int, queries: int) -> None:
+    from db_connection import create_db_engine
+    from models import ChatMessage, DietAssessment
+    from repositories import chat_history_stmt, latest_assessment_stmt, messages_by_agent_stmt
+
+    engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'queries.db')}", "production")
+    tables = [DietAssessment.__table__, ChatMessage.__table__]
+    indexes = [index for table in tables for index in table.indexes]
+    for table in tables:
+        table.create(engine)  # Table.create also creates its indexes; drop them for the baseline
+    for index in indexes:
+        index.drop(engine)
+
+    users = max(rows // 20, 1)
+    epoch = datetime(2025, 1, 1)
+    agents = ("primary", "dietary", "eligibility", "user")
+    started = time.perf_counter()
+    _fill(engine, DietAssessment.__table__, rows, lambda n: {
+        "user_id": n % users + 1, "results": "{}", "date_taken": epoch + timedelta(minutes=n)})
+    _fill(engine, ChatMessage.__table__, rows, lambda n: {
+        "user_id": n % users + 1, "message": "hi", "response": "hello",
+        "agent_type": "prescription" if n % 1000 == 0 else agents[n % len(agents)], "timestamp": epoch + timedelta(seconds=n)})
+    print(f"rows={rows} per table, users={users}, filled in {time.perf_counter() - started:.1f}s")
+
+    sample = [random.randint(1, users) for _ in range(queries)]
+    workloads = {
+        "latest_diet_assessment": [latest_assessment_stmt(DietAssessment, user) for user in sample],
+        "chat_history": [chat_history_stmt(user, limit=20) for user in sample],
+        # A rare agent: without the index, finding 20 of its messages reads ~20k rows
+        "messages_by_agent": [messages_by_agent_stmt("prescription", limit=20)] * queries,
+    }
+    before = {name: _time(engine, stmts) for name, stmts in workloads.items()}
+
+    started = time.perf_counter()
+    for index in indexes:
+        index.create(engine)
+    print(f"indexes built in {time.perf_counter() - started:.1f}s")
+    after = {name: _time(engine, stmts) for name, stmts in workloads.items()}
+
+    for name in workloads:
+        print(f"{name:<24} no index={before[name]:8.2f}ms  indexed={after[name]:6.3f}ms  "
+              f"speedup={before[name] / after[name]:.0f}x")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    run(args.rows, args.queries)
@@ -0,0 +1,87 @@
+"""
+Memory per questionnaire session, before and after the slotted session types.
+
+Compares the old dict-of-dicts state with DietSession/EligibilitySession, both
+as live objects (measured with tracemalloc) and as the bytes the session store
+holds. Each session is mid-flow: half the diet screener answered, eligibility
+in the insurer branch.
+
+    python bench_sessions.py --sessions 20000
+"""
+
+import random
+import argparse
+import tracemalloc
+from sessions import BinaryCodec, DietSession, EligibilitySession, JsonCodec, Stage
+
+CATEGORIES = [
+    "Fruits", "Vegetables", "Whole Grains", "Legumes", "Nuts", "Water", "Herbal Beverages",
+    "Sugar-sweetened Beverages", "Red Meat", "Processed Meat", "Fish", "Dairy", "Added Sugar",
+    "Refined Grains", "Oils", "Fast Food", "Snacks", "Desserts", "Eggs", "Plant-based Dairy Alternatives",
+    "Fermented Foods", "Green Tea", "Coffee", "Alcohol", "Artificial Sweeteners", "Fried Foods"
+]
+ELIGIBILITY_ANSWERS = {"zip_code": "32801", "insurance_provider": "florida blue", "member_id": "FB123456"}
+
+
+def _old_diet(rng):
+    answered = len(CATEGORIES) // 2
+    return {
+        "collecting": True,
+        "current_category_index": answered,
+        "answers": {category: rng.randint(0, 7) for category in CATEGORIES[:answered]}
+    }
+
+
+def _new_diet(rng):
+    session = DietSession(len(CATEGORIES))
+    for _ in range(len(CATEGORIES) // 2):
+        session.record(rng.randint(0, 7))
+    return session
+
+
+def _old_eligibility(rng):
+    return {"stage": "branch", "index": 1, "answers": dict(ELIGIBILITY_ANSWERS), "branch": "florida blue"}
+
+
+def _new_eligibility(rng):
+    return EligibilitySession(Stage.BRANCH, 1, "florida blue", dict(ELIGIBILITY_ANSWERS))
+
+
+def _live_bytes(factory, codec, count: int, seed: int) -> float:
+    """Bytes per session held by live objects, each decoded from the store as the agents do."""
+    rng = random.Random(seed)
+    encoded = [codec.encode(factory(rng)) for _ in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [codec.decode(raw) for raw in encoded]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return (after - before) / count
+
+
+def _stored_bytes(factory, codec, count: int, seed: int) -> float:
+    rng = random.Random(seed)
+    return sum(len(codec.encode(factory(rng))) for _ in range(count)) / count
+
+
+def run(count: int, seed: int) -> None:
+    cases = [
+        ("diet", "dict+json", _old_diet, JsonCodec),
+        ("diet", "slotted", _new_diet, BinaryCodec(DietSession)),
+        ("eligibility", "dict+json", _old_eligibility, JsonCodec),
+        ("eligibility", "slotted", _new_eligibility, BinaryCodec(EligibilitySession)),
+    ]
+    print(f"sessions={count}")
+    for flow, layout, factory, codec in cases:
+        live = _live_bytes(factory, codec, count, seed)
+        stored = _stored_bytes(factory, codec, count, seed)
+        print(f"{flow:<12} {layout:<10} live={live:7.0f} B/session stored={stored:6.0f} B/session")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure memory per questionnaire session.")
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.sessions, args.seed)
@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+# Run the whole suite offline against the fake LLM and a throwaway database.
+# These must be set before any agent or db_connection import.
+_db_dir = tempfile.mkdtemp(prefix="wellchemy-test-")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_LATENCY"] = "fixed:0"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'wellchemy.db')}"
+
+from db_connection import engine  # noqa: E402
+from models import Base  # noqa: E402
+
+Base.metadata.create_all(engine)
@@ -1,18 +1,63 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 import os
 
 # Get the absolute path to the backend directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Create the database URL
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'wellchemy.db')}"
+# Create the database URL (DATABASE_URL overrides it, e.g. for tests and benchmarks)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'wellchemy.db')}")
+
+# "production" tunes SQLite for concurrent use; "legacy" keeps the library defaults (rollback journal, full fsync)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "8"))
+
+# Applied to every new SQLite connection under the production profile
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",              # readers no longer block the writer (or vice versa)
+    "synchronous": "NORMAL",            # fsync at checkpoints, not every commit; safe with WAL
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),  # wait for the write lock instead of failing
+    "mmap_size": int(os.getenv("SQLITE_MMAP_MB", "256")) * 1024 * 1024,
+    "cache_size": -int(os.getenv("SQLITE_CACHE_MB", "64")) * 1024,  # negative = KiB
+    "temp_store": "MEMORY",
+}
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = SQLITE_PROFILE) -> Engine:
+    """Create the engine for `url`, with pragmas and pool sized for concurrent requests on SQLite."""
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+
+    if profile != "production":
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # An in-memory database only exists on its one connection
+        return create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
 
 # Create the SQLAlchemy engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine()
 
 # Create a SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -27,4 +72,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
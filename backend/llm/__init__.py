@@ -0,0 +1,31 @@
+"""
+Wellchemy LLM Infrastructure
+
+Shared plumbing used by every agent to talk to the language model:
+- client: process-wide pooled HTTP/OpenAI client factory
+- backends: pluggable LLM backends (real OpenAI, offline fake for tests and load runs)
+- cache: LRU/TTL completion cache keyed on a hash of the prompt
+- disk_cache: persistent SQLite tier behind the completion cache
+- prefetch: speculative background generation of the next prompt
+- router: per-task model tiers with latency budgets
+- singleflight: coalescing of identical in-flight requests
+- resilience: per-request deadlines and the provider circuit breaker
+- hedging: hedged requests and jittered retries for tail latency
+"""
+
+from .client import get_llm_client, close_llm_client
+from .cache import CompletionCache, get_completion_cache, make_cache_key
+from .disk_cache import DiskCompletionCache
+from .prefetch import Prefetcher
+from .router import ModelRouter, get_model_router
+from .singleflight import SingleFlight, get_singleflight
+from .resilience import Deadline, CircuitBreaker, LLMUnavailable, get_circuit_breaker
+from .hedging import Hedger, get_hedger, with_retries
+from .backends import LLMBackend, OpenAIBackend, FakeBackend, get_llm_backend, set_llm_backend, close_llm_backend
+
+__all__ = [
+    'get_llm_client', 'close_llm_client', 'CompletionCache', 'get_completion_cache', 'make_cache_key', 'DiskCompletionCache', 'Prefetcher',
+    'ModelRouter', 'get_model_router', 'SingleFlight', 'get_singleflight',
+    'Deadline', 'CircuitBreaker', 'LLMUnavailable', 'get_circuit_breaker', 'Hedger', 'get_hedger', 'with_retries',
+    'LLMBackend', 'OpenAIBackend', 'FakeBackend', 'get_llm_backend', 'set_llm_backend', 'close_llm_backend'
+]
@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from .client import get_llm_client
+from .cache import make_cache_key
+
+_backend: Optional["LLMBackend"] = None
+
+
+class LLMBackend(ABC):
+    """Anything that can answer a chat.completions.create(...) call."""
+
+    @abstractmethod
+    async def create(self, **kwargs) -> Union[ChatCompletion, AsyncIterator[ChatCompletionChunk]]:
+        """Same keyword arguments and return types as AsyncOpenAI.chat.completions.create."""
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class OpenAIBackend(LLMBackend):
+    """The real OpenAI API, optionally recording traffic for offline replay."""
+
+    def __init__(self, record_path: str = None):
+        self.client = get_llm_client()
+        self.record_path = record_path
+
+    async def create(self, **kwargs):
+        response = await self.client.chat.completions.create(**kwargs)
+        if self.record_path and not kwargs.get("stream"):
+            self._record(kwargs, response)
+        return response
+
+    def _record(self, request: Dict[str, Any], response: ChatCompletion) -> None:
+        options = {k: v for k, v in request.items() if k not in ("model", "messages")}
+        entry = {
+            "key": make_cache_key(request["model"], request["messages"], **options),
+            "request": request,
+            "response": response.model_dump(mode="json")
+        }
+        with open(self.record_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    async def close(self) -> None:
+        from .client import close_llm_client
+        await close_llm_client()
+
+
+class LatencyModel:
+    """
+    Simulated upstream latency.
+
+    Spec strings: "fixed:MS", "uniform:LO_MS,HI_MS" or "lognormal:MEDIAN_MS,SIGMA".
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed: int = None):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        self.random = random.Random(seed)
+
+    def sample(self) -> float:
+        """Return a latency in seconds."""
+        if self.kind == "uniform":
+            low, high = self.params
+            return self.random.uniform(low, high) / 1000
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * self.random.lognormvariate(0, sigma) / 1000
+        return (self.params[0] if self.params else 0) / 1000
+
+
+class FakeBackend(LLMBackend):
+    """
+    Offline stand-in for OpenAI used for load testing and CI.
+
+    Replays recorded completions when a request matches one exactly; otherwise
+    returns deterministic canned replies, including start_diet_assessment /
+    check_eligibility function calls when functions are offered.
+    """
+
+    DIET_WORDS = re.compile(r"\b(?:diet|eat|eating|food|foods|nutrition|assessment|screener)\b", re.I)
+    ELIGIBILITY_WORDS = re.compile(r"\b(?:eligib\w*|qualify|insurance|program|coverage)\b", re.I)
+    QUESTION = re.compile(r'Here is the next question you must ask:\s*"(?P<question>.+?)"', re.S)
+    CATEGORY = re.compile(r"\*\*(?P<category>.+?)\*\*")
+    USER_ID = re.compile(r"User ID: (?P<user_id>\S+)")
+
+    def __init__(self, recordings_path: str = None, latency: str = "fixed:0", seed: int = None):
+        self.latency = LatencyModel(latency, seed)
+        self.recordings: Dict[str, Dict[str, Any]] = {}
+        self.calls = 0
+        if recordings_path and os.path.exists(recordings_path):
+            with open(recordings_path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recordings[entry["key"]] = entry["response"]
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        request = dict(kwargs)
+        stream = request.pop("stream", False)
+        model, messages = request.pop("model"), request.pop("messages")
+
+        recorded = self.recordings.get(make_cache_key(model, messages, **request))
+        if recorded is not None:
+            completion = ChatCompletion.model_validate(recorded)
+        else:
+            completion = self._canned(model, messages, request.get("functions"))
+
+        if stream:
+            return self._stream(completion, (request.get("stream_options") or {}).get("include_usage", False))
+        await asyncio.sleep(self.latency.sample())
+        return completion
+
+    def _canned(self, model: str, messages: List[Dict[str, str]], functions) -> ChatCompletion:
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+        if functions:
+            names = {f["name"] for f in functions}
+            user_id = self.USER_ID.search(user)
+            arguments = json.dumps({"user_id": user_id.group("user_id") if user_id else "default"})
+            if "check_eligibility" in names and self.ELIGIBILITY_WORDS.search(user):
+                return self._completion(model, function_call={"name": "check_eligibility", "arguments": arguments})
+            if "start_diet_assessment" in names and self.DIET_WORDS.search(user):
+                return self._completion(model, function_call={"name": "start_diet_assessment", "arguments": arguments})
+
+        question = self.QUESTION.search(system)
+        if question:
+            return self._completion(model, content=question.group("question"))
+        if system.startswith("You are a frequency normalizer"):
+            return self._completion(model, content="1-3x/week")
+        if system.startswith("You maintain a running summary"):
+            new_turns = user.split("New turns:\n", 1)[-1]
+            return self._completion(model, content=" ".join(new_turns.split())[:300])
+        category = self.CATEGORY.search(user)
+        if category:
+            return self._completion(model, content=f"How often per week do you consume {category.group('category')}?")
+        return self._completion(model, content=(
+            "Great question! Eating more whole, plant-based foods is one of the best things you can do for your health. "
+            "Would you like to take a quick diet assessment?"
+        ))
+
+    def _completion(self, model: str, content: str = None, function_call: Dict[str, str] = None) -> ChatCompletion:
+        message = {"role": "assistant", "content": content}
+        if function_call:
+            message["function_call"] = function_call
+        prompt_tokens, completion_tokens = 50, len((content or "").split()) + 5
+        return ChatCompletion.model_validate({
+            "id": f"fake-{self.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "function_call" if function_call else "stop",
+                "message": message
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    async def _stream(self, completion: ChatCompletion, include_usage: bool = False) -> AsyncIterator[ChatCompletionChunk]:
+        choice = completion.choices[0]
+        if choice.message.function_call:
+            pieces = [{"function_call": choice.message.function_call.model_dump()}]
+        else:
+            pieces = [{"content": word} for word in re.findall(r"\S+\s*", choice.message.content or "")]
+        delay = self.latency.sample() / max(len(pieces), 1)
+        for piece in pieces + [{}]:
+            await asyncio.sleep(delay)
+            yield ChatCompletionChunk.model_validate({
+                "id": completion.id,
+                "object": "chat.completion.chunk",
+                "created": completion.created,
+                "model": completion.model,
+                "choices": [{
+                    "index": 0,
+                    "delta": piece,
+                    "finish_reason": None if piece else choice.finish_reason
+                }]
+            })
+        if include_usage:
+            # Like OpenAI with stream_options={"include_usage": True}: a last chunk with no choices
+            yield ChatCompletionChunk.model_validate({
+                "id": completion.id,
+                "object": "chat.completion.chunk",
+                "created": completion.created,
+                "model": completion.model,
+                "choices": [],
+                "usage": completion.usage.model_dump()
+            })
+
+
+def get_llm_backend() -> LLMBackend:
+    """Return the process-wide backend selected by LLM_BACKEND ("openai" or "fake")."""
+    global _backend
+    if _backend is None:
+        kind = os.getenv("LLM_BACKEND", "openai").lower()
+        if kind == "fake":
+            seed = os.getenv("FAKE_LLM_SEED")
+            _backend = FakeBackend(
+                recordings_path=os.getenv("FAKE_LLM_RECORDINGS"),
+                latency=os.getenv("FAKE_LLM_LATENCY", "fixed:0"),
+                seed=int(seed) if seed else None
+            )
+        elif kind == "openai":
+            _backend = OpenAIBackend(record_path=os.getenv("LLM_RECORD_PATH"))
+        else:
+            raise ValueError(f"Unknown LLM_BACKEND: {kind}")
+    return _backend
+
+
+def set_llm_backend(backend: Optional[LLMBackend]) -> None:
+    """Swap the process-wide backend (used by tests and benchmarks)."""
+    global _backend
+    _backend = backend
+
+
+async def close_llm_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
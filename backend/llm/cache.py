@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from .disk_cache import open_disk_cache
+
+_cache: Optional["CompletionCache"] = None
+
+
+def make_cache_key(model: str, messages, **kwargs) -> str:
+    """Hash everything that influences a completion into a stable cache key."""
+    payload = json.dumps({"model": model, "messages": messages, **kwargs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    In-memory LRU cache of serialized completions with a per-entry TTL.
+
+    An optional persistent store (see disk_cache.py) sits behind the memory
+    tier: misses fall through to it and every write goes to both. Async code
+    uses aget()/aset(), which make the blocking SQLite calls in a worker thread.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 24 * 3600, path: str = None, backing=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.backing = backing
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._lookup(key)
+        if value is None and self.backing is not None:
+            value = self._backfill(key, self.backing.get(key))
+        return self._count(value)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get() for the event loop: memory hits stay inline, disk lookups run in a thread."""
+        value = self._lookup(key)
+        if value is None and self.backing is not None:
+            value = self._backfill(key, await asyncio.to_thread(self.backing.get, key))
+        return self._count(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._remember(key, value)
+        if self.backing is not None:
+            self.backing.set(key, value)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """set() for the event loop: the disk write (and any eviction) runs in a thread."""
+        self._remember(key, value)
+        if self.backing is not None:
+            await asyncio.to_thread(self.backing.set, key, value)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            if entry is not None:
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _backfill(self, key: str, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def _count(self, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        stats = {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+        if self.backing is not None:
+            stats["disk"] = self.backing.stats()
+        return stats
+
+    def save(self, path: str = None) -> None:
+        """Persist unexpired entries so a restarted process starts warm."""
+        path = path or self.path
+        if not path:
+            return
+        now = time.time()
+        entries = [[k, exp, v] for k, (exp, v) in self._entries.items() if exp >= now]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = None) -> int:
+        """Load persisted entries, skipping expired ones. Returns the number loaded."""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            entries = json.load(f)
+        now = time.time()
+        for key, expires_at, value in entries:
+            if expires_at >= now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return len(self._entries)
+
+
+def get_completion_cache() -> CompletionCache:
+    """Return the process-wide completion cache, backed by the on-disk store unless LLM_CACHE_DB=off."""
+    global _cache
+    if _cache is None:
+        _cache = CompletionCache(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 3600))),
+            path=os.getenv("LLM_CACHE_PATH") or None,
+            backing=open_disk_cache()
+        )
+        _cache.load()
+    return _cache
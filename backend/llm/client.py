@@ -0,0 +1,70 @@
+import os
+import importlib.util
+from pathlib import Path
+from typing import Optional
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+# Explicitly load .env file from the backend directory
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(dotenv_path=env_path, override=True)
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("LLM_HTTP2", "true").lower() != "true":
+        return False
+    if importlib.util.find_spec("h2") is None:
+        print("⚠️ LLM_HTTP2 requested but the 'h2' package is not installed — using HTTP/1.1")
+        return False
+    return True
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Build the single connection pool shared by every agent in this process."""
+    limits = httpx.Limits(
+        max_connections=_env_int("LLM_MAX_CONNECTIONS", 50),
+        max_keepalive_connections=_env_int("LLM_MAX_KEEPALIVE", 20),
+        keepalive_expiry=_env_float("LLM_KEEPALIVE_EXPIRY", 60.0)
+    )
+    timeout = httpx.Timeout(
+        _env_float("LLM_TIMEOUT", 60.0),
+        connect=_env_float("LLM_CONNECT_TIMEOUT", 5.0),
+        pool=_env_float("LLM_POOL_TIMEOUT", 10.0)
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=_http2_enabled())
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=_build_http_client(),
+            max_retries=0  # retries are jittered and deadline-aware in llm/hedging.py
+        )
+    return _client
+
+
+async def close_llm_client() -> None:
+    """Close the shared client and release its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,196 @@
+"""
+Persistent SQLite completion cache.
+
+Lives next to wellchemy.db (llm_cache.db) so cached completions survive
+deploys. Entries are evicted least-recently-used once the stored payloads
+exceed the size budget. Recency is tracked in memory and written in batches,
+so a hit is a single indexed read. The methods block; CompletionCache calls
+them off the event loop.
+
+    python -m llm.disk_cache warm recordings.jsonl   # load traffic recorded via LLM_RECORD_PATH
+    python -m llm.disk_cache stats
+    python -m llm.disk_cache clear
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Any, Dict, Optional
+from metrics import counter
+
+# Hits whose last_used is written in one executemany, rather than an UPDATE per hit
+TOUCH_BATCH = int(os.getenv("LLM_CACHE_DB_TOUCH_BATCH", "100"))
+
+disk_cache_lookups = counter("llm_disk_cache_total", "Persistent completion cache lookups by outcome (hit, miss)", ("outcome",))
+disk_cache_evictions = counter("llm_disk_cache_evictions_total", "Entries evicted from the persistent completion cache to stay under its size budget")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_completions_last_used ON completions (last_used);
+"""
+
+
+def default_cache_db_path() -> str:
+    """llm_cache.db in the same directory as the application's SQLite database."""
+    from db_connection import SQLALCHEMY_DATABASE_URL
+    if SQLALCHEMY_DATABASE_URL.startswith("sqlite:///"):
+        directory = os.path.dirname(os.path.abspath(SQLALCHEMY_DATABASE_URL[len("sqlite:///"):]))
+    else:
+        directory = os.path.join(os.path.dirname(__file__), "..")
+    return os.path.join(directory, "llm_cache.db")
+
+
+class DiskCompletionCache:
+    """SQLite-backed completion store with a TTL and a total size budget in bytes."""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl: float = 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key -> last_used not yet written
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, size, expires_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[2] < now:
+                self._delete(key, row[1])
+                row = None
+            if row is None:
+                self.misses += 1
+                disk_cache_lookups.inc(outcome="miss")
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                self._write_touches()
+        self.hits += 1
+        disk_cache_lookups.inc(outcome="hit")
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, size, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now + self.ttl, now)
+            )
+            self._bytes += size - (previous[0] if previous else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _delete(self, key: str, size: int) -> None:
+        self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+        self._touched.pop(key, None)
+        self._bytes -= size
+
+    def _write_touches(self) -> None:
+        self._conn.executemany("UPDATE completions SET last_used = ? WHERE key = ?",
+                               [(last_used, key) for key, last_used in self._touched.items()])
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries (expired ones are oldest) until under the size budget."""
+        self._write_touches()
+        excess = self._bytes - self.max_bytes
+        victims = []
+        # Walks ix_completions_last_used and stops as soon as enough bytes are found
+        for key, size in self._conn.execute("SELECT key, size FROM completions ORDER BY last_used"):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", victims)
+        self._bytes = self.max_bytes + excess
+        disk_cache_evictions.inc(len(victims))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+    def warm(self, recordings_path: str) -> int:
+        """Load completions recorded with LLM_RECORD_PATH (JSONL of key/request/response). Returns the count."""
+        loaded = 0
+        with open(recordings_path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.set(entry["key"], entry["response"])
+                    loaded += 1
+        return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._touched.clear()
+            self._bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touches()
+            self._conn.close()
+
+
+def open_disk_cache() -> Optional[DiskCompletionCache]:
+    """Open the persistent cache configured by LLM_CACHE_DB ("off" disables it)."""
+    path = os.getenv("LLM_CACHE_DB") or default_cache_db_path()
+    if path.lower() == "off":
+        return None
+    return DiskCompletionCache(
+        path,
+        max_bytes=int(float(os.getenv("LLM_CACHE_DB_MAX_MB", "256")) * 1024 * 1024),
+        ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the persistent LLM completion cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm = commands.add_parser("warm", help="Load recorded traffic (LLM_RECORD_PATH JSONL files)")
+    warm.add_argument("recordings", nargs="+")
+    commands.add_parser("stats", help="Show entry count and size")
+    commands.add_parser("clear", help="Delete every cached completion")
+    args = parser.parse_args()
+
+    cache = open_disk_cache()
+    if cache is None:
+        parser.exit(1, "LLM_CACHE_DB is off\n")
+    if args.command == "warm":
+        for recordings in args.recordings:
+            print(f"✅ Loaded {cache.warm(recordings)} completions from {recordings}")
+    elif args.command == "clear":
+        cache.clear()
+        print("🗑️ Cleared the completion cache")
+    print(json.dumps(cache.stats(), indent=2))
+    cache.close()
@@ -0,0 +1,109 @@
+import os
+import random
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from openai import APIStatusError
+from metrics import LatencyWindow, counter
+from .resilience import DeadlineExceeded, current_deadline
+
+# Hedge once a call has run longer than this percentile of recent calls to the same model (0 disables)
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+
+# Samples required before the percentile is trusted as a hedge delay
+MIN_SAMPLES = 20
+
+hedges = counter("llm_hedges_total", "Hedged LLM requests (fired: backup sent, won: backup finished first)", ("model", "outcome"))
+retries = counter("llm_retries_total", "LLM calls retried after a retryable status", ("model", "status"))
+
+_hedger: Optional["Hedger"] = None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits and provider-side errors are worth another try; bad requests are not."""
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_SECONDS, cap: float = RETRY_MAX_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def with_retries(model: str, call: Callable[[], Awaitable[Any]], attempts: int = RETRY_ATTEMPTS) -> Any:
+    """Await `call`, retrying 429/5xx responses with jittered backoff inside the request deadline."""
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            if not is_retryable(e) or attempt == attempts - 1:
+                raise
+            delay = backoff_delay(attempt)
+            deadline = current_deadline()
+            if deadline is not None and deadline.remaining() <= delay:
+                raise DeadlineExceeded(f"No time left to retry after HTTP {e.status_code}") from e
+            retries.inc(model=model, status=str(e.status_code))
+            print(f"🔁 Retrying {model} after HTTP {e.status_code} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+class Hedger:
+    """
+    Sends a backup request when the first one runs into the latency tail.
+
+    The backup fires after the configured percentile of recent latencies for
+    the model; whichever request finishes first wins and the other is
+    cancelled. Until enough samples exist no hedging happens.
+    """
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE):
+        self.percentile = percentile
+        self._windows: Dict[str, LatencyWindow] = {}
+
+    def observe(self, model: str, seconds: float) -> None:
+        self._windows.setdefault(model, LatencyWindow()).add(seconds)
+
+    def delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None if hedging is off or there is no history yet."""
+        window = self._windows.get(model)
+        if not self.percentile or window is None or len(window) < MIN_SAMPLES:
+            return None
+        return window.percentile(self.percentile)
+
+    async def run(self, model: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        delay = self.delay(model)
+        if delay is None:
+            return await call()
+
+        primary = asyncio.ensure_future(call())
+        backup = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            hedges.inc(model=model, outcome="fired")
+            backup = asyncio.ensure_future(call())
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            hedges.inc(model=model, outcome="won")
+                        return task.result()
+            # Both failed: surface the original request's error
+            return primary.result()
+        finally:
+            for task in (primary, backup):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+def get_hedger() -> Hedger:
+    """Return the process-wide hedger (latency history is shared across agents)."""
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger()
+    return _hedger
@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from metrics import counter, histogram
+
+# USD per 1K tokens (prompt, completion); override with LLM_PRICES='{"model": [prompt, completion]}'
+DEFAULT_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015)
+}
+PRICES = {**DEFAULT_PRICES, **{k: tuple(v) for k, v in json.loads(os.getenv("LLM_PRICES", "{}")).items()}}
+
+llm_calls = counter("llm_calls_total", "LLM calls by agent, model and outcome (ok, error, cache_hit)", ("agent", "model", "outcome"))
+llm_latency = histogram("llm_call_duration_seconds", "Wall time of upstream LLM calls", ("agent", "model"))
+llm_tokens = counter("llm_tokens_total", "Tokens consumed by agent, model and kind (prompt, completion)", ("agent", "model", "kind"))
+llm_cost = counter("llm_cost_usd_total", "Estimated OpenAI spend in USD", ("agent", "model"))
+
+# Per-request running totals, populated only while track_request_usage() is active
+_request_usage: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("llm_request_usage", default=None)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+@contextmanager
+def track_request_usage():
+    """Collect LLM totals for everything awaited inside the block (used for debug responses)."""
+    usage = {"calls": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "llm_seconds": 0.0}
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+
+
+def record_call(agent: str, model: str, outcome: str, seconds: float = 0.0, usage: Any = None) -> None:
+    """Record one LLM call in the process metrics and the current request's totals."""
+    llm_calls.inc(agent=agent, model=model, outcome=outcome)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    cost = estimate_cost(model, prompt_tokens, completion_tokens)
+    if outcome != "cache_hit":
+        llm_latency.observe(seconds, agent=agent, model=model)
+    if usage is not None:
+        llm_tokens.inc(prompt_tokens, agent=agent, model=model, kind="prompt")
+        llm_tokens.inc(completion_tokens, agent=agent, model=model, kind="completion")
+        llm_cost.inc(cost, agent=agent, model=model)
+
+    totals = _request_usage.get()
+    if totals is not None:
+        if outcome == "cache_hit":
+            totals["cache_hits"] += 1
+        else:
+            totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["cost_usd"] = round(totals["cost_usd"] + cost, 6)
+        totals["llm_seconds"] = round(totals["llm_seconds"] + seconds, 4)
+
+
+async def instrumented(agent: str, model: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    """Await an upstream LLM call, recording latency, tokens, cost and outcome."""
+    started = time.perf_counter()
+    try:
+        response = await call()
+    except Exception as e:
+        record_call(agent, model, "error", time.perf_counter() - started)
+        print(f"❌ LLM call failed ({agent}, {model}): {e}")
+        raise
+    if hasattr(response, "__aiter__"):
+        return _instrumented_stream(agent, model, response, started)
+    record_call(agent, model, "ok", time.perf_counter() - started, getattr(response, "usage", None))
+    return response
+
+
+async def _instrumented_stream(agent: str, model: str, stream: AsyncIterator, started: float) -> AsyncIterator:
+    """Pass chunks through, recording the call once the stream is exhausted."""
+    usage = None
+    outcome = "error"
+    try:
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            yield chunk
+        outcome = "ok"
+    finally:
+        record_call(agent, model, outcome, time.perf_counter() - started, usage)
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from metrics import counter
+from .resilience import current_deadline, deadline_scope
+
+prefetch_outcomes = counter(
+    "llm_prefetch_total",
+    "Speculatively generated prompts by outcome (hit, miss, late, cancelled)",
+    labels=("outcome",)
+)
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Failed speculation is harmless; the caller just generates live
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ Prefetch failed: {task.exception()}")
+
+
+class Prefetcher:
+    """
+    Generates the likely next prompt(s) for a session in the background.
+
+    Session keys compare as strings, so 42 and "42" (and session eviction) agree.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, Dict[Hashable, asyncio.Task]] = {}  # str(session) -> candidate -> task
+
+    def schedule(self, session_key: Hashable, candidate_key: Hashable, factory: Callable[[], Awaitable[Any]]) -> None:
+        """Start generating a candidate unless it is already in flight for this session."""
+        candidates = self._tasks.setdefault(str(session_key), {})
+        if candidate_key in candidates:
+            return
+        task = asyncio.ensure_future(self._run(factory))
+        task.add_done_callback(_consume_exception)
+        candidates[candidate_key] = task
+
+    @staticmethod
+    async def _run(factory: Callable[[], Awaitable[Any]]) -> Any:
+        # Speculation outlives the request that scheduled it, so it isn't bound by that request's deadline
+        with deadline_scope(None):
+            return await factory()
+
+    async def take(self, session_key: Hashable, candidate_key: Hashable) -> Optional[Any]:
+        """
+        Return the prefetched result for the candidate actually needed, or None.
+
+        Every other candidate for the session is stale once one is taken, so they
+        are cancelled (e.g. the branch the user did not choose). A candidate still
+        generating is waited on only until the request deadline; then the caller
+        gets None and the task keeps running for the next time it is asked for.
+        """
+        candidates = self._tasks.pop(str(session_key), {})
+        task = candidates.pop(candidate_key, None)
+        for stale in candidates.values():
+            if not stale.done():
+                stale.cancel()
+                prefetch_outcomes.inc(outcome="cancelled")
+
+        if task is None or task.cancelled():
+            prefetch_outcomes.inc(outcome="miss")
+            return None
+        deadline = current_deadline()
+        try:
+            if deadline is None:
+                result = await task
+            else:
+                result = await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+        except asyncio.TimeoutError:
+            self._tasks.setdefault(str(session_key), {})[candidate_key] = task
+            prefetch_outcomes.inc(outcome="late")
+            return None
+        except Exception:
+            prefetch_outcomes.inc(outcome="miss")
+            return None
+        prefetch_outcomes.inc(outcome="hit")
+        return result
+
+    def cancel(self, session_key: Hashable) -> None:
+        """Drop all speculation for a session that ended or changed course."""
+        for task in self._tasks.pop(str(session_key), {}).values():
+            if not task.done():
+                task.cancel()
+                prefetch_outcomes.inc(outcome="cancelled")
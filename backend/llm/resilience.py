@@ -0,0 +1,131 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+from metrics import counter, gauge
+
+# Whole-request budget for /chat; unset, it follows the routing budgets (see ModelRouter.request_budget)
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS")) if os.getenv("CHAT_DEADLINE_SECONDS") else None
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+# When the circuit breaker treats a call as failed; unset, a call is slow once it overruns its task's latency budget
+BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS")) if os.getenv("LLM_BREAKER_SLOW_SECONDS") else None
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+circuit_state = gauge("llm_circuit_state", "LLM circuit breaker state (0 closed, 1 open, 2 half-open)")
+circuit_transitions = counter("llm_circuit_transitions_total", "Circuit breaker state changes", ("state",))
+llm_unavailable = counter("llm_unavailable_total", "LLM calls refused before reaching the provider", ("agent", "reason"))
+template_fallbacks = counter("llm_template_fallbacks_total", "Replies served from static templates instead of the LLM", ("agent",))
+
+_current_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("llm_deadline", default=None)
+_breaker: Optional["CircuitBreaker"] = None
+
+
+class LLMUnavailable(Exception):
+    """The LLM can't answer in time; callers should degrade to static text."""
+    pass
+
+
+class DeadlineExceeded(LLMUnavailable):
+    pass
+
+
+class CircuitOpenError(LLMUnavailable):
+    pass
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a request must be answered."""
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """Make `deadline` the budget for every LLM call awaited inside the block (None lifts it)."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+class CircuitBreaker:
+    """
+    Stops calling the provider after repeated slow or failed calls.
+
+    After `failure_threshold` consecutive failures (errors, or calls slower than
+    `slow_call_seconds`, by default the budget of the task the call was for) the circuit opens and calls are refused immediately.
+    Once `reset_timeout` has passed a single trial call is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, slow_call_seconds: Optional[float] = BREAKER_SLOW_SECONDS,
+                 reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            print(f"⚡ LLM circuit {self.state} -> {state}")
+            circuit_transitions.inc(state=state)
+        self.state = state
+        circuit_state.set(_STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+            self._trial_in_flight = False
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return self.state == CLOSED
+
+    def record_success(self, seconds: float, budget: Optional[float] = None) -> None:
+        slow_after = self.slow_call_seconds if self.slow_call_seconds is not None else budget
+        if slow_after is not None and seconds > slow_after:
+            self.record_failure()
+            return
+        self.failures = 0
+        self._trial_in_flight = False
+        self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide breaker guarding the LLM provider."""
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker()
+    return _breaker
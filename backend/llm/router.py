@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from metrics import LatencyWindow, counter, gauge
+
+DEFAULT_ROUTING_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'model_routing.json')
+
+# Task classes the agents route by
+REPHRASE = "rephrase"
+NORMALIZE = "normalize"
+ADVICE = "advice"
+SUMMARIZE = "summarize"
+
+# Samples required before a tier's observed p95 is trusted enough to skip it
+MIN_SAMPLES = 20
+# Time a /chat turn gets beyond its slowest task's budget (routing, follow-up question, database)
+REQUEST_HEADROOM_SECONDS = 5
+# Latency samples older than this are forgotten, so a skipped tier is tried again once its slow burst ages out
+TIER_WINDOW_SECONDS = float(os.getenv("LLM_TIER_WINDOW_SECONDS", "60"))
+
+_router: Optional["ModelRouter"] = None
+
+tier_calls = counter("llm_tier_calls_total", "Routed LLM calls by task, model and outcome (ok, over_budget, error, skipped)", ("task", "model", "outcome"))
+tier_p95 = gauge("llm_tier_latency_p95_seconds", "Rolling p95 latency per task and model tier", ("task", "model"))
+
+
+class ModelRouter:
+    """
+    Picks the model for each task class from config, cheapest tier first.
+
+    Every tier but the last must answer within the task's latency budget; if
+    it is too slow or fails, the call escalates to the next tier. A fast tier
+    that meets the budget means the slower model is never called. A tier whose
+    rolling p95 already exceeds the budget is skipped outright, until those
+    samples are window_seconds old and the tier gets traffic (and a fresh p95)
+    again.
+    """
+
+    def __init__(self, config: Dict[str, Dict[str, Any]], window_seconds: float = TIER_WINDOW_SECONDS):
+        self.config = config
+        self.window_seconds = window_seconds
+        self._windows: Dict[tuple, LatencyWindow] = {}
+
+    @classmethod
+    def load(cls, path: str = None) -> "ModelRouter":
+        with open(path or os.getenv("LLM_ROUTING_PATH", DEFAULT_ROUTING_PATH)) as f:
+            return cls(json.load(f))
+
+    def tiers(self, task: str) -> List[str]:
+        return self.config.get(task, self.config[ADVICE])["tiers"]
+
+    def budget(self, task: str) -> float:
+        """Latency budget for the task, in seconds."""
+        return self.config.get(task, self.config[ADVICE])["latency_budget_ms"] / 1000
+
+    def request_budget(self) -> float:
+        """Default deadline for a whole chat turn: the slowest task's budget plus headroom, in seconds."""
+        return max(entry["latency_budget_ms"] for entry in self.config.values()) / 1000 + REQUEST_HEADROOM_SECONDS
+
+    def p95(self, task: str, model: str) -> float:
+        window = self._windows.get((task, model))
+        return window.percentile(95) if window else 0.0
+
+    def _observe(self, task: str, model: str, seconds: float) -> None:
+        window = self._windows.setdefault((task, model), LatencyWindow(max_age=self.window_seconds))
+        window.add(seconds)
+        tier_p95.set(window.percentile(95), task=task, model=model)
+
+    def _should_skip(self, task: str, model: str) -> bool:
+        window = self._windows.get((task, model))
+        return window is not None and len(window) >= MIN_SAMPLES and window.percentile(95) > self.budget(task)
+
+    async def complete(self, task: str, call: Callable[[str], Awaitable[Any]]) -> Any:
+        """Run `call(model)` against the task's tiers until one answers within budget."""
+        tiers = self.tiers(task)
+        budget = self.budget(task)
+        for position, model in enumerate(tiers):
+            is_last = position == len(tiers) - 1
+            if not is_last and self._should_skip(task, model):
+                tier_calls.inc(task=task, model=model, outcome="skipped")
+                continue
+
+            started = time.perf_counter()
+            try:
+                if is_last:
+                    response = await call(model)
+                else:
+                    response = await asyncio.wait_for(call(model), timeout=budget)
+            except asyncio.TimeoutError:
+                self._observe(task, model, time.perf_counter() - started)
+                tier_calls.inc(task=task, model=model, outcome="over_budget")
+                if is_last:
+                    raise
+                continue
+            except Exception:
+                tier_calls.inc(task=task, model=model, outcome="error")
+                if is_last:
+                    raise
+                continue
+
+            self._observe(task, model, time.perf_counter() - started)
+            tier_calls.inc(task=task, model=model, outcome="ok")
+            return response
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide router loaded from data/model_routing.json (or LLM_ROUTING_PATH)."""
+    global _router
+    if _router is None:
+        _router = ModelRouter.load()
+    return _router
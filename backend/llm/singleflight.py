@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from metrics import counter
+
+flight_outcomes = counter(
+    "llm_singleflight_total",
+    "Upstream LLM requests by singleflight role (leader made the call, coalesced shared it)",
+    labels=("outcome",)
+)
+
+_flights: Optional["SingleFlight"] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical requests into one upstream call.
+
+    The first caller for a key starts the call; anyone asking for the same key
+    while it is in flight awaits the same result (or exception). Nothing is
+    remembered once the call finishes - that is the completion cache's job.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            flight_outcomes.inc(outcome="leader")
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            flight_outcomes.inc(outcome="coalesced")
+        # Shielded so one waiter timing out or being cancelled doesn't fail the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception retrieved in case every waiter gave up before it arrived
+        if not task.cancelled():
+            task.exception()
+
+
+def get_singleflight() -> SingleFlight:
+    """Return the process-wide singleflight group shared by all agents."""
+    global _flights
+    if _flights is None:
+        _flights = SingleFlight()
+    return _flights
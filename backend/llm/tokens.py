@@ -0,0 +1,54 @@
+import re
+import importlib.util
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Rough stand-in when tiktoken (or its encoding files) is unavailable; errs on the high side
+_APPROX_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Per-message framing overhead in the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if importlib.util.find_spec("tiktoken") is None:
+        print("⚠️ tiktoken is not installed — approximating token counts")
+        return None
+    import tiktoken
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; offline hosts fall back to the approximation
+        print(f"⚠️ Could not load tiktoken encoding for {model} ({e}) — approximating token counts")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Number of tokens `text` costs for `model`."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(_APPROX_TOKEN.findall(text))
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = "gpt-4") -> int:
+    return sum(count_tokens(m.get("content") or "", model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4", keep: str = "end") -> str:
+    """Cut `text` to at most `max_tokens`, keeping its start or (by default) its end."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding: Optional[object] = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        kept = tokens[-max_tokens:] if keep == "end" else tokens[:max_tokens]
+        return encoding.decode(kept)
+    pieces = list(_APPROX_TOKEN.finditer(text))
+    if keep == "end":
+        return text[pieces[-max_tokens].start():] if max_tokens else ""
+    return text[:pieces[max_tokens - 1].end()] if max_tokens else ""
@@ -0,0 +1,189 @@
+import time
+import bisect
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# name -> metric, shared by the whole process
+REGISTRY: Dict[str, "Metric"] = {}
+_registry_lock = threading.Lock()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(text: str, quotes: bool = True) -> str:
+    """Escape a label value (or, with quotes=False, HELP text) for the exposition format."""
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if quotes else text
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Common base for registry entries."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.description, quotes=False)}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    """Monotonically increasing count, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    """Value that can go up and down (queue depth, live sessions, quantiles)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    """Cumulative bucketed distribution of observed values (e.g. latencies in seconds)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class LatencyWindow:
+    """Rolling window of recent samples for cheap percentile estimates; optionally forgets samples after max_age seconds."""
+
+    def __init__(self, size: int = 500, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._samples = deque(maxlen=size)  # (recorded_at, value)
+
+    def add(self, value: float) -> None:
+        self._samples.append((time.monotonic(), value))
+
+    def _expire(self) -> None:
+        if self.max_age is not None:
+            cutoff = time.monotonic() - self.max_age
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        self._expire()
+        if not self._samples:
+            return 0.0
+        ordered = sorted(value for _, value in self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _register(cls, name: str, *args, **kwargs) -> Metric:
+    with _registry_lock:
+        if name not in REGISTRY:
+            REGISTRY[name] = cls(name, *args, **kwargs)
+        return REGISTRY[name]
+
+
+def counter(name: str, description: str, labels: Tuple[str, ...] = ()) -> Counter:
+    """Get or create the counter registered under `name`."""
+    return _register(Counter, name, description, labels)
+
+
+def gauge(name: str, description: str, labels: Tuple[str, ...] = ()) -> Gauge:
+    """Get or create the gauge registered under `name`."""
+    return _register(Gauge, name, description, labels)
+
+
+def histogram(name: str, description: str, labels: Tuple[str, ...] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Get or create the histogram registered under `name`."""
+    return _register(Histogram, name, description, labels, buckets)
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(REGISTRY.values())
+    return "\n".join(metric.render() for metric in metrics) + "\n"
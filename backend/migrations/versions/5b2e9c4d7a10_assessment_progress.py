@@ -0,0 +1,35 @@
+"""Assessment progress checkpoints
+
+Revision ID: 5b2e9c4d7a10
+Revises: 017857205073
+Create Date: 2026-10-17 10:12:41.203117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9c4d7a10'
+down_revision: Union[str, None] = '017857205073'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('assessment_progress',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('flow', sa.String(length=20), nullable=False),
+    sa.Column('state', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'flow')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('assessment_progress')
@@ -0,0 +1,34 @@
+"""Indexes for per-user assessment and transcript lookups
+
+Revision ID: 9c41d2e8b6f3
+Revises: 5b2e9c4d7a10
+Create Date: 2026-10-17 15:40:08.517392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41d2e8b6f3'
+down_revision: Union[str, None] = '5b2e9c4d7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_diet_assessments_user_id_date_taken', 'diet_assessments', ['user_id', sa.text('date_taken DESC')], unique=False)
+    op.create_index('ix_eligibility_assessments_user_id_date_taken', 'eligibility_assessments', ['user_id', sa.text('date_taken DESC')], unique=False)
+    op.create_index('ix_chat_messages_user_id_timestamp', 'chat_messages', ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_chat_messages_agent_type', 'chat_messages', ['agent_type'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_messages_agent_type', table_name='chat_messages')
+    op.drop_index('ix_chat_messages_user_id_timestamp', table_name='chat_messages')
+    op.drop_index('ix_eligibility_assessments_user_id_date_taken', table_name='eligibility_assessments')
+    op.drop_index('ix_diet_assessments_user_id_date_taken', table_name='diet_assessments')
@@ -0,0 +1,34 @@
+"""User id sequence for block-allocated guest ids
+
+Revision ID: c3f8a1b75e92
+Revises: 9c41d2e8b6f3
+Create Date: 2026-10-17 17:05:52.804716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1b75e92'
+down_revision: Union[str, None] = '9c41d2e8b6f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('id_sequences',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('next_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Continue after the existing users
+    op.execute("INSERT INTO id_sequences (name, next_id) SELECT 'users', COALESCE(MAX(user_id), 0) + 1 FROM users")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('id_sequences')
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, func
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, LargeBinary, Index, func, select
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -8,7 +8,9 @@ class User(Base):
     """Model for storing user information."""
     __tablename__ = 'users'
     
-    user_id = Column(Integer, primary_key=True, autoincrement=True)
+    # Drawn from id_sequences, so ids reserved for not-yet-saved guests are never reused
+    user_id = Column(Integer, primary_key=True, autoincrement=True,
+                     default=lambda context: reserve_user_ids(context.connection, 1))
     email = Column(String(255), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     first_login = Column(DateTime)
@@ -20,6 +22,7 @@ class User(Base):
     diet_assessments = relationship("DietAssessment", back_populates="user", cascade="all, delete-orphan")
     chat_messages = relationship("ChatMessage", back_populates="user", cascade="all, delete-orphan")
     eligibility_assessments = relationship("EligibilityAssessment", back_populates="user", cascade="all, delete-orphan")
+    assessment_progress = relationship("AssessmentProgress", back_populates="user", cascade="all, delete-orphan")
 
     def to_dict(self):
         return {
@@ -42,6 +45,9 @@ class DietAssessment(Base):
 
     user = relationship("User", back_populates="diet_assessments")
 
+    # "Latest assessment for a user" (see repositories.py)
+    __table_args__ = (Index("ix_diet_assessments_user_id_date_taken", user_id, date_taken.desc()),)
+
     def to_dict(self):
         return {
             "assessment_id": self.assessment_id,
@@ -63,6 +69,12 @@ class ChatMessage(Base):
 
     user = relationship("User", back_populates="chat_messages")
 
+    # A user's transcript in time order, and audits by agent (see repositories.py)
+    __table_args__ = (
+        Index("ix_chat_messages_user_id_timestamp", user_id, timestamp),
+        Index("ix_chat_messages_agent_type", agent_type),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -81,4 +93,41 @@ class EligibilityAssessment(Base):
     answers = Column(Text, nullable=False)  # Store JSON as Text in SQLite
     date_taken = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="eligibility_assessments") 
\ No newline at end of file
+    user = relationship("User", back_populates="eligibility_assessments")
+
+    __table_args__ = (Index("ix_eligibility_assessments_user_id_date_taken", user_id, date_taken.desc()),)
+
+class AssessmentProgress(Base):
+    """Model for a partially completed assessment, upserted after every answer so it can be resumed."""
+    __tablename__ = 'assessment_progress'
+
+    user_id = Column(Integer, ForeignKey('users.user_id'), primary_key=True)
+    flow = Column(String(20), primary_key=True)  # 'diet' or 'eligibility'
+    state = Column(LargeBinary, nullable=False)  # encoded session, see sessions/state.py
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User", back_populates="assessment_progress")
+
+class IdSequence(Base):
+    """Next unallocated id of a sequence; guest user ids are reserved from it in blocks (see sessions/guests.py)."""
+    __tablename__ = 'id_sequences'
+
+    name = Column(String(50), primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+
+def reserve_user_ids(connection, count: int) -> int:
+    """Reserve `count` consecutive user ids in the caller's transaction and return the first."""
+    sequence = IdSequence.__table__
+    next_id = connection.execute(
+        sequence.update()
+        .where(sequence.c.name == "users")
+        .values(next_id=sequence.c.next_id + count)
+        .returning(sequence.c.next_id)
+    ).scalar()
+    if next_id is not None:
+        return next_id - count
+    # First use (tables made with create_all rather than the migration): start after the existing users
+    start = connection.execute(select(func.coalesce(func.max(User.user_id), 0))).scalar() + 1
+    connection.execute(sequence.insert().values(name="users", next_id=start + count))
+    return start
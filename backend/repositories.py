@@ -0,0 +1,69 @@
+"""
+Read queries for assessments and chat transcripts.
+
+Each query has a statement builder (so tests and bench_queries.py can check
+its plan) and a function that runs it in its own session. All of them are
+served by the indexes declared in models.py: a user's newest assessment is
+the first entry of (user_id, date_taken DESC), a transcript page is a range
+of (user_id, timestamp), and audits by agent walk (agent_type).
+"""
+
+from datetime import datetime
+from typing import List, Optional, Type, Union
+from sqlalchemy import Select, select
+from db_connection import SessionLocal
+from models import ChatMessage, DietAssessment, EligibilityAssessment
+
+Assessment = Union[DietAssessment, EligibilityAssessment]
+
+
+def latest_assessment_stmt(model: Type[Assessment], user_id: int) -> Select:
+    return select(model).where(model.user_id == user_id).order_by(model.date_taken.desc()).limit(1)
+
+
+def chat_history_stmt(user_id: int, since: Optional[datetime] = None, limit: int = 100) -> Select:
+    stmt = select(ChatMessage).where(ChatMessage.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(ChatMessage.timestamp >= since)
+    return stmt.order_by(ChatMessage.timestamp.desc()).limit(limit)
+
+
+def messages_by_agent_stmt(agent_type: str, limit: int = 100) -> Select:
+    # Newest first by id: rowids are stored in index order, so no sort is needed
+    return select(ChatMessage).where(ChatMessage.agent_type == agent_type).order_by(ChatMessage.id.desc()).limit(limit)
+
+
+def latest_diet_assessment(user_id: int) -> Optional[DietAssessment]:
+    """The user's most recent diet assessment, if any."""
+    db = SessionLocal()
+    try:
+        return db.scalar(latest_assessment_stmt(DietAssessment, user_id))
+    finally:
+        db.close()
+
+
+def latest_eligibility_assessment(user_id: int) -> Optional[EligibilityAssessment]:
+    """The user's most recent eligibility assessment, if any."""
+    db = SessionLocal()
+    try:
+        return db.scalar(latest_assessment_stmt(EligibilityAssessment, user_id))
+    finally:
+        db.close()
+
+
+def chat_history(user_id: int, since: Optional[datetime] = None, limit: int = 100) -> List[ChatMessage]:
+    """The user's last `limit` exchanges (optionally since a time), oldest first."""
+    db = SessionLocal()
+    try:
+        return list(reversed(db.scalars(chat_history_stmt(user_id, since, limit)).all()))
+    finally:
+        db.close()
+
+
+def messages_by_agent(agent_type: str, limit: int = 100) -> List[ChatMessage]:
+    """The latest exchanges answered by one agent, newest first (for audits)."""
+    db = SessionLocal()
+    try:
+        return db.scalars(messages_by_agent_stmt(agent_type, limit)).all()
+    finally:
+        db.close()
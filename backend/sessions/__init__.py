@@ -0,0 +1,25 @@
+"""
+Wellchemy Session State
+
+Conversation state shared by every worker process:
+- store: SessionStore backends (memory, SQLite WAL, Redis) and the SessionMap view agents use
+- state: compact slotted session types (DietSession, EligibilitySession) and their binary form
+- manager: SessionManager, evicting idle sessions (idle TTL, LRU cap) with optional checkpoints
+- progress: durable per-answer checkpoints in the database (imported directly; needs db_connection)
+- guests: block-allocated guest user ids whose users row is written lazily (imported directly; needs db_connection)
+- resp_server: minimal Redis-protocol server for tests and local multi-worker runs
+"""
+
+from .store import (
+    SessionStore, MemorySessionStore, SQLiteSessionStore, RedisSessionStore, SessionMap, JsonCodec, BinaryCodec,
+    open_session_store, get_session_store, set_session_store, close_session_store
+)
+from .state import DietSession, EligibilitySession, Stage
+from .manager import SessionManager, open_checkpoint_store
+
+__all__ = [
+    'SessionStore', 'MemorySessionStore', 'SQLiteSessionStore', 'RedisSessionStore', 'SessionMap', 'JsonCodec', 'BinaryCodec',
+    'DietSession', 'EligibilitySession', 'Stage',
+    'open_session_store', 'get_session_store', 'set_session_store', 'close_session_store',
+    'SessionManager', 'open_checkpoint_store'
+]
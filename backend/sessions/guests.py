@@ -0,0 +1,132 @@
+"""
+Guest user ids without a users row per anonymous session.
+
+A visitor who starts a flow without an account gets a guest id straight away
+(the client sends it back with every message), but the users row behind it is
+only written once the guest has something to persist: every write that
+references a user (answer checkpoints, results, chat transcripts) runs
+ensure_users() in the same transaction, an idempotent insert that is a no-op
+once the row exists. Handing out the id itself costs no INSERT. Rows are
+only created for ids the allocator has issued (below the sequence's next_id),
+so an id a client makes up is refused instead of claiming a users row that
+a later guest or member would be handed.
+
+Ids come from blocks reserved in id_sequences (one UPDATE per GUEST_ID_BLOCK
+guests per worker), and every other User insert draws from the same sequence
+(see models.User), so a reserved id is never handed to anyone else. Ids of
+guests who never persist anything are simply gaps.
+"""
+
+import os
+import uuid
+import asyncio
+from datetime import datetime
+from typing import Hashable, Iterable, Optional, Set
+from sqlalchemy import select
+from db_connection import SessionLocal
+from models import IdSequence, User, reserve_user_ids
+from metrics import counter
+
+GUEST_ID_BLOCK = int(os.getenv("GUEST_ID_BLOCK", "100"))
+
+guest_ids = counter("guest_ids_total", "Guest user ids handed out")
+guest_id_blocks = counter("guest_id_blocks_reserved_total", "Blocks of guest user ids reserved from the database")
+
+_guests: Optional["GuestIds"] = None
+
+
+def _reserve_block(count: int) -> int:
+    db = SessionLocal()
+    try:
+        start = reserve_user_ids(db.connection(), count)
+        db.commit()
+        return start
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def ensure_users(db, user_ids: Iterable[int]) -> Set[int]:
+    """
+    Insert a guest users row for each issued id that has none, in the caller's transaction.
+
+    Run before writing rows that reference users.user_id; ids that already have a
+    row (members, guests saved earlier, another worker racing us) are left alone.
+    Returns the ids that have a row afterwards: ids never handed out are not in it.
+    """
+    requested = set(user_ids)
+    if not requested:
+        return set()
+    existing = set(db.scalars(select(User.user_id).where(User.user_id.in_(requested))))
+    issued_below = db.scalar(select(IdSequence.next_id).where(IdSequence.name == "users")) or 0
+    missing = sorted(user_id for user_id in requested - existing if 0 < user_id < issued_below)
+    if missing:
+        _insert_guests(db, missing)
+    return existing.union(missing)
+
+
+def ensure_user(db, user_id: Hashable) -> None:
+    """ensure_users() for one id that must be valid, e.g. before saving results."""
+    if int(user_id) not in ensure_users(db, [int(user_id)]):
+        raise ValueError(f"User id {user_id} was never issued")
+
+
+def _insert_guests(db, user_ids: Iterable[int]) -> None:
+    now = datetime.utcnow()
+    values = [{
+        "user_id": user_id,
+        "email": f"guest_{uuid.uuid4()}@wellchemy.ai",
+        "password_hash": "auto-created",
+        "first_login": now,
+        "last_login": now,
+    } for user_id in user_ids]
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        db.add_all(User(**value) for value in values)
+        db.flush()
+        return
+    db.execute(insert(User.__table__).on_conflict_do_nothing(index_elements=["user_id"]), values)
+
+
+class GuestIds:
+    """Hands out guest user ids from reserved blocks; their rows come from ensure_users()."""
+
+    def __init__(self, block_size: int = GUEST_ID_BLOCK):
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _block_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    async def new(self) -> int:
+        """A fresh guest id; no database round trip unless the current block is used up."""
+        if self._next >= self._end:
+            async with self._block_lock():
+                if self._next >= self._end:
+                    start = await asyncio.to_thread(_reserve_block, self.block_size)
+                    self._next, self._end = start, start + self.block_size
+                    guest_id_blocks.inc()
+        user_id = self._next
+        self._next += 1
+        guest_ids.inc()
+        return user_id
+
+
+def get_guest_ids() -> GuestIds:
+    """Return the process-wide guest id allocator."""
+    global _guests
+    if _guests is None:
+        _guests = GuestIds()
+    return _guests
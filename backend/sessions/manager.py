@@ -0,0 +1,167 @@
+"""
+Lifetime management for conversation state.
+
+Users who walk away mid-questionnaire would otherwise keep their flow, progress
+and answers in the session store forever. SessionManager records when each user
+was last active and a background sweeper evicts users idle longer than the TTL,
+plus the least recently active ones beyond a hard cap. Evicted state can be
+checkpointed to a second store and is restored on the user's next message.
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+from metrics import counter, gauge
+from .store import SessionMap, SessionStore, open_session_store
+
+# Users with no activity for this long are evicted
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+# Hard cap on live users; the least recently active are evicted beyond it
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "50000"))
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "60"))
+# Where evicted sessions are kept for resumption: "off", "sqlite:///path" or "redis://..."
+SESSION_CHECKPOINT = os.getenv("SESSION_CHECKPOINT", "off")
+
+ACTIVITY = "activity"
+CHECKPOINT_PREFIX = "checkpoint:"  # checkpoint namespaces, so one file can hold both stores
+
+sessions_live = gauge("sessions_live", "Users with conversation state, as of the last sweep")
+sessions_evicted = counter("sessions_evicted_total", "Users whose conversation state was evicted, by reason (idle, lru)", ("reason",))
+sessions_restored = counter("sessions_restored_total", "Evicted sessions restored from a checkpoint")
+
+
+class SessionManager:
+    """Idle-TTL and LRU eviction across a set of SessionMaps keyed by user id."""
+
+    def __init__(self, maps: List[SessionMap], idle_ttl: float = SESSION_IDLE_TTL_SECONDS,
+                 max_entries: int = SESSION_MAX_ENTRIES, sweep_interval: float = SESSION_SWEEP_SECONDS,
+                 checkpoint: Optional[SessionStore] = None, store: SessionStore = None):
+        self.maps = maps
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self.activity = SessionMap(ACTIVITY, store)
+        self.checkpoint = checkpoint
+        # Activity is rewritten at most this often per user, not on every message
+        self.touch_interval = min(60.0, idle_ttl / 10)
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # user -> last activity this worker recorded
+        self._evict_callbacks: List[Callable[[str], None]] = []
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def on_evict(self, callback: Callable[[str], None]) -> None:
+        """Register a callback dropping this worker's caches (chat memory, prefetches) for a user."""
+        self._evict_callbacks.append(callback)
+
+    async def touch(self, user_id: Hashable) -> None:
+        """Mark the user active, restoring their checkpointed session if it was evicted."""
+        key, now = str(user_id), time.time()
+        last = self._seen.get(key)
+        if last is not None:
+            self._seen.move_to_end(key)
+            if now - last < self.touch_interval:
+                return
+        if self.checkpoint is not None and await self.activity.get(key) is None:
+            await self._restore(key)
+        self._seen[key] = now
+        await self.activity.put(key, now)
+
+    async def sweep(self) -> int:
+        """Evict idle users and the least recently active beyond the cap; returns how many were evicted."""
+        now = time.time()
+        entries = sorted(await self.activity.items(), key=lambda item: item[1])
+        overflow = len(entries) - self.max_entries
+        evicted = set()
+        for position, (key, last_active) in enumerate(entries):
+            if position < overflow:
+                reason = "lru"
+            elif now - last_active > self.idle_ttl:
+                reason = "idle"
+            else:
+                break  # sorted oldest first, so everyone after this is fresher
+            if await self.evict(key, reason):
+                evicted.add(key)
+
+        # Drop this worker's caches for users evicted here or by another worker
+        live = {key for key, _ in entries} - evicted
+        for key in [key for key in self._seen if key not in live]:
+            self._forget(key)
+        sessions_live.set(len(live))
+        return len(evicted)
+
+    async def evict(self, user_id: Hashable, reason: str = "idle") -> bool:
+        key = str(user_id)
+        if reason == "idle":
+            # Another worker may have seen the user since the sweep read the activity
+            last_active = await self.activity.get(key)
+            if last_active is not None and time.time() - last_active <= self.idle_ttl:
+                return False
+
+        for sessions in self.maps:
+            # Checkpoints keep the encoded bytes, whatever each map's codec
+            raw = await sessions.store.get(sessions.namespace, key) if self.checkpoint is not None else None
+            # A concurrent sweep on another worker may already have taken it; don't overwrite its checkpoint
+            if raw is not None:
+                await self.checkpoint.set(CHECKPOINT_PREFIX + sessions.namespace, key, raw)
+            await sessions.pop(key)
+        await self.activity.pop(key)
+
+        self._forget(key)
+        sessions_evicted.inc(reason=reason)
+        return True
+
+    async def _restore(self, key: str) -> None:
+        restored = False
+        for sessions in self.maps:
+            namespace = CHECKPOINT_PREFIX + sessions.namespace
+            raw = await self.checkpoint.get(namespace, key)
+            if raw is not None:
+                await sessions.store.set(sessions.namespace, key, raw)
+                await self.checkpoint.delete(namespace, key)
+                restored = True
+        if restored:
+            sessions_restored.inc()
+            print(f"♻️ Restored checkpointed session for user {key}")
+
+    def _forget(self, key: str) -> None:
+        self._seen.pop(key, None)
+        for callback in self._evict_callbacks:
+            try:
+                callback(key)
+            except Exception as e:
+                print(f"⚠️ Session eviction callback failed for user {key}: {e}")
+
+    def start(self) -> None:
+        """Run the sweeper in the background until stop()."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self._sweep_forever())
+
+    async def stop(self) -> None:
+        """Stop the sweeper and close the checkpoint store."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        if self.checkpoint is not None:
+            await self.checkpoint.close()
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                evicted = await self.sweep()
+                if evicted:
+                    print(f"🧹 Evicted {evicted} idle sessions")
+            except Exception as e:
+                print(f"⚠️ Session sweep failed: {e}")
+
+
+def open_checkpoint_store(url: str = SESSION_CHECKPOINT) -> Optional[SessionStore]:
+    """Store for evicted sessions, or None when checkpointing is off."""
+    if not url or url == "off":
+        return None
+    return open_session_store(url)
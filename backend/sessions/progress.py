@@ -0,0 +1,194 @@
+"""
+Durable checkpoints of partially completed assessments.
+
+After every answer a flow's encoded session (see sessions.state) is upserted
+into assessment_progress, one row per user and flow, so a lost worker, an
+evicted session or a second device resumes where the user left off instead of
+starting the questionnaire (and its LLM calls) over.
+
+Agents go through ProgressWriter, which keeps the request path free of commits:
+it coalesces to the latest state per user and flow and hands whatever is
+pending to the write-behind queue as one write, so checkpoints commit on the
+same single writer as everything else. The module-level functions block.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Tuple
+from sqlalchemy import delete, select
+from db_connection import SessionLocal
+from models import AssessmentProgress
+from metrics import counter, histogram
+from write_behind import get_write_behind
+from .guests import ensure_users
+
+DIET = "diet"
+ELIGIBILITY = "eligibility"
+
+progress_writes = counter("assessment_progress_writes_total", "Assessment progress checkpoints upserted, by flow", ("flow",))
+progress_resumes = counter("assessment_progress_resumes_total", "Assessments resumed from a database checkpoint, by flow", ("flow",))
+progress_batch_size = histogram("assessment_progress_batch_size", "Checkpoints upserted per background transaction",
+                                buckets=(1, 2, 5, 10, 25, 50, 100, 250))
+
+_writer: Optional["ProgressWriter"] = None
+
+
+def db_user_id(user_id: Hashable) -> Optional[int]:
+    """The users.user_id for a chat user id, or None for ids that aren't database users."""
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _upsert(db, rows: Dict[Tuple[int, str], bytes]) -> None:
+    now = datetime.utcnow()
+    values = [{"user_id": uid, "flow": flow, "state": state, "updated_at": now} for (uid, flow), state in rows.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        for value in values:
+            db.merge(AssessmentProgress(**value))
+        return
+    statement = insert(AssessmentProgress)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["user_id", "flow"],
+        set_={"state": statement.excluded.state, "updated_at": statement.excluded.updated_at}
+    ), values)
+
+
+def write_progress_batch(db, rows: Dict[Tuple[int, str], bytes]) -> None:
+    """Upsert checkpoints keyed by (user_id, flow) inside the caller's transaction."""
+    known = ensure_users(db, (uid for uid, _ in rows))  # a guest's first checkpoint writes their users row
+    rows = {key: state for key, state in rows.items() if key[0] in known}  # ids never issued keep no checkpoint
+    if rows:
+        _upsert(db, rows)
+
+
+def save_progress_batch(rows: Dict[Tuple[int, str], bytes]) -> None:
+    """Upsert checkpoints keyed by (user_id, flow) in one transaction."""
+    db = SessionLocal()
+    try:
+        write_progress_batch(db, rows)
+        db.commit()
+        for _, flow in rows:
+            progress_writes.inc(flow=flow)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def save_progress(user_id: Hashable, flow: str, state: bytes) -> None:
+    """Upsert the user's checkpoint for a flow (one statement, one small row)."""
+    uid = db_user_id(user_id)
+    if uid is not None:
+        save_progress_batch({(uid, flow): state})
+
+
+def load_progress(user_id: Hashable, flow: str) -> Optional[bytes]:
+    """The user's checkpoint for a flow, if they left it unfinished."""
+    uid = db_user_id(user_id)
+    if uid is None:
+        return None
+    db = SessionLocal()
+    try:
+        state = db.scalar(select(AssessmentProgress.state).where(
+            AssessmentProgress.user_id == uid, AssessmentProgress.flow == flow
+        ))
+    finally:
+        db.close()
+    if state is not None:
+        progress_resumes.inc(flow=flow)
+    return state
+
+
+def active_flow(user_id: Hashable) -> Optional[str]:
+    """The flow the user most recently answered a question in and hasn't finished, if any."""
+    uid = db_user_id(user_id)
+    if uid is None:
+        return None
+    db = SessionLocal()
+    try:
+        return db.scalar(
+            select(AssessmentProgress.flow)
+            .where(AssessmentProgress.user_id == uid)
+            .order_by(AssessmentProgress.updated_at.desc())
+            .limit(1)
+        )
+    finally:
+        db.close()
+
+
+def clear_progress(db, user_id: Hashable, flow: str) -> None:
+    """Drop the checkpoint inside the caller's transaction, e.g. alongside the final results."""
+    uid = db_user_id(user_id)
+    if uid is not None:
+        db.execute(delete(AssessmentProgress).where(AssessmentProgress.user_id == uid, AssessmentProgress.flow == flow))
+
+
+class ProgressWriter:
+    """Coalescing write-behind for checkpoints: the latest state per (user, flow) wins."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, str], bytes] = {}
+        self._writing: Dict[Tuple[int, str], bytes] = {}  # rows in the transaction currently running
+        self._flushing: Optional[asyncio.Task] = None
+        self._batch: Optional[asyncio.Future] = None
+
+    def save(self, user_id: Hashable, flow: str, state: bytes) -> None:
+        """Queue a checkpoint; returns immediately."""
+        uid = db_user_id(user_id)
+        if uid is None:
+            return
+        self._pending[(uid, flow)] = state
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.ensure_future(self._flush())
+
+    async def load(self, user_id: Hashable, flow: str) -> Optional[bytes]:
+        """The newest checkpoint: still queued here, or from the database."""
+        uid = db_user_id(user_id)
+        if uid is None:
+            return None
+        for rows in (self._pending, self._writing):
+            if (uid, flow) in rows:
+                return rows[(uid, flow)]
+        return await asyncio.to_thread(load_progress, uid, flow)
+
+    async def discard(self, user_id: Hashable, flow: str) -> None:
+        """Drop a queued checkpoint and wait out any running write, before the flow's row is cleared."""
+        uid = db_user_id(user_id)
+        self._pending.pop((uid, flow), None)
+        if self._batch is not None and not self._batch.done():
+            await asyncio.wait([self._batch])
+
+    async def flush(self) -> None:
+        """Write everything queued (shutdown and tests)."""
+        while self._flushing is not None and not self._flushing.done():
+            await asyncio.wait([self._flushing])
+
+    async def _flush(self) -> None:
+        while self._pending:
+            self._writing, self._pending = self._pending, {}
+            progress_batch_size.observe(len(self._writing))
+            rows = self._writing
+            self._batch = asyncio.ensure_future(get_write_behind().write(lambda db: write_progress_batch(db, rows)))
+            try:
+                await self._batch
+                for _, flow in rows:
+                    progress_writes.inc(flow=flow)
+            except Exception as e:
+                print(f"⚠️ Could not checkpoint assessment progress for {len(self._writing)} sessions: {e}")
+            finally:
+                self._writing = {}
+
+
+def get_progress_writer() -> ProgressWriter:
+    global _writer
+    if _writer is None:
+        _writer = ProgressWriter()
+    return _writer
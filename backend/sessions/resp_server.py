@@ -0,0 +1,185 @@
+"""
+Minimal in-process server speaking the Redis protocol (RESP2).
+
+Implements just the commands the session store needs (GET, MGET, SET with EX/PX,
+DEL, EXISTS, EXPIRE/PEXPIRE, TTL, SCAN, KEYS, FLUSHDB, PING, ...) so tests and
+local multi-worker runs can exercise RedisSessionStore without a Redis install.
+
+    python -m sessions.resp_server --port 6379
+"""
+
+import time
+import asyncio
+import fnmatch
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+
+class RespServer:
+    """Single-database, in-memory key/value server; not a full Redis."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}  # key -> (value, expires_at)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> "RespServer":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                writer.write(self._dispatch(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        header = await reader.readline()
+        if not header:
+            return None
+        if not header.startswith(b"*"):
+            return header.split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    # --- encoding ---
+
+    @staticmethod
+    def _bulk(value: Optional[bytes]) -> bytes:
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    @staticmethod
+    def _int(value: int) -> bytes:
+        return b":%d\r\n" % value
+
+    def _array(self, items: List[bytes]) -> bytes:
+        return b"*%d\r\n" % len(items) + b"".join(self._bulk(item) for item in items)
+
+    # --- data ---
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def _live_keys(self, pattern: bytes = b"*") -> List[bytes]:
+        match = pattern.decode()
+        return [key for key in list(self._data) if self._live(key) is not None and fnmatch.fnmatchcase(key.decode(), match)]
+
+    def _dispatch(self, command: List[bytes]) -> bytes:
+        name, args = command[0].upper().decode(), command[1:]
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            return b"-ERR unknown command '%s'\r\n" % name.encode()
+        try:
+            return handler(*args)
+        except (TypeError, ValueError, IndexError):
+            return b"-ERR wrong number or type of arguments for '%s'\r\n" % name.encode()
+
+    def _cmd_ping(self, message: bytes = None) -> bytes:
+        return self._bulk(message) if message else b"+PONG\r\n"
+
+    def _cmd_client(self, *args) -> bytes:
+        return b"+OK\r\n"  # SETNAME / SETINFO from client libraries
+
+    def _cmd_select(self, db: bytes) -> bytes:
+        return b"+OK\r\n"
+
+    def _cmd_get(self, key: bytes) -> bytes:
+        return self._bulk(self._live(key))
+
+    def _cmd_mget(self, *keys: bytes) -> bytes:
+        return self._array([self._live(key) for key in keys])
+
+    def _cmd_set(self, key: bytes, value: bytes, *options: bytes) -> bytes:
+        expires_at, options = None, [o.upper() for o in options]
+        if b"NX" in options and self._live(key) is not None:
+            return self._bulk(None)
+        if b"XX" in options and self._live(key) is None:
+            return self._bulk(None)
+        for unit, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+            if unit in options:
+                expires_at = time.time() + float(options[options.index(unit) + 1]) * scale
+        self._data[key] = (value, expires_at)
+        return b"+OK\r\n"
+
+    def _cmd_del(self, *keys: bytes) -> bytes:
+        return self._int(sum(self._data.pop(key, None) is not None for key in keys))
+
+    def _cmd_exists(self, *keys: bytes) -> bytes:
+        return self._int(sum(self._live(key) is not None for key in keys))
+
+    def _cmd_expire(self, key: bytes, seconds: bytes) -> bytes:
+        return self._cmd_pexpire(key, str(float(seconds) * 1000).encode())
+
+    def _cmd_pexpire(self, key: bytes, milliseconds: bytes) -> bytes:
+        value = self._live(key)
+        if value is None:
+            return self._int(0)
+        self._data[key] = (value, time.time() + float(milliseconds) / 1000)
+        return self._int(1)
+
+    def _cmd_ttl(self, key: bytes) -> bytes:
+        if self._live(key) is None:
+            return self._int(-2)
+        expires_at = self._data[key][1]
+        return self._int(-1 if expires_at is None else max(0, round(expires_at - time.time())))
+
+    def _cmd_keys(self, pattern: bytes) -> bytes:
+        return self._array(self._live_keys(pattern))
+
+    def _cmd_scan(self, cursor: bytes, *options: bytes) -> bytes:
+        # Everything fits in one page: return cursor 0 with all matches
+        options = list(options)
+        upper = [o.upper() for o in options]
+        pattern = options[upper.index(b"MATCH") + 1] if b"MATCH" in upper else b"*"
+        keys = self._live_keys(pattern)
+        return b"*2\r\n" + self._bulk(b"0") + self._array(keys)
+
+    def _cmd_dbsize(self) -> bytes:
+        return self._int(len(self._live_keys()))
+
+    def _cmd_flushdb(self, *args) -> bytes:
+        self._data.clear()
+        return b"+OK\r\n"
+
+
+async def _main(host: str, port: int) -> None:
+    server = await RespServer(host, port).start()
+    print(f"🧪 RESP stand-in listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal Redis-protocol server for tests and local runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port))
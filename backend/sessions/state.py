@@ -0,0 +1,91 @@
+"""
+Compact per-user questionnaire state.
+
+Slotted objects instead of dicts of dicts: diet answers are one signed byte per
+category ordinal, eligibility progress is a stage enum plus an index. Each type
+has a versioned binary form, which is also what the session store holds.
+"""
+
+import json
+import struct
+from array import array
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+FORMAT_VERSION = 1
+
+
+class Stage(IntEnum):
+    """Where a user is in the eligibility flow."""
+    INITIAL = 0
+    BRANCH = 1      # insurer-specific questions
+    UNBRANCH = 2    # questions everyone answers
+
+
+class DietSession:
+    """Progress through the diet screener: the next category ordinal and an answer per category."""
+
+    __slots__ = ("index", "answers")
+
+    UNANSWERED = -1
+    _HEADER = struct.Struct("<BH")  # version, index
+
+    def __init__(self, size: int, index: int = 0, answers: array = None):
+        self.index = index
+        self.answers = answers if answers is not None else array("b", [self.UNANSWERED]) * size
+
+    @property
+    def collecting(self) -> bool:
+        return self.index < len(self.answers)
+
+    def record(self, times_per_week: int) -> None:
+        """Store the answer to the current category and move to the next one."""
+        self.answers[self.index] = times_per_week
+        self.index += 1
+
+    def as_dict(self, categories: List[str]) -> Dict[str, int]:
+        """Answered categories by name, the shape scoring and storage expect."""
+        return {category: value for category, value in zip(categories, self.answers) if value != self.UNANSWERED}
+
+    def to_bytes(self) -> bytes:
+        return self._HEADER.pack(FORMAT_VERSION, self.index) + self.answers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "DietSession":
+        version, index = cls._HEADER.unpack_from(raw)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported diet session format {version}")
+        answers = array("b")
+        answers.frombytes(raw[cls._HEADER.size:])
+        return cls(len(answers), index, answers)
+
+
+class EligibilitySession:
+    """Progress through the eligibility flow; answers are the user's free text by question key."""
+
+    __slots__ = ("stage", "index", "branch", "answers")
+
+    _HEADER = struct.Struct("<BBB")  # version, stage, index
+
+    def __init__(self, stage: Stage = Stage.INITIAL, index: int = 0, branch: Optional[str] = None,
+                 answers: Dict[str, str] = None):
+        self.stage = stage
+        self.index = index
+        self.branch = branch
+        self.answers = answers if answers is not None else {}
+
+    def advance(self, stage: Stage, branch: Optional[str] = None) -> None:
+        """Move to the first question of another stage."""
+        self.stage, self.index, self.branch = stage, 0, branch
+
+    def to_bytes(self) -> bytes:
+        tail = json.dumps([self.branch, self.answers], separators=(",", ":")).encode("utf-8")
+        return self._HEADER.pack(FORMAT_VERSION, self.stage, self.index) + tail
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "EligibilitySession":
+        version, stage, index = cls._HEADER.unpack_from(raw)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported eligibility session format {version}")
+        branch, answers = json.loads(raw[cls._HEADER.size:])
+        return cls(Stage(stage), index, branch, answers)
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+_store: Optional["SessionStore"] = None
+
+
+class SessionStore(ABC):
+    """
+    Byte-valued key/value store for conversation state, shared by every worker.
+
+    Keys live in namespaces (one per agent). Values are opaque bytes; SessionMap
+    handles encoding. Backends: in-process memory, SQLite (WAL) and Redis.
+    """
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    async def set(self, namespace: str, key: str, value: bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def keys(self, namespace: str) -> List[str]:
+        pass
+
+    async def items(self, namespace: str) -> List[Tuple[str, bytes]]:
+        """Every (key, value) in a namespace; backends override this with a single round trip."""
+        items = []
+        for key in await self.keys(namespace):
+            value = await self.get(namespace, key)
+            if value is not None:
+                items.append((key, value))
+        return items
+
+    async def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """Single-process store; the default, and what tests use."""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, bytes]] = {}
+
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self._data.get(namespace, {}).get(key)
+
+    async def set(self, namespace: str, key: str, value: bytes) -> None:
+        self._data.setdefault(namespace, {})[key] = value
+
+    async def delete(self, namespace: str, key: str) -> None:
+        self._data.get(namespace, {}).pop(key, None)
+
+    async def keys(self, namespace: str) -> List[str]:
+        return list(self._data.get(namespace, {}))
+
+    async def items(self, namespace: str) -> List[Tuple[str, bytes]]:
+        return list(self._data.get(namespace, {}).items())
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite file in WAL mode, shared by every worker on one host.
+
+    Queries are tiny, so they run on a worker thread over a single connection.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value BLOB NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(self.SCHEMA)
+
+    def _execute(self, sql: str, params=()) -> List[Any]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        rows = await asyncio.to_thread(self._execute, "SELECT value FROM sessions WHERE namespace = ? AND key = ?", (namespace, key))
+        return rows[0][0] if rows else None
+
+    async def set(self, namespace: str, key: str, value: bytes) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO sessions (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (namespace, key, value, time.time())
+        )
+
+    async def delete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM sessions WHERE namespace = ? AND key = ?", (namespace, key))
+
+    async def keys(self, namespace: str) -> List[str]:
+        rows = await asyncio.to_thread(self._execute, "SELECT key FROM sessions WHERE namespace = ?", (namespace,))
+        return [row[0] for row in rows]
+
+    async def items(self, namespace: str) -> List[Tuple[str, bytes]]:
+        rows = await asyncio.to_thread(self._execute, "SELECT key, value FROM sessions WHERE namespace = ?", (namespace,))
+        return [(row[0], row[1]) for row in rows]
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions in Redis (or anything speaking its protocol), shared across hosts."""
+
+    def __init__(self, url: str, prefix: str = "wellchemy"):
+        if importlib.util.find_spec("redis") is None:
+            raise RuntimeError("SESSION_STORE points at Redis but the 'redis' package is not installed")
+        import redis.asyncio
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.asyncio.Redis.from_url(url, protocol=2)
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    async def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return await self.client.get(self._key(namespace, key))
+
+    async def set(self, namespace: str, key: str, value: bytes) -> None:
+        await self.client.set(self._key(namespace, key), value)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        await self.client.delete(self._key(namespace, key))
+
+    async def keys(self, namespace: str) -> List[str]:
+        prefix = self._key(namespace, "")
+        return [key.decode()[len(prefix):] async for key in self.client.scan_iter(match=prefix + "*")]
+
+    async def items(self, namespace: str) -> List[Tuple[str, bytes]]:
+        keys = await self.keys(namespace)
+        if not keys:
+            return []
+        values = await self.client.mget([self._key(namespace, key) for key in keys])
+        return [(key, value) for key, value in zip(keys, values) if value is not None]
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class JsonCodec:
+    """Default SessionMap encoding: compact JSON for plain values."""
+
+    @staticmethod
+    def encode(value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def decode(raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class BinaryCodec:
+    """Encoding for session types with to_bytes()/from_bytes() (see sessions.state)."""
+
+    def __init__(self, cls: type):
+        self.cls = cls
+
+    def encode(self, value: Any) -> bytes:
+        return value.to_bytes()
+
+    def decode(self, raw: bytes) -> Any:
+        return self.cls.from_bytes(raw)
+
+
+class SessionMap:
+    """
+    Async dict-like view of one namespace of the session store.
+
+    Values go through the codec (JSON unless given). Reads return a private copy,
+    so changes must be written back with put() - the same rule for every backend.
+    """
+
+    def __init__(self, namespace: str, store: SessionStore = None, codec: Any = JsonCodec):
+        self.namespace = namespace
+        self.codec = codec
+        self._store = store
+
+    @property
+    def store(self) -> SessionStore:
+        return self._store or get_session_store()
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        raw = await self.store.get(self.namespace, str(key))
+        return self.codec.decode(raw) if raw is not None else default
+
+    async def put(self, key: Hashable, value: Any) -> None:
+        await self.store.set(self.namespace, str(key), self.codec.encode(value))
+
+    async def pop(self, key: Hashable) -> None:
+        await self.store.delete(self.namespace, str(key))
+
+    async def keys(self) -> List[str]:
+        return await self.store.keys(self.namespace)
+
+    async def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self.codec.decode(raw)) for key, raw in await self.store.items(self.namespace)]
+
+
+def open_session_store(url: str) -> SessionStore:
+    """Build a store from a URL: "memory", "sqlite:///path/to/sessions.db" or "redis://host:port/db"."""
+    if url == "memory":
+        return MemorySessionStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url)
+    raise ValueError(f"Unknown SESSION_STORE: {url}")
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide store selected by SESSION_STORE (default: in-process memory)."""
+    global _store
+    if _store is None:
+        _store = open_session_store(os.getenv("SESSION_STORE", "memory"))
+    return _store
+
+
+def set_session_store(store: Optional[SessionStore]) -> None:
+    """Swap the process-wide store (used by tests)."""
+    global _store
+    _store = store
+
+
+async def close_session_store() -> None:
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
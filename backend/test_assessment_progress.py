@@ -0,0 +1,84 @@
+import asyncio
+from sessions import MemorySessionStore, SessionMap, Stage
+from sessions.guests import get_guest_ids
+from sessions.progress import DIET, ELIGIBILITY, active_flow, get_progress_writer, load_progress
+from write_behind import write_outcomes
+from agents.conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
+from agents.conversational_eligibility_agent import ConversationalEligibilityAgent
+
+
+def _fresh_worker(agent_class):
+    """An agent with an empty session store, as after a restart or on another worker."""
+    agent = agent_class()
+    agent.live_questions = False
+    agent.state = SessionMap(agent.state.namespace, MemorySessionStore(), agent.state.codec)
+    return agent
+
+
+def test_diet_assessment_resumes_after_restart():
+    async def main():
+        first = _fresh_worker(ConversationalDietaryAssessmentAgent)
+        user_id = (await first.process({"user_id": "default", "message": ""}))["data"]["user_id"]
+        for _ in range(5):
+            await first.process({"user_id": user_id, "message": "daily"})
+        await get_progress_writer().flush()
+        assert active_flow(user_id) == DIET
+
+        second = _fresh_worker(ConversationalDietaryAssessmentAgent)
+        response = await second.process({"user_id": user_id, "message": ""})
+        assert second.categories[5] in response["data"]["response"]
+
+        for _ in second.categories[5:]:
+            response = await second.process({"user_id": user_id, "message": "never"})
+        assert response["message"] == "Assessment complete"
+        assert load_progress(user_id, DIET) is None
+
+    asyncio.run(main())
+
+
+def test_eligibility_check_resumes_mid_branch():
+    async def main():
+        first = _fresh_worker(ConversationalEligibilityAgent)
+        user_id = await get_guest_ids().new()
+        for answer in ("", "32801", "florida blue", "FB123"):
+            await first.process({"user_id": user_id, "message": answer})
+
+        second = _fresh_worker(ConversationalEligibilityAgent)
+        await second.process({"user_id": user_id, "message": "4"})
+        await get_progress_writer().flush()
+        session = await second.state.get(user_id)
+        assert session.stage == Stage.UNBRANCH and session.index == 0
+        assert session.answers["zip"] == "32801" and session.answers["florida_blue_member_id"] == "FB123"
+        assert session.answers["medications_per_day"] == "4"
+        assert active_flow(user_id) == ELIGIBILITY
+
+    asyncio.run(main())
+
+
+def test_text_after_an_eviction_with_nothing_to_resume_is_not_an_answer():
+    async def main():
+        user_id = await get_guest_ids().new()
+        for agent_class in (ConversationalEligibilityAgent, ConversationalDietaryAssessmentAgent):
+            agent = _fresh_worker(agent_class)
+            await agent.process({"user_id": user_id, "message": "sorry, where were we?"})
+            assert (await agent.state.get(user_id)).index == 0
+        await get_progress_writer().flush()
+        assert load_progress(user_id, ELIGIBILITY) is None and load_progress(user_id, DIET) is None
+
+    asyncio.run(main())
+
+
+def test_checkpoints_commit_through_the_write_behind_queue():
+    committed = write_outcomes.value(outcome="committed")
+
+    async def main():
+        writer = get_progress_writer()
+        user_ids = [await get_guest_ids().new() for _ in range(3)]
+        for user_id in user_ids:
+            writer.save(user_id, DIET, b"state")
+        await writer.flush()
+        return user_ids
+
+    user_ids = asyncio.run(main())
+    assert write_outcomes.value(outcome="committed") - committed == 1  # coalesced into one write
+    assert all(load_progress(user_id, DIET) == b"state" for user_id in user_ids)
@@ -0,0 +1,50 @@
+import asyncio
+from agents.conversation_memory import ConversationMemory
+from llm.tokens import count_message_tokens, count_tokens, truncate_tokens
+
+
+def test_history_stays_within_budget_and_keeps_recent_turns():
+    """However long the chat, the context sent per call stays under the token budget."""
+    summarized = []
+
+    async def summarize(summary, turns):
+        summarized.extend(turns)
+        return (summary + " " + " ".join(t["content"] for t in turns)).strip()
+
+    async def main():
+        memory = ConversationMemory(summarize, budget_tokens=200, summary_tokens=60)
+        for n in range(50):
+            memory.add("u1", "user", f"Question {n}: is oatmeal with berries a good breakfast for my diabetes?")
+            memory.add("u1", "assistant", f"Answer {n}: yes, steel-cut oats and berries are a great low-GI choice.")
+            await memory.flush("u1")
+            assert count_message_tokens(memory.context("u1")) <= 200
+        return memory.context("u1")
+
+    context = asyncio.run(main())
+    assert context[0]["role"] == "system" and context[0]["content"].startswith("Summary")
+    assert context[-1]["content"].startswith("Answer 49")
+    assert summarized and summarized[0]["content"].startswith("Question 0")
+
+
+def test_failed_summary_falls_back_to_an_extract():
+    """If the summarizer is unavailable, evicted turns are kept as a truncated extract."""
+    async def broken(summary, turns):
+        raise RuntimeError("LLM down")
+
+    async def main():
+        memory = ConversationMemory(broken, budget_tokens=120, summary_tokens=40)
+        for n in range(10):
+            memory.add("u1", "user", f"I am allergic to shellfish, message {n}")
+        await memory.flush("u1")
+        return memory.context("u1")
+
+    context = asyncio.run(main())
+    assert "shellfish" in context[0]["content"]
+    assert count_message_tokens(context) <= 120
+
+
+def test_truncate_tokens_keeps_requested_end():
+    text = "one two three four five six seven eight"
+    assert count_tokens(truncate_tokens(text, 3)) <= 3
+    assert truncate_tokens(text, 3, keep="start").startswith("one")
+    assert truncate_tokens(text, 3).endswith("eight")
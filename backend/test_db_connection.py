@@ -0,0 +1,20 @@
+from sqlalchemy import text
+from db_connection import create_db_engine
+
+
+def _pragmas(engine):
+    with engine.connect() as connection:
+        return {name: connection.execute(text(f"PRAGMA {name}")).scalar() for name in ("journal_mode", "synchronous", "busy_timeout")}
+
+
+def test_production_profile_tunes_every_connection(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'prod.db'}", "production")
+    assert _pragmas(engine) == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000}
+    assert engine.pool.size() == 8
+    engine.dispose()
+
+
+def test_legacy_profile_keeps_sqlite_defaults(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'legacy.db'}", "legacy")
+    assert _pragmas(engine)["journal_mode"] == "delete"
+    engine.dispose()
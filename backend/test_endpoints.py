@@ -1,28 +1,39 @@
-import requests
+import os
+import re
 import json
 import asyncio
+
+# Runs against the offline fake LLM unless a backend is chosen explicitly
+os.environ.setdefault("LLM_BACKEND", "fake")
+
 from app import app
 
 def test_health():
     """Test the health check endpoint."""
-    with app.test_client() as client:
-        response = client.get('/health')
+    asyncio.run(_test_health())
+
+async def _test_health():
+    async with app.test_client() as client:
+        response = await client.get('/health')
         assert response.status_code == 200
-        assert response.json == {'status': 'healthy'}
+        assert await response.get_json() == {'status': 'healthy'}
         print("✅ Health check endpoint working")
 
 def test_chat():
     """Test the chat endpoint with the primary assistant."""
-    with app.test_client() as client:
+    asyncio.run(_test_chat())
+
+async def _test_chat():
+    async with app.test_client() as client:
         data = {
             "message": "What is food as medicine?"
         }
-        response = client.post('/chat', json=data)
+        response = await client.post('/chat', json=data)
         if response.status_code != 200:
             print(f"❌ Chat endpoint failed with status code {response.status_code}")
-            print("Response content:", response.data.decode())
+            print("Response content:", (await response.get_data()).decode())
         assert response.status_code == 200
-        result = response.json
+        result = await response.get_json()
         assert 'success' in result
         assert 'message' in result
         assert 'data' in result
@@ -32,14 +43,17 @@ def test_chat():
 
 def test_user():
     """Test the user endpoint with the user agent."""
-    with app.test_client() as client:
+    asyncio.run(_test_user())
+
+async def _test_user():
+    async with app.test_client() as client:
         data = {
             "message": "I'm a new user, how do I get started?",
             "context": {"is_new_user": True}
         }
-        response = client.post('/user', json=data)
+        response = await client.post('/user', json=data)
         assert response.status_code == 200
-        result = response.json
+        result = await response.get_json()
         assert 'success' in result
         assert 'message' in result
         assert 'data' in result
@@ -49,7 +63,10 @@ def test_user():
 
 def test_dietary():
     """Test the dietary endpoint with the dietary assessment agent."""
-    with app.test_client() as client:
+    asyncio.run(_test_dietary())
+
+async def _test_dietary():
+    async with app.test_client() as client:
         data = {
             "message": "I want to improve my diet",
             "dietary_data": {
@@ -61,9 +78,9 @@ def test_dietary():
                 "conditions": ["IBS"]
             }
         }
-        response = client.post('/dietary', json=data)
+        response = await client.post('/dietary', json=data)
         assert response.status_code == 200
-        result = response.json
+        result = await response.get_json()
         assert 'success' in result
         assert 'message' in result
         assert 'data' in result
@@ -71,6 +88,78 @@ def test_dietary():
         print("✅ Dietary endpoint working")
         print("Response:", result['data']['response'])
 
+def _sse_events(body: str):
+    """Split an SSE body into (event, data) pairs, checking each block is one event line and one data line."""
+    assert body.endswith("\n\n")
+    events = []
+    for block in body.strip("\n").split("\n\n"):
+        event_line, data_line = block.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+def test_chat_stream():
+    """Test the SSE variant of /chat: tokens, then usage, then the /chat envelope."""
+    asyncio.run(_test_chat_stream())
+
+async def _test_chat_stream():
+    async with app.test_client() as client:
+        response = await client.post('/chat/stream', json={"message": "How can I sleep better?", "user_id": "sse-test"})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        events = _sse_events((await response.get_data()).decode())
+        names = [name for name, _ in events]
+        assert names[-2:] == ['usage', 'done'] and set(names[:-2]) == {'token'}
+        tokens = "".join(data['content'] for name, data in events if name == 'token')
+        usage, done = events[-2][1], events[-1][1]
+        assert usage['calls'] >= 1 and usage['prompt_tokens'] > 0 and usage['completion_tokens'] > 0
+        assert done['success'] and done['data']['response'] == tokens
+
+def test_chat_stream_error(monkeypatch):
+    """A failure while answering ends the stream with an error event."""
+    import app as app_module
+
+    async def failing(data, on_token=None):
+        raise RuntimeError("assistant exploded")
+
+    monkeypatch.setattr(app_module.primary_assistant, "process", failing)
+    asyncio.run(_test_chat_stream_error())
+
+async def _test_chat_stream_error():
+    async with app.test_client() as client:
+        response = await client.post('/chat/stream', json={"message": "hi"})
+        assert _sse_events((await response.get_data()).decode()) == [('error', {'error': 'assistant exploded'})]
+
+# One exposition-format line: HELP/TYPE comment or `name{label="value",...} number`
+_LABEL_VALUE = r'"(?:[^"\\\n]|\\[\\"n])*"'
+_METRIC_LINE = re.compile(
+    r'# HELP [a-zA-Z_:][a-zA-Z0-9_:]* [^\n]*'
+    r'|# TYPE [a-zA-Z_:][a-zA-Z0-9_:]* (?:counter|gauge|histogram|untyped)'
+    r'|[a-zA-Z_:][a-zA-Z0-9_:]*(?:\{[a-zA-Z_][a-zA-Z0-9_]*=' + _LABEL_VALUE
+    + r'(?:,[a-zA-Z_][a-zA-Z0-9_]*=' + _LABEL_VALUE + r')*\})? [-+]?(?:[0-9.e+-]+|Inf|NaN)'
+)
+
+def test_metrics():
+    """Test the Prometheus scrape endpoint after a chat turn."""
+    asyncio.run(_test_metrics())
+
+async def _test_metrics():
+    from metrics import counter
+    counter("test_escaping_total", "Label escaping check", ("value",)).inc(value='say "hi" \\ bye\n')
+    async with app.test_client() as client:
+        await client.post('/chat', json={"message": "What is food as medicine?", "user_id": "metrics-test"})
+        response = await client.get('/metrics')
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = (await response.get_data()).decode()
+
+    lines = body.rstrip("\n").split("\n")
+    assert [line for line in lines if not _METRIC_LINE.fullmatch(line)] == []
+    assert '# HELP llm_calls_total ' in body and '# TYPE llm_calls_total counter' in body
+    assert '# TYPE llm_call_duration_seconds histogram' in body
+    assert re.search(r'^llm_calls_total\{agent="PrimaryAssistant",model="[^"]+",outcome="ok"\} [0-9.]+$', body, re.M)
+    assert 'test_escaping_total{value="say \\"hi\\" \\\\ bye\\n"} 1' in body
+
 if __name__ == '__main__':
     print("Testing Wellchemy AI Backend Endpoints...")
     print("\n1. Testing Health Check...")
@@ -84,5 +173,8 @@ if __name__ == '__main__':
     
     print("\n4. Testing Dietary Endpoint...")
     test_dietary()
+
+    print("\n5. Testing Chat Stream Endpoint...")
+    test_chat_stream()
     
     print("\nAll tests completed! 🎉") 
\ No newline at end of file
@@ -0,0 +1,44 @@
+import pytest
+from agents.frequency_parser import parse_frequency, to_bucket, BUCKETS
+
+
+@pytest.mark.parametrize("answer, per_week", [
+    ("never", 0),
+    ("no", 0),
+    ("I don't eat fish", 0),
+    ("daily", 7),
+    ("Every day", 7),
+    ("every other day", 3.5),
+    ("most days", 5),
+    ("occasionally", 2),
+    ("3", 3),
+    ("about 3", 3),
+    ("5 days a week", 5),
+    ("2-3 times a week", 2.5),
+    ("2 to 3 times per week", 2.5),
+    ("once or twice a week", 1.5),
+    ("a few times a week", 3),
+    ("twice a day", 14),
+    ("twice daily", 14),
+    ("less than once a week", 0.5),
+    ("nevertheless I have it daily", 7),
+])
+def test_parses_common_answers(answer, per_week):
+    """Common phrasings resolve locally to a times-per-week number."""
+    assert parse_frequency(answer) == pytest.approx(per_week)
+
+
+@pytest.mark.parametrize("answer", ["", "huh", "I have no idea", "not every day", "daily or never"])
+def test_unsure_answers_return_none(answer):
+    """Unknown, negated or contradictory answers are left for the LLM fallback."""
+    assert parse_frequency(answer) is None
+
+
+def test_once_a_month_is_less_than_weekly():
+    assert to_bucket(parse_frequency("once a month")) == "Less than 1x/week"
+
+
+@pytest.mark.parametrize("bucket", BUCKETS)
+def test_buckets_round_trip(bucket):
+    """The LLM fallback replies with a bucket name, which must parse back to itself."""
+    assert to_bucket(parse_frequency(bucket)) == bucket
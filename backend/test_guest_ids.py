@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+from db_connection import SessionLocal
+from models import AssessmentProgress, DietAssessment, User
+from sessions import MemorySessionStore, SessionMap
+from sessions.guests import GuestIds, ensure_user, ensure_users, get_guest_ids, guest_id_blocks
+from sessions.progress import get_progress_writer
+from agents.conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
+from agents.conversational_eligibility_agent import ConversationalEligibilityAgent
+from agents.eligibility_agent import EligibilityAgent
+
+
+def _count(model, user_id) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(model).filter_by(user_id=int(user_id)).count()
+    finally:
+        db.close()
+
+
+def _fresh_worker(agent_class):
+    agent = agent_class()
+    agent.live_questions = False
+    agent.state = SessionMap(agent.state.namespace, MemorySessionStore(), agent.state.codec)
+    return agent
+
+
+def test_guest_row_is_written_with_the_first_answer():
+    async def main():
+        agent = _fresh_worker(ConversationalDietaryAssessmentAgent)
+        user_id = (await agent.process({"user_id": "default", "message": ""}))["data"]["user_id"]
+        await get_progress_writer().flush()
+        assert _count(User, user_id) == 0  # opening the flow and leaving costs no row
+
+        await agent.process({"user_id": user_id, "message": "daily"})
+        await get_progress_writer().flush()
+        assert _count(User, user_id) == 1
+
+    asyncio.run(main())
+
+
+def test_results_never_orphan_without_a_checkpoint():
+    """Results for a guest id nobody has saved anything for yet still get a users row."""
+    async def main():
+        agent = _fresh_worker(ConversationalDietaryAssessmentAgent)
+        user_id = await get_guest_ids().new()
+        await agent._save_and_finish(user_id, {category: 3 for category in agent.categories})
+        return user_id
+
+    user_id = asyncio.run(main())
+    assert _count(DietAssessment, user_id) == 1
+    assert _count(User, user_id) == 1
+
+
+def test_opening_the_eligibility_check_saves_nothing():
+    async def main():
+        agent = _fresh_worker(ConversationalEligibilityAgent)
+        first = await agent.process({"user_id": "default", "message": ""})
+        second = await agent.process({"user_id": "default", "message": ""})
+        await get_progress_writer().flush()
+        ids = [first["data"]["user_id"], second["data"]["user_id"]]
+        assert None not in ids and ids[0] != ids[1]
+        assert first["data"]["response"] in agent._all_questions()
+        assert all(_count(User, user_id) == 0 and _count(AssessmentProgress, user_id) == 0 for user_id in ids)
+
+        response = await agent.process({"user_id": ids[0], "message": "32801"})
+        await get_progress_writer().flush()
+        assert response["data"]["user_id"] == ids[0]
+        assert (await agent.state.get(ids[0])).answers == {"zip": "32801"}
+        assert _count(User, ids[0]) == 1 and _count(AssessmentProgress, ids[0]) == 1
+
+    asyncio.run(main())
+
+
+def test_guest_ids_come_from_one_block_and_never_collide():
+    async def main():
+        guests = GuestIds(block_size=50)
+        blocks = guest_id_blocks.value()
+        ids = await asyncio.gather(*(guests.new() for _ in range(50)))
+        assert guest_id_blocks.value() - blocks == 1
+        assert sorted(ids) == list(range(ids[0], ids[0] + 50))
+        return ids
+
+    ids = asyncio.run(main())
+    db = SessionLocal()
+    # A regular signup while the block is outstanding gets an id past it
+    user = User(email=f"member_{ids[0]}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    assert user.user_id > max(ids)
+
+    ensure_users(db, [ids[7], user.user_id])
+    ensure_users(db, [ids[7]])  # idempotent
+    db.commit()
+    assert db.get(User, user.user_id).email == f"member_{ids[0]}@example.com"
+    db.close()
+    assert _count(User, ids[7]) == 1
+    assert not any(_count(User, user_id) for user_id in ids if user_id != ids[7])
+
+
+def test_legacy_eligibility_agent_never_shares_sessions():
+    async def main():
+        agent = EligibilityAgent()
+        first = await agent.process({"user_id": "default", "message": ""})
+        second = await agent.process({"user_id": "default", "message": ""})
+        assert first["data"]["user_id"] != second["data"]["user_id"]
+        assert len(agent.state) == 2
+
+    asyncio.run(main())
+
+
+def test_ids_that_were_never_issued_get_no_row():
+    """A client can't claim an id the allocator hasn't handed out yet (a later guest or member would inherit it)."""
+    async def main():
+        guests = GuestIds(block_size=5)
+        issued = await guests.new()
+        return issued, issued + 5  # the first id of a block nobody has reserved yet
+
+    issued, unissued = asyncio.run(main())
+    db = SessionLocal()
+    try:
+        assert ensure_users(db, [issued, unissued]) == {issued}
+        with pytest.raises(ValueError):
+            ensure_user(db, unissued)
+        db.commit()
+    finally:
+        db.close()
+    assert _count(User, issued) == 1 and _count(User, unissued) == 0
+
+    agent = _fresh_worker(ConversationalDietaryAssessmentAgent)
+    with pytest.raises(ValueError):
+        asyncio.run(agent._save_and_finish(unissued, {category: 3 for category in agent.categories}))
+    assert _count(DietAssessment, unissued) == 0
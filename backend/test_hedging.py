@@ -0,0 +1,62 @@
+import asyncio
+import httpx
+import pytest
+from openai import APIStatusError
+from llm import hedging
+from llm.hedging import Hedger, MIN_SAMPLES, hedges, with_retries
+
+
+def _status_error(status: int) -> APIStatusError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return APIStatusError("boom", response=httpx.Response(status, request=request), body=None)
+
+
+def test_slow_request_is_hedged_and_backup_wins():
+    """Past the tail delay a backup is sent; the faster one wins and the loser is cancelled."""
+    hedger = Hedger(percentile=95)
+    for _ in range(MIN_SAMPLES):
+        hedger.observe("gpt-4", 0.01)
+    delays = iter([1.0, 0.0])
+    cancelled = []
+
+    async def call():
+        delay = next(delays)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    won_before = hedges.value(model="gpt-4", outcome="won")
+    assert asyncio.run(hedger.run("gpt-4", call)) == 0.0
+    assert hedges.value(model="gpt-4", outcome="won") - won_before == 1
+    assert cancelled == [1.0]
+
+
+def test_no_hedging_without_history():
+    """Until enough latencies are observed, requests are not hedged."""
+    assert Hedger().delay("gpt-4") is None
+
+
+def test_retries_rate_limits_but_not_bad_requests(monkeypatch):
+    """429/5xx are retried with backoff; other errors surface immediately."""
+    monkeypatch.setattr(hedging, "backoff_delay", lambda attempt: 0)
+    failures = [_status_error(429), _status_error(503)]
+
+    async def flaky():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    assert asyncio.run(with_retries("gpt-4", flaky)) == "ok"
+
+    calls = []
+
+    async def bad_request():
+        calls.append(1)
+        raise _status_error(400)
+
+    with pytest.raises(APIStatusError):
+        asyncio.run(with_retries("gpt-4", bad_request))
+    assert len(calls) == 1
@@ -0,0 +1,35 @@
+import pytest
+from agents.intent_router import AFFIRM, DECLINE, DIET, ELIGIBILITY, PRESCRIPTION, UNKNOWN, UNSURE, classify
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("yes", AFFIRM),
+    ("Sure!", AFFIRM),
+    ("Let’s go", AFFIRM),
+    ("no thanks", DECLINE),
+    ("maybe later", DECLINE),
+    ("not sure", UNSURE),
+    ("yes, start the diet assessment", DIET),
+    ("am I eligible?", ELIGIBILITY),
+    ("I need my prescription", PRESCRIPTION),
+])
+def test_common_intents_resolve_locally(message, intent):
+    result = classify(message)
+    assert result.name == intent
+    assert result.confident
+
+
+@pytest.mark.parametrize("message", ["I know", "book it", "nobody told me", "token"])
+def test_keywords_only_match_whole_words(message):
+    """'no' inside 'know' or 'ok' inside 'book' is not a yes/no."""
+    assert classify(message).name == UNKNOWN
+
+
+@pytest.mark.parametrize("message", [
+    "Yes but what should I eat for my diabetes and blood pressure?",
+    "what is the diet assessment?",
+    "yes... no, not now",
+    "should I change my diet",
+])
+def test_ambiguous_messages_escalate(message):
+    assert not classify(message).confident
@@ -0,0 +1,76 @@
+import json
+import asyncio
+from llm.backends import FakeBackend, LatencyModel
+from llm.cache import make_cache_key
+
+FUNCTIONS = [{"name": "start_diet_assessment"}, {"name": "check_eligibility"}]
+
+
+def test_latency_model_is_reproducible():
+    """The same spec and seed always produce the same latency sequence."""
+    first = LatencyModel("lognormal:800,0.5", seed=7)
+    second = LatencyModel("lognormal:800,0.5", seed=7)
+    assert [first.sample() for _ in range(5)] == [second.sample() for _ in range(5)]
+    assert LatencyModel("fixed:250").sample() == 0.25
+
+
+def test_fake_backend_function_calls():
+    """Offered functions are called for diet and eligibility intents."""
+    backend = FakeBackend()
+    messages = [{"role": "user", "content": "User ID: 42\nMessage: Am I eligible for a program?"}]
+    response = asyncio.run(backend.create(model="gpt-4", messages=messages, functions=FUNCTIONS, function_call="auto"))
+    choice = response.choices[0]
+    assert choice.finish_reason == "function_call"
+    assert choice.message.function_call.name == "check_eligibility"
+    assert json.loads(choice.message.function_call.arguments) == {"user_id": "42"}
+
+
+def test_fake_backend_replays_recordings(tmp_path):
+    """Recorded completions are returned verbatim for matching requests."""
+    messages = [{"role": "user", "content": "hello"}]
+    recording = {
+        "key": make_cache_key("gpt-4", messages),
+        "request": {"model": "gpt-4", "messages": messages},
+        "response": {
+            "id": "rec-1", "object": "chat.completion", "created": 0, "model": "gpt-4",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "recorded!"}}]
+        }
+    }
+    path = tmp_path / "recordings.jsonl"
+    path.write_text(json.dumps(recording) + "\n")
+
+    response = asyncio.run(FakeBackend(recordings_path=str(path)).create(model="gpt-4", messages=messages))
+    assert response.choices[0].message.content == "recorded!"
+
+
+def test_agents_share_one_backend():
+    """Every agent, sub-agents included, talks to the same process-wide backend (one pool)."""
+    from agents import PrimaryAssistant
+    from llm import get_llm_backend
+    assistant = PrimaryAssistant()
+    agents = [assistant, assistant.dietary_assessment_agent, assistant.eligibility_agent,
+              assistant.prescription_agent, assistant.user_agent]
+    assert isinstance(get_llm_backend(), FakeBackend)
+    assert all(agent.llm is get_llm_backend() for agent in agents)
+
+
+def test_openai_client_is_one_configured_pool(monkeypatch):
+    """The shared AsyncOpenAI client is built once with the LLM_* pool limits and closed as a whole."""
+    from llm import client
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("LLM_MAX_KEEPALIVE", "3")
+    monkeypatch.setenv("LLM_CONNECT_TIMEOUT", "1.5")
+    monkeypatch.setenv("LLM_HTTP2", "false")
+    monkeypatch.setattr(client, "_client", None)
+
+    async def main():
+        first = client.get_llm_client()
+        assert client.get_llm_client() is first
+        http = first._client
+        assert (http._transport._pool._max_connections, http._transport._pool._max_keepalive_connections) == (7, 3)
+        assert http.timeout.connect == 1.5 and first.max_retries == 0
+        await client.close_llm_client()
+        assert http.is_closed and client._client is None
+
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+import threading
+from llm.cache import CompletionCache, make_cache_key
+from llm.disk_cache import DiskCompletionCache
+
+
+def test_cache_key_is_stable_and_prompt_sensitive():
+    """Same prompt hashes the same; any change to the prompt changes the key."""
+    messages = [{"role": "user", "content": "What is your zip code?"}]
+    assert make_cache_key("gpt-4", messages) == make_cache_key("gpt-4", list(messages))
+    assert make_cache_key("gpt-4", messages) != make_cache_key("gpt-3.5-turbo", messages)
+    assert make_cache_key("gpt-4", messages) != make_cache_key("gpt-4", messages, temperature=0)
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted once max_entries is exceeded."""
+    cache = CompletionCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+
+
+def test_ttl_expiry():
+    """Entries older than the TTL are treated as misses."""
+    cache = CompletionCache(ttl=0.01)
+    cache.set("a", {"v": 1})
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """A persisted cache can be loaded into a fresh process."""
+    path = str(tmp_path / "llm_cache.json")
+    cache = CompletionCache(path=path)
+    cache.set("a", {"v": 1})
+    cache.save()
+
+    restored = CompletionCache(path=path)
+    assert restored.load() == 1
+    assert restored.get("a") == {"v": 1}
+
+
+def test_disk_cache_survives_restart_and_backs_memory_tier(tmp_path):
+    """Completions written through the memory tier are still there for a fresh process."""
+    path = str(tmp_path / "llm_cache.db")
+    CompletionCache(backing=DiskCompletionCache(path)).set("k", {"v": 1})
+
+    restarted = CompletionCache(backing=DiskCompletionCache(path))
+    assert restarted.get("k") == {"v": 1}
+    assert restarted.stats()["disk"]["hits"] == 1
+
+
+def test_disk_cache_evicts_least_recently_used_over_size_budget(tmp_path):
+    """Once stored payloads exceed max_bytes the least recently used entries go first."""
+    cache = DiskCompletionCache(str(tmp_path / "llm_cache.db"), max_bytes=70)
+    cache.set("a", {"text": "x" * 20})
+    cache.set("b", {"text": "y" * 20})
+    cache.get("a")
+    cache.set("c", {"text": "z" * 20})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 70
+
+
+def test_disk_cache_warms_from_recorded_traffic(tmp_path):
+    """Recordings made with LLM_RECORD_PATH can be loaded ahead of a deploy."""
+    recordings = tmp_path / "recordings.jsonl"
+    recordings.write_text(json.dumps({"key": "abc", "request": {}, "response": {"id": "rec"}}) + "\n")
+    cache = DiskCompletionCache(str(tmp_path / "llm_cache.db"))
+    assert cache.warm(str(recordings)) == 1
+    assert cache.get("abc") == {"id": "rec"}
+
+
+def test_disk_hits_batch_their_recency_updates(tmp_path):
+    """Hits only record recency in memory until a batch is due or the budget forces an eviction."""
+    path = str(tmp_path / "llm_cache.db")
+    cache = DiskCompletionCache(path)
+    cache.set("a", {"v": 1})
+    stored = cache._conn.execute("SELECT last_used FROM completions").fetchone()[0]
+    time.sleep(0.01)
+    assert cache.get("a") == {"v": 1}
+    assert cache._conn.execute("SELECT last_used FROM completions").fetchone()[0] == stored
+    cache.close()
+
+    reopened = DiskCompletionCache(path)
+    assert reopened._conn.execute("SELECT last_used FROM completions").fetchone()[0] > stored
+
+
+def test_async_lookups_reach_the_disk_tier_off_the_event_loop(tmp_path):
+    """aget/aset give the same results as get/set, with the SQLite calls made in a worker thread."""
+    path = str(tmp_path / "llm_cache.db")
+    loop_threads = []
+
+    class RecordingDisk(DiskCompletionCache):
+        def get(self, key):
+            loop_threads.append(threading.current_thread() is threading.main_thread())
+            return super().get(key)
+
+    async def main():
+        await CompletionCache(backing=RecordingDisk(path)).aset("k", {"v": 1})
+        restarted = CompletionCache(backing=RecordingDisk(path))
+        assert await restarted.aget("k") == {"v": 1}
+        assert await restarted.aget("k") == {"v": 1}  # now served from memory
+        assert await restarted.aget("missing") is None
+        return restarted.stats()
+
+    stats = asyncio.run(main())
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert loop_threads == [False, False]
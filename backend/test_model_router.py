@@ -0,0 +1,65 @@
+import time
+import asyncio
+import pytest
+from llm.router import ModelRouter, MIN_SAMPLES, REQUEST_HEADROOM_SECONDS
+
+CONFIG = {
+    "rephrase": {"tiers": ["fast", "slow"], "latency_budget_ms": 50},
+    "advice": {"tiers": ["slow"], "latency_budget_ms": 1000}
+}
+
+
+def _call(delays, calls):
+    async def call(model):
+        calls.append(model)
+        await asyncio.sleep(delays[model])
+        return model
+    return call
+
+
+def test_fast_tier_within_budget_skips_slow_model():
+    router = ModelRouter(CONFIG)
+    calls = []
+    assert asyncio.run(router.complete("rephrase", _call({"fast": 0, "slow": 0}, calls))) == "fast"
+    assert calls == ["fast"]
+
+
+def test_over_budget_tier_escalates():
+    router = ModelRouter(CONFIG)
+    calls = []
+    assert asyncio.run(router.complete("rephrase", _call({"fast": 0.2, "slow": 0}, calls))) == "slow"
+    assert calls == ["fast", "slow"]
+    assert router.p95("rephrase", "fast") >= 0.05
+
+
+def test_slow_tier_is_skipped_once_p95_exceeds_budget():
+    router = ModelRouter(CONFIG)
+    for _ in range(MIN_SAMPLES):
+        router._observe("rephrase", "fast", 0.5)
+    calls = []
+    assert asyncio.run(router.complete("rephrase", _call({"fast": 0, "slow": 0}, calls))) == "slow"
+    assert calls == ["slow"]
+
+
+def test_unknown_task_uses_advice_tiers_and_errors_propagate_from_last_tier():
+    router = ModelRouter(CONFIG)
+
+    async def failing(model):
+        raise RuntimeError(model)
+
+    with pytest.raises(RuntimeError, match="slow"):
+        asyncio.run(router.complete("unknown", failing))
+
+
+def test_skipped_tier_is_tried_again_once_its_samples_age_out():
+    router = ModelRouter(CONFIG, window_seconds=0.05)
+    for _ in range(MIN_SAMPLES):
+        router._observe("rephrase", "fast", 0.5)
+    time.sleep(0.06)
+    calls = []
+    assert asyncio.run(router.complete("rephrase", _call({"fast": 0, "slow": 0}, calls))) == "fast"
+    assert calls == ["fast"]
+
+
+def test_request_budget_covers_the_slowest_task():
+    assert ModelRouter(CONFIG).request_budget() == 1 + REQUEST_HEADROOM_SECONDS
@@ -0,0 +1,84 @@
+import asyncio
+from llm.prefetch import Prefetcher, prefetch_outcomes
+from llm.resilience import Deadline, deadline_scope
+from agents.conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
+
+
+def _generate(text: str, delay: float = 0):
+    async def generate():
+        await asyncio.sleep(delay)
+        return text
+    return generate
+
+
+def test_take_returns_the_prefetched_candidate_and_cancels_the_others():
+    hits, cancelled = prefetch_outcomes.value(outcome="hit"), prefetch_outcomes.value(outcome="cancelled")
+
+    async def main():
+        prefetcher = Prefetcher()
+        prefetcher.schedule(42, "yes-branch", _generate("Which insurer?"))
+        prefetcher.schedule("42", "no-branch", _generate("Any chronic conditions?", delay=1))
+        prefetcher.schedule(42, "yes-branch", _generate("scheduled twice"))  # already in flight: ignored
+        await asyncio.sleep(0)
+        return await prefetcher.take("42", "yes-branch"), await prefetcher.take(42, "no-branch")
+
+    assert asyncio.run(main()) == ("Which insurer?", None)  # the taken session's other candidates are gone
+    assert prefetch_outcomes.value(outcome="hit") - hits == 1
+    assert prefetch_outcomes.value(outcome="cancelled") - cancelled == 1
+
+
+def test_unknown_stale_or_failed_candidates_are_misses():
+    misses = prefetch_outcomes.value(outcome="miss")
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def main():
+        prefetcher = Prefetcher()
+        assert await prefetcher.take(7, 3) is None  # nothing scheduled
+        prefetcher.schedule(7, 3, _generate("question 3"))
+        assert await prefetcher.take(7, 4) is None  # the user is somewhere else now
+        prefetcher.schedule(8, 0, failing)
+        assert await prefetcher.take(8, 0) is None
+
+    asyncio.run(main())
+    assert prefetch_outcomes.value(outcome="miss") - misses == 3
+
+
+def test_take_waits_for_a_candidate_still_running():
+    async def main():
+        prefetcher = Prefetcher()
+        prefetcher.schedule(1, 0, _generate("question 0", delay=0.05))
+        return await prefetcher.take(1, 0)
+
+    assert asyncio.run(main()) == "question 0"
+
+
+def test_take_gives_up_at_the_deadline_and_keeps_the_task():
+    late = prefetch_outcomes.value(outcome="late")
+
+    async def main():
+        prefetcher = Prefetcher()
+        prefetcher.schedule(1, 0, _generate("question 0", delay=0.2))
+        with deadline_scope(Deadline.after(0.05)):
+            assert await prefetcher.take(1, 0) is None
+        return await prefetcher.take(1, 0)  # asked again without a deadline: same task, now finished
+
+    assert asyncio.run(main()) == "question 0"
+    assert prefetch_outcomes.value(outcome="late") - late == 1
+
+
+def test_finishing_the_assessment_cancels_speculation():
+    async def main():
+        agent = ConversationalDietaryAssessmentAgent()
+        agent.live_questions = True
+        user_id = (await agent.process({"user_id": "default", "message": ""}))["data"]["user_id"]
+        agent.prefetcher.schedule(user_id, 99, _generate("never needed", delay=10))
+        never_needed = agent.prefetcher._tasks[str(user_id)][99]
+        await agent._save_and_finish(user_id, {category: 3 for category in agent.categories})
+        await asyncio.sleep(0)
+        return agent, user_id, never_needed
+
+    agent, user_id, never_needed = asyncio.run(main())
+    assert str(user_id) not in agent.prefetcher._tasks
+    assert never_needed.cancelled()
@@ -0,0 +1,48 @@
+import asyncio
+from llm.backends import FakeBackend
+from sessions import MemorySessionStore, SessionMap
+from agents.question_bank import QuestionBank
+from agents.conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
+
+
+class SamplingBackend(FakeBackend):
+    """Fake backend whose replies differ per call, like a model sampled at temperature > 0."""
+
+    def _canned(self, model, messages, functions):
+        completion = super()._canned(model, messages, functions)
+        completion.choices[0].message.content += f" (variant {self.calls})"
+        return completion
+
+
+def test_build_keeps_every_requested_variant(tmp_path):
+    agent = ConversationalDietaryAssessmentAgent()
+    agent.llm = SamplingBackend()
+    bank = asyncio.run(agent.build_question_bank(variants=3, path=str(tmp_path / "bank.json")))
+    assert agent.llm.calls == 3 * len(agent.categories)
+    assert set(bank.questions) == set(agent.categories)
+    assert all(len(set(variants)) == 3 for variants in bank.questions.values())
+
+
+def test_screener_serves_questions_from_the_bank_without_llm_calls(tmp_path):
+    """A saved bank is loaded back and every turn is served from it; categories it lacks use the static text."""
+    path = str(tmp_path / "bank.json")
+    QuestionBank({"Fruits": ["Fruit question A", "Fruit question B"], "Vegetables": ["Veg question"]}, path=path).save()
+
+    agent = ConversationalDietaryAssessmentAgent()
+    agent.llm = FakeBackend()
+    agent.live_questions = False
+    agent.question_bank = QuestionBank.load(path)
+    agent.state = SessionMap(agent.state.namespace, MemorySessionStore(), agent.state.codec)
+
+    async def main():
+        first = await agent.process({"user_id": "default", "message": ""})
+        user_id = first["data"]["user_id"]
+        second = await agent.process({"user_id": user_id, "message": "daily"})
+        third = await agent.process({"user_id": user_id, "message": "never"})
+        return [response["data"]["response"] for response in (first, second, third)]
+
+    fruits, vegetables, grains = asyncio.run(main())
+    assert fruits in ("Fruit question A", "Fruit question B")
+    assert vegetables == "Veg question"
+    assert grains == agent._static_question(2)
+    assert agent.llm.calls == 0
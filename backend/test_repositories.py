@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from db_connection import SessionLocal, engine
+from models import ChatMessage, DietAssessment, EligibilityAssessment
+from repositories import (
+    chat_history, chat_history_stmt, latest_assessment_stmt, latest_diet_assessment, messages_by_agent_stmt
+)
+
+
+def _plan(stmt) -> str:
+    compiled = stmt.compile(engine)
+    params = tuple(str(compiled.params[name]) for name in compiled.positiontup)  # only the plan matters
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_lookups_use_indexes_without_sorting():
+    plans = {
+        "ix_diet_assessments_user_id_date_taken": _plan(latest_assessment_stmt(DietAssessment, 7)),
+        "ix_eligibility_assessments_user_id_date_taken": _plan(latest_assessment_stmt(EligibilityAssessment, 7)),
+        "ix_chat_messages_user_id_timestamp": _plan(chat_history_stmt(7, datetime(2026, 1, 1))),
+        "ix_chat_messages_agent_type": _plan(messages_by_agent_stmt("dietary")),
+    }
+    for index, plan in plans.items():
+        assert f"USING INDEX {index}" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+
+def test_latest_assessment_and_history():
+    now = datetime.utcnow()
+    db = SessionLocal()
+    db.add_all([
+        DietAssessment(user_id=8101, results='{"n": 1}', date_taken=now - timedelta(days=2)),
+        DietAssessment(user_id=8101, results='{"n": 2}', date_taken=now),
+        DietAssessment(user_id=8102, results='{"n": 3}', date_taken=now + timedelta(days=1)),
+        *(ChatMessage(user_id=8101, message=f"m{n}", response="r", agent_type="primary",
+                      timestamp=now + timedelta(seconds=n)) for n in range(5)),
+    ])
+    db.commit()
+    db.close()
+
+    assert latest_diet_assessment(8101).results == '{"n": 2}'
+    assert latest_diet_assessment(8199) is None
+    assert [m.message for m in chat_history(8101, limit=3)] == ["m2", "m3", "m4"]
+    assert [m.message for m in chat_history(8101, since=now + timedelta(seconds=3))] == ["m3", "m4"]
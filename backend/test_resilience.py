@@ -0,0 +1,105 @@
+import time
+import asyncio
+from agents import PrimaryAssistant
+from agents.conversational_eligibility_agent import ConversationalEligibilityAgent
+from llm.backends import FakeBackend
+from llm.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, Deadline, deadline_scope
+
+
+def test_breaker_opens_after_repeated_failures_and_recovers():
+    """Consecutive failures (or slow calls) open the circuit; one good trial call closes it."""
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=1, reset_timeout=0.01)
+    breaker.record_failure()
+    breaker.record_success(5)  # too slow, counts as a failure
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def _start_eligibility(agent):
+    return agent.process({"message": "", "user_id": "42"})
+
+
+def test_slow_llm_serves_raw_question_within_deadline():
+    """A provider slower than the request deadline yields the static question, not a hang."""
+    agent = ConversationalEligibilityAgent()
+    agent.llm = FakeBackend(latency="fixed:2000")
+    agent.breaker = CircuitBreaker()
+
+    async def main():
+        with deadline_scope(Deadline.after(0.05)):
+            return await _start_eligibility(agent)
+
+    started = time.perf_counter()
+    response = asyncio.run(main())
+    assert time.perf_counter() - started < 1
+    assert response["success"]
+    assert response["data"]["response"] in agent._all_questions()
+
+
+def test_open_circuit_skips_the_llm():
+    """While the circuit is open no upstream call is attempted."""
+    agent = ConversationalEligibilityAgent()
+    agent.llm = FakeBackend()
+    agent.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    agent.breaker.record_failure()
+
+    response = asyncio.run(_start_eligibility(agent))
+    assert response["data"]["response"] in agent._all_questions()
+    assert agent.llm.calls == 0
+
+
+def test_prefetch_still_generating_does_not_outlast_the_deadline():
+    """A next question prefetched from a slow provider is given up on at the deadline, not awaited."""
+    agent = ConversationalEligibilityAgent()
+    agent.llm = FakeBackend(latency="fixed:3000")
+    agent.breaker = CircuitBreaker()
+
+    async def main():
+        with deadline_scope(Deadline.after(0.2)):
+            user_id = (await agent.process({"message": "", "user_id": "default"}))["data"]["user_id"]
+        with deadline_scope(Deadline.after(0.2)):  # the prefetch of question 2 is still running
+            started = time.perf_counter()
+            response = await agent.process({"message": "32801", "user_id": user_id})
+            elapsed = time.perf_counter() - started
+        agent.prefetcher.cancel(user_id)
+        return response, elapsed
+
+    response, elapsed = asyncio.run(main())
+    assert elapsed < 0.5
+    assert response["data"]["response"] in agent._all_questions()
+
+
+def test_calls_within_their_task_budget_are_not_slow():
+    """With no global slow threshold, a 15 s advice call under a 20 s budget is a success."""
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=None)
+    breaker.record_success(15, budget=20)
+    assert breaker.state == CLOSED
+    breaker.record_success(1.2, budget=1)
+    assert breaker.state == OPEN
+
+
+def test_streamed_reply_stops_at_the_deadline():
+    """The stream itself, not just its first chunk, is bounded; tokens already sent become the reply."""
+    assistant = PrimaryAssistant()
+    assistant.llm = FakeBackend(latency="fixed:2000")
+    assistant.breaker = CircuitBreaker()
+    tokens = []
+
+    async def on_token(token):
+        tokens.append(token)
+
+    async def main():
+        data = {"message": "How can I sleep better?", "user_id": "stream-deadline", "deadline": Deadline.after(0.3)}
+        return await assistant.process(data, on_token=on_token)
+
+    started = time.perf_counter()
+    response = asyncio.run(main())
+    assert time.perf_counter() - started < 1
+    assert tokens and response["data"]["response"] == "".join(tokens)
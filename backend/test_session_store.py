@@ -0,0 +1,125 @@
+import time
+import asyncio
+import pytest
+from sessions import MemorySessionStore, SQLiteSessionStore, RedisSessionStore, SessionManager, SessionMap
+from sessions import DietSession, EligibilitySession, Stage
+from sessions.resp_server import RespServer
+from agents.conversational_dietary_assessment_agent import ConversationalDietaryAssessmentAgent
+
+
+async def _roundtrip(store):
+    sessions = SessionMap("diet", store)
+    await sessions.put(42, {"current_category_index": 3, "answers": {"Fruits": 2}})
+    await SessionMap("eligibility", store).put(42, {"stage": "initial"})
+
+    session = await sessions.get("42")
+    session["answers"]["Vegetables"] = 5  # a copy: unsaved changes are not visible
+    assert (await sessions.get(42))["answers"] == {"Fruits": 2}
+    assert await sessions.keys() == ["42"]
+    assert await sessions.items() == [("42", {"current_category_index": 3, "answers": {"Fruits": 2}})]
+
+    await sessions.pop(42)
+    assert await sessions.get(42) is None
+    assert await SessionMap("eligibility", store).get(42) == {"stage": "initial"}
+    await store.close()
+
+
+def test_memory_store():
+    asyncio.run(_roundtrip(MemorySessionStore()))
+
+
+def test_sqlite_store(tmp_path):
+    asyncio.run(_roundtrip(SQLiteSessionStore(str(tmp_path / "sessions.db"))))
+
+
+def test_redis_store():
+    pytest.importorskip("redis")
+
+    async def main():
+        server = await RespServer().start()
+        try:
+            await _roundtrip(RedisSessionStore(server.url))
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
+
+
+def test_questionnaire_continues_on_another_worker(tmp_path):
+    """Two agent instances sharing a SQLite store behave like two workers serving one user."""
+    path = str(tmp_path / "sessions.db")
+
+    async def main():
+        workers = [ConversationalDietaryAssessmentAgent() for _ in range(2)]
+        for worker in workers:
+            worker.live_questions = False
+            worker.state = SessionMap("diet", SQLiteSessionStore(path), worker.state.codec)
+
+        first = await workers[0].process({"user_id": "default", "message": ""})
+        user_id = first["data"]["user_id"]
+        for n, _ in enumerate(workers[0].categories):
+            response = await workers[n % 2].process({"user_id": user_id, "message": "twice a week"})
+        assert response["message"] == "Assessment complete"
+        assert await workers[0].state.get(user_id) is None
+
+    asyncio.run(main())
+
+
+def _manager(store, **kwargs):
+    maps = [SessionMap("flow", store), SessionMap("diet", store)]
+    return SessionManager(maps, store=store, **kwargs), maps
+
+
+def test_idle_and_overflow_sessions_are_evicted():
+    async def main():
+        store = MemorySessionStore()
+        manager, (flow, diet) = _manager(store, idle_ttl=60, max_entries=2)
+        forgotten = []
+        manager.on_evict(forgotten.append)
+
+        for user, idle_for in (("1", 600), ("2", 30), ("3", 20), ("4", 10)):
+            await manager.touch(user)
+            await manager.activity.put(user, time.time() - idle_for)
+            await flow.put(user, "diet")
+            await diet.put(user, {"current_category_index": 4})
+
+        assert await manager.sweep() == 2
+        assert sorted(forgotten) == ["1", "2"]   # "1" idle, "2" the least recent beyond the cap
+        assert sorted(await diet.keys()) == ["3", "4"]
+        assert sorted(await flow.keys()) == ["3", "4"]
+
+    asyncio.run(main())
+
+
+def test_evicted_session_resumes_from_checkpoint():
+    async def main():
+        store, checkpoints = MemorySessionStore(), MemorySessionStore()
+        manager, (flow, diet) = _manager(store, idle_ttl=60, checkpoint=checkpoints)
+
+        await manager.touch(7)
+        await flow.put(7, "diet")
+        await diet.put(7, {"current_category_index": 12})
+        await manager.activity.put(7, time.time() - 120)
+        assert await manager.sweep() == 1
+        assert await diet.get(7) is None
+
+        await manager.touch(7)
+        assert await flow.get(7) == "diet"
+        assert (await diet.get(7))["current_category_index"] == 12
+        assert await checkpoints.keys("checkpoint:diet") == []
+
+    asyncio.run(main())
+
+
+def test_slotted_sessions_roundtrip_through_their_binary_form():
+    diet = DietSession(26)
+    for answer in (7, 0, 3):
+        diet.record(answer)
+    restored = DietSession.from_bytes(diet.to_bytes())
+    assert restored.index == 3 and restored.collecting
+    assert restored.as_dict(["Fruits", "Vegetables", "Whole Grains", "Legumes"]) == {"Fruits": 7, "Vegetables": 0, "Whole Grains": 3}
+    assert len(diet.to_bytes()) == 3 + 26
+
+    eligibility = EligibilitySession(Stage.BRANCH, 1, "florida blue", {"zip_code": "32801"})
+    restored = EligibilitySession.from_bytes(eligibility.to_bytes())
+    assert (restored.stage, restored.index, restored.branch, restored.answers) == (Stage.BRANCH, 1, "florida blue", {"zip_code": "32801"})
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from llm.singleflight import SingleFlight, flight_outcomes
+
+
+def test_concurrent_identical_requests_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("same-prompt", upstream) for _ in range(10)))
+
+    coalesced_before = flight_outcomes.value(outcome="coalesced")
+    assert asyncio.run(main()) == ["answer"] * 10
+    assert len(calls) == 1
+    assert flight_outcomes.value(outcome="coalesced") - coalesced_before == 9
+    assert len(flights) == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(*(flights.do("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        async def ok():
+            return "recovered"
+        return await flights.do("k", ok)
+
+    assert asyncio.run(main()) == "recovered"
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def main():
+        impatient = asyncio.ensure_future(flights.do("k", upstream))
+        patient = asyncio.ensure_future(flights.do("k", upstream))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(main()) == "answer"
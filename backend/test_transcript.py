@@ -0,0 +1,116 @@
+import asyncio
+from db_connection import SessionLocal
+from models import ChatMessage, User
+from transcript import TranscriptLogger, transcript_entries
+from agents import PrimaryAssistant
+from sessions.guests import ensure_users, get_guest_ids
+
+
+def _messages(user_id):
+    db = SessionLocal()
+    try:
+        return db.query(ChatMessage).filter_by(user_id=user_id).order_by(ChatMessage.id).all()
+    finally:
+        db.close()
+
+
+async def _saved_user() -> int:
+    user_id = await get_guest_ids().new()
+    db = SessionLocal()
+    try:
+        ensure_users(db, [user_id])
+        db.commit()
+    finally:
+        db.close()
+    return user_id
+
+
+def test_exchanges_are_bulk_inserted():
+    async def main():
+        user_id = await _saved_user()
+        logger = TranscriptLogger(interval=0.05)
+        for n in range(120):
+            await logger.record(user_id, f"message {n}", f"reply {n}", "primary")
+        await logger.close()
+        return user_id
+
+    rows = _messages(asyncio.run(main()))
+    assert len(rows) == 120
+    assert rows[0].message == "message 0" and rows[-1].response == "reply 119"
+
+
+def test_full_buffer_drops_under_drop_policy():
+    dropped = transcript_entries.value(outcome="dropped")
+
+    async def main():
+        user_id = await _saved_user()
+        logger = TranscriptLogger(max_buffered=2, overflow="drop")
+        for n in range(5):  # nothing yields, so the flusher cannot drain in between
+            await logger.record(user_id, "hi", "hello", "primary")
+        await logger.close()
+        return user_id
+
+    user_id = asyncio.run(main())
+    assert transcript_entries.value(outcome="dropped") - dropped == 3
+    assert len(_messages(user_id)) == 2
+
+
+def test_full_buffer_waits_under_block_policy():
+    async def main():
+        user_id = await _saved_user()
+        logger = TranscriptLogger(max_buffered=2, interval=0, overflow="block")
+        for n in range(5):
+            await logger.record(user_id, "hi", "hello", "primary")
+        await logger.close()
+        return user_id
+
+    assert len(_messages(asyncio.run(main()))) == 5
+
+
+def test_chat_records_which_agent_answered():
+    async def main():
+        assistant = PrimaryAssistant()
+        assistant.dietary_assessment_agent.live_questions = False
+        response = await assistant.process({"user_id": "default", "message": "start"})
+        assert response["message"] == "Welcome"  # no user id yet: not recorded
+
+        user_id = await _saved_user()
+        await assistant.process({"user_id": user_id, "message": "I want the diet assessment"})
+        await assistant.process({"user_id": user_id, "message": "daily"})
+        await assistant.transcripts.flush()
+        return user_id
+
+    user_id = asyncio.run(main())
+    rows = _messages(user_id)
+    assert [(row.message, row.agent_type) for row in rows] == [
+        ("I want the diet assessment", "dietary"), ("daily", "dietary")
+    ]
+    assert all(row.response for row in rows)
+
+
+def test_guest_exchanges_before_any_saved_answer_are_kept():
+    async def main():
+        logger = TranscriptLogger(interval=0)
+        guest = await get_guest_ids().new()  # no users row yet
+        await logger.record(guest, "hi", "hello", "primary")
+        await logger.close()
+        return guest
+
+    guest = asyncio.run(main())
+    assert [row.message for row in _messages(guest)] == ["hi"]
+    db = SessionLocal()
+    assert db.get(User, guest) is not None
+    db.close()
+
+
+def test_made_up_user_ids_are_not_logged():
+    rejected = transcript_entries.value(outcome="rejected")
+
+    async def main():
+        logger = TranscriptLogger(interval=0)
+        await logger.record(10**9, "hi", "hello", "primary")  # far past anything the allocator issued
+        await logger.close()
+
+    asyncio.run(main())
+    assert transcript_entries.value(outcome="rejected") - rejected == 1
+    assert _messages(10**9) == []
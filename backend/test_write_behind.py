@@ -0,0 +1,66 @@
+import uuid
+import asyncio
+import write_behind
+from db_connection import SessionLocal
+from models import User
+from write_behind import WriteBehindQueue
+
+
+def _user(email=None) -> User:
+    return User(email=email or f"wb_{uuid.uuid4()}@wellchemy.ai", password_hash="x")
+
+
+def _count_commits(monkeypatch):
+    commits = []
+    commit = write_behind._commit
+    monkeypatch.setattr(write_behind, "_commit", lambda writes: (commits.append(len(writes)), commit(writes)))
+    return commits
+
+
+def test_concurrent_writes_share_transactions(monkeypatch):
+    commits = _count_commits(monkeypatch)
+
+    async def main():
+        queue = WriteBehindQueue(batch_size=50, delay=0.05)
+        users = [_user() for _ in range(100)]
+        await asyncio.gather(*(queue.write(user) for user in users))
+        await queue.close()
+        return users
+
+    users = asyncio.run(main())
+    assert len(commits) <= 4 and sum(commits) == 100
+    assert all(user.user_id for user in users)  # generated ids are readable after the write
+
+
+def test_bad_write_fails_only_itself():
+    async def main():
+        queue = WriteBehindQueue(delay=0.05)
+        email = f"wb_{uuid.uuid4()}@wellchemy.ai"
+        results = await asyncio.gather(
+            queue.write(_user(email)), queue.write(_user(email)), queue.write(_user()),
+            return_exceptions=True,
+        )
+        await queue.close()
+        return results
+
+    results = asyncio.run(main())
+    assert sum(isinstance(result, Exception) for result in results) == 1
+    assert results[2] is None
+
+
+def test_close_flushes_submitted_writes():
+    email = f"wb_{uuid.uuid4()}@wellchemy.ai"
+
+    async def main():
+        queue = WriteBehindQueue(delay=10)
+        future = await queue.submit(_user(email))
+        await queue.close()
+        assert future.done()
+
+    asyncio.run(main())
+    db = SessionLocal()
+    try:
+        assert db.query(User).filter_by(email=email).count() == 1
+    finally:
+        db.close()
+
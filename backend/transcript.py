@@ -0,0 +1,134 @@
+"""
+Buffered chat transcript logging.
+
+Every /chat exchange is appended to the chat_messages table for audits, but
+off the request path: record() only puts the row in a bounded in-memory
+buffer, and a background task bulk-inserts what has accumulated (one
+executemany per batch) through the write-behind writer, so transcript rows
+share transactions with the other inserts instead of adding a commit per turn.
+
+A guest's first exchanges usually come before anything else of theirs is
+saved, so the batch's transaction also writes any missing guest users rows
+(sessions.guests.ensure_users) rather than losing those turns.
+
+When the buffer is full, TRANSCRIPT_OVERFLOW decides: "drop" (default) drops
+the entry and counts it, so chat latency never depends on the database;
+"block" makes the request wait for room, so nothing is lost.
+"""
+
+import os
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from metrics import counter, gauge
+from models import ChatMessage
+from sessions.guests import ensure_users
+from write_behind import get_write_behind
+
+TRANSCRIPT_QUEUE_MAX = int(os.getenv("TRANSCRIPT_QUEUE_MAX", "5000"))
+TRANSCRIPT_BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", "500"))
+# How long a partial batch waits for more rows before it is written
+TRANSCRIPT_FLUSH_MS = float(os.getenv("TRANSCRIPT_FLUSH_MS", "200"))
+TRANSCRIPT_OVERFLOW = os.getenv("TRANSCRIPT_OVERFLOW", "drop")  # "drop" | "block"
+CHAT_TRANSCRIPTS = os.getenv("CHAT_TRANSCRIPTS", "on").lower() != "off"
+
+transcript_entries = counter("chat_transcript_entries_total", "Chat transcript entries by outcome (written, dropped, rejected, failed)", ("outcome",))
+transcript_buffered = gauge("chat_transcript_buffered", "Chat transcript entries waiting to be written")
+
+_logger: Optional["TranscriptLogger"] = None
+
+
+class TranscriptLogger:
+    """Bounded buffer of chat exchanges, bulk-inserted into chat_messages in the background."""
+
+    def __init__(self, max_buffered: int = TRANSCRIPT_QUEUE_MAX, batch_size: int = TRANSCRIPT_BATCH_SIZE,
+                 interval: float = TRANSCRIPT_FLUSH_MS / 1000, overflow: str = TRANSCRIPT_OVERFLOW):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"TRANSCRIPT_OVERFLOW must be 'drop' or 'block', not {overflow!r}")
+        self.max_buffered = max_buffered
+        self.batch_size = batch_size
+        self.interval = interval
+        self.overflow = overflow
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _ensure_flusher(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._queue = asyncio.Queue(self.max_buffered)
+            self._flusher = loop.create_task(self._run())
+        return self._queue
+
+    async def record(self, user_id: int, message: str, response: str, agent_type: str) -> None:
+        """Buffer one exchange; returns immediately unless the buffer is full under the "block" policy."""
+        queue = self._ensure_flusher()
+        row = {
+            "user_id": int(user_id),
+            "message": message,
+            "response": response,
+            "agent_type": agent_type,
+            "timestamp": datetime.utcnow(),
+        }
+        if self.overflow == "block":
+            await queue.put(row)
+        else:
+            try:
+                queue.put_nowait(row)
+            except asyncio.QueueFull:
+                transcript_entries.inc(outcome="dropped")
+                return
+        transcript_buffered.set(queue.qsize())
+
+    async def flush(self) -> None:
+        """Wait until everything buffered so far is written."""
+        if self._queue is not None and self._flusher is not None and not self._flusher.done():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Write what is buffered and stop the background task (shutdown)."""
+        await self.flush()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+    async def _run(self) -> None:
+        while True:
+            rows = [await self._queue.get()]
+            if self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.interval)  # let a partial batch fill up
+            while len(rows) < self.batch_size and not self._queue.empty():
+                rows.append(self._queue.get_nowait())
+            transcript_buffered.set(self._queue.qsize())
+            await self._write(rows)
+            for _ in rows:
+                self._queue.task_done()
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        written = []
+
+        def insert_rows(db) -> None:
+            known = ensure_users(db, (row["user_id"] for row in rows))
+            written[:] = [row for row in rows if row["user_id"] in known]  # ids never issued are not logged
+            if written:
+                db.execute(insert(ChatMessage.__table__), written)
+
+        try:
+            await get_write_behind().write(insert_rows)
+            transcript_entries.inc(len(written), outcome="written")
+            transcript_entries.inc(len(rows) - len(written), outcome="rejected")
+        except Exception as e:
+            print(f"⚠️ Failed to write {len(rows)} chat transcript entries: {e}")
+            transcript_entries.inc(len(rows), outcome="failed")
+
+
+def get_transcript_logger() -> TranscriptLogger:
+    """Return the process-wide transcript logger."""
+    global _logger
+    if _logger is None:
+        _logger = TranscriptLogger()
+    return _logger
@@ -0,0 +1,188 @@
+"""
+Write-behind batching for database inserts.
+
+Request handlers hand rows (and small statements that must commit with them)
+to a WriteBehindQueue instead of opening a session and committing on their
+own. A single background writer drains the queue and commits everything
+waiting in one transaction, flushing once a batch reaches WRITE_BATCH_SIZE
+rows or its oldest write is WRITE_BATCH_DELAY_MS old. Concurrent requests
+therefore share commits, and the hot-path writers (assessment results and
+checkpoints, transcripts) take SQLite's write lock from this one thread
+instead of contending for it.
+
+Writes are durable when awaited: write() returns once the transaction holding
+them has committed, so callers that promise the user their data is saved, or
+need a generated id, await it. Fire-and-forget writes use submit().
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Callable, List, Optional, Union
+from db_connection import SessionLocal
+from metrics import counter, gauge, histogram
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+WRITE_BATCH_DELAY_MS = float(os.getenv("WRITE_BATCH_DELAY_MS", "10"))
+# Writers wait (backpressure) once this many writes are queued
+WRITE_QUEUE_MAX = int(os.getenv("WRITE_QUEUE_MAX", "10000"))
+
+queue_depth = gauge("write_behind_queue_depth", "Writes waiting for the write-behind flusher")
+batch_sizes = histogram("write_behind_batch_size", "Writes committed per write-behind transaction",
+                        buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500))
+flush_seconds = histogram("write_behind_flush_seconds", "Time to commit one write-behind batch")
+write_outcomes = counter("write_behind_writes_total", "Write-behind writes by outcome (committed, failed)", ("outcome",))
+
+_queue: Optional["WriteBehindQueue"] = None
+
+# An ORM object to add, or a callable run with the session (e.g. a DELETE committed alongside)
+Operation = Union[Any, Callable[[Any], None]]
+
+
+class _Write:
+    __slots__ = ("operations", "future")
+
+    def __init__(self, operations: List[Operation], future: asyncio.Future):
+        self.operations = operations
+        self.future = future
+
+    def apply(self, db) -> None:
+        for operation in self.operations:
+            if callable(operation):
+                operation(db)
+            else:
+                db.add(operation)
+
+
+def _commit(writes: List[_Write]) -> None:
+    db = SessionLocal(expire_on_commit=False)  # callers read generated ids after the session closes
+    try:
+        for write in writes:
+            write.apply(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _commit_batch(writes: List[_Write]) -> List[Optional[Exception]]:
+    """Commit the batch as one transaction; if it fails, retry writes one by one so a bad row only fails itself."""
+    try:
+        _commit(writes)
+        return [None] * len(writes)
+    except Exception as e:
+        if len(writes) == 1:
+            return [e]
+    errors = []
+    for write in writes:
+        try:
+            _commit([write])
+            errors.append(None)
+        except Exception as e:
+            errors.append(e)
+    return errors
+
+
+class WriteBehindQueue:
+    """Bounded queue of writes committed in batches by one background task."""
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, delay: float = WRITE_BATCH_DELAY_MS / 1000,
+                 max_queued: int = WRITE_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.delay = delay
+        self.max_queued = max_queued
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _ensure_flusher(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._queue = asyncio.Queue(self.max_queued)
+            self._flusher = loop.create_task(self._run())
+        return self._queue
+
+    async def _enqueue(self, operations: List[Operation]) -> asyncio.Future:
+        queue = self._ensure_flusher()
+        write = _Write(operations, asyncio.get_running_loop().create_future())
+        await queue.put(write)  # waits while the queue is full
+        queue_depth.set(queue.qsize())
+        return write.future
+
+    async def submit(self, *operations: Operation) -> asyncio.Future:
+        """Queue operations to commit together in one transaction, without waiting for the commit."""
+        future = await self._enqueue(list(operations))
+        future.add_done_callback(_consume_exception)
+        return future
+
+    async def write(self, *operations: Operation) -> None:
+        """Queue operations and wait until they are committed (raises if they failed)."""
+        await asyncio.shield(await self._enqueue(list(operations)))
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far is committed."""
+        if self._queue is not None and self._flusher is not None and not self._flusher.done():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Flush and stop the background writer (shutdown)."""
+        await self.flush()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+    async def _next_batch(self) -> List[_Write]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.delay
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            queue_depth.set(self._queue.qsize())
+            started = time.perf_counter()
+            try:
+                errors = await asyncio.to_thread(_commit_batch, batch)
+            except Exception as e:
+                errors = [e] * len(batch)
+            flush_seconds.observe(time.perf_counter() - started)
+            batch_sizes.observe(len(batch))
+
+            for write, error in zip(batch, errors):
+                write_outcomes.inc(outcome="failed" if error else "committed")
+                if not write.future.done():
+                    if error is None:
+                        write.future.set_result(None)
+                    else:
+                        write.future.set_exception(error)
+                self._queue.task_done()
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Fire-and-forget writes have nobody awaiting them, so report failures here
+    if not future.cancelled() and future.exception() is not None:
+        print(f"⚠️ Write-behind write failed: {future.exception()}")
+
+
+def get_write_behind() -> WriteBehindQueue:
+    """Return the process-wide write-behind queue."""
+    global _queue
+    if _queue is None:
+        _queue = WriteBehindQueue()
+    return _queue